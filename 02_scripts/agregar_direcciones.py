@@ -4,77 +4,50 @@ Script para agregar direcciones a las rejas usando geocodificación inversa
 
 Toma las coordenadas lat/lon del archivo Rejas.xlsx y obtiene las direcciones
 de las calles usando OpenStreetMap.
+
+Por defecto (MODO = 'offline') la calle, el cruce y la comuna salen de los
+nombres de la red vial local (direcciones_red.py), sin consultas HTTP; solo
+los puntos lejos de una calle con nombre se consultan a Nominatim.
 """
 
 import pandas as pd
-from geopy.geocoders import Nominatim
-from geopy.exc import GeocoderTimedOut, GeocoderServiceError
-import time
 import os
 
-def obtener_direccion(lat, lon, geolocator, reintentos=3):
+from direcciones_red import direcciones_offline, DIST_MAX_M
+from geocodificacion import geocodificar, SIN_DIRECCION, TASA_NOMINATIM
+from red_vial import cargar_red
+from snap_vial import indice_aristas
+
+
+# CONFIGURACION
+# =============
+# 'offline': nombres de la red vial + Nominatim solo a mas de DIST_MAX_M metros
+# 'nominatim': todo por Nominatim
+MODO = 'offline'
+# Endpoint /reverse compatible con Nominatim (None = NOMINATIM_URL o el publico)
+ENDPOINT = None
+# Consultas por segundo; None para un Nominatim local sin limite
+TASA = TASA_NOMINATIM
+CONCURRENCIA = 4
+
+
+def obtener_direccion(lat, lon, reintentos=3):
     """
     Hace geocodificación inversa: convierte coordenadas en dirección.
 
+    Usa el mismo cache que el proceso masivo (ver geocodificacion.py).
+
     Args:
         lat: Latitud
         lon: Longitud
-        geolocator: Objeto de geopy para hacer la consulta
         reintentos: Número de intentos si falla
 
     Returns:
         Dirección como string, o None si falla
     """
-    for intento in range(reintentos):
-        try:
-            # Geocodificación inversa
-            location = geolocator.reverse(f"{lat}, {lon}", language='es', timeout=10)
-
-            if location and location.address:
-                # Extraer solo la calle y número si está disponible
-                address = location.raw.get('address', {})
-
-                # Intentar construir dirección legible
-                partes = []
-
-                # Nombre de calle
-                if 'road' in address:
-                    partes.append(address['road'])
-                elif 'street' in address:
-                    partes.append(address['street'])
-
-                # Número
-                if 'house_number' in address:
-                    partes.append(address['house_number'])
-
-                # Comuna
-                if 'municipality' in address:
-                    partes.append(address['municipality'])
-                elif 'suburb' in address:
-                    partes.append(address['suburb'])
-                elif 'city' in address:
-                    partes.append(address['city'])
-
-                if partes:
-                    return ', '.join(partes)
-                else:
-                    # Si no hay partes específicas, devolver dirección completa
-                    return location.address
-
-            return None
-
-        except GeocoderTimedOut:
-            print(f"  Timeout en intento {intento + 1}/{reintentos}")
-            if intento < reintentos - 1:
-                time.sleep(2)
-        except GeocoderServiceError as e:
-            print(f"  Error del servicio: {e}")
-            return None
-        except Exception as e:
-            print(f"  Error inesperado: {e}")
-            return None
-
-    return None
+    direccion = geocodificar([lat], [lon], endpoint=ENDPOINT, tasa=TASA,
+                             reintentos=reintentos, verbose=False)[0]
+    return None if direccion == SIN_DIRECCION else direccion
 
 def main():
     print("="*70)
@@ -98,38 +71,29 @@ def main():
     df['lon'] = df['lon'].astype(float)
     print("[OK] Coordenadas parseadas")
 
-    # 3. INICIALIZAR GEOLOCATOR
-    print("\n[Paso 3/4] Inicializando geocodificador...")
-    geolocator = Nominatim(user_agent="mapa_rejas_chile")
-    print("[OK] Geocodificador listo")
-
-    # 4. OBTENER DIRECCIONES
-    print("\n[Paso 4/4] Obteniendo direcciones (esto puede tomar varios minutos)...")
-    print("NOTA: Se hace una pausa de 1.5s entre consultas para respetar límites de API")
-
-    direcciones = []
+    # 3. OBTENER DIRECCIONES
+    print(f"\n[Paso 3/4] Obteniendo direcciones (modo {MODO})...")
+    print("NOTA: Las consultas a Nominatim se guardan en cache; si se interrumpe,")
+    print("      volver a ejecutar y continua donde quedo")
+
+    if MODO == 'offline':
+        red = cargar_red(network_type='all')
+        res = direcciones_offline(indice_aristas(red), df['lat'].values, df['lon'].values,
+                                  fallback=True, endpoint=ENDPOINT, tasa=TASA,
+                                  concurrencia=CONCURRENCIA)
+        print(f"      {int(res['offline'].sum())}/{len(df)} resueltas con la red vial, "
+              f"{int((~res['offline']).sum())} a mas de {DIST_MAX_M} m por Nominatim")
+        direcciones = list(res['direccion'])
+        df['calle'] = res['calle']
+        df['cruce'] = res['cruce']
+        df['comuna'] = res['comuna']
+    else:
+        direcciones = geocodificar(df['lat'].values, df['lon'].values, endpoint=ENDPOINT,
+                                   tasa=TASA, concurrencia=CONCURRENCIA)
     total = len(df)
-    exitosas = 0
-
-    for idx, row in df.iterrows():
-        print(f"\nProcesando {idx+1}/{total}: ({row['lat']}, {row['lon']})")
-
-        direccion = obtener_direccion(row['lat'], row['lon'], geolocator)
-
-        if direccion:
-            print(f"  [OK] {direccion}")
-            exitosas += 1
-        else:
-            direccion = "No disponible"
-            print(f"  [X] No se pudo obtener dirección")
-
-        direcciones.append(direccion)
-
-        # Pausa para respetar límites de la API
-        if idx < total - 1:  # No esperar en la última
-            time.sleep(1.5)
+    exitosas = sum(d != SIN_DIRECCION for d in direcciones)
 
-    # 5. AGREGAR COLUMNA Y GUARDAR
+    # 4. AGREGAR COLUMNA Y GUARDAR
     print("\n" + "="*70)
     print(f"Geocodificación completada: {exitosas}/{total} direcciones obtenidas ({exitosas/total*100:.1f}%)")
 
@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+================================================================================
+ALMACEN DE DATOS - Formato columnar tipado para el pipeline 01 -> 03
+================================================================================
+
+Los pasos del pipeline (merge, snap_to_road, generadores) trabajan sobre
+archivos Arrow IPC sin compresion en 03_datos_procesados/almacen/. Se abren
+con memory-map, asi que cargar la base es practicamente instantaneo y los
+tipos se conservan:
+
+    lat, lon : float64
+    estado   : int8
+    año      : int16
+    fuente   : categorica
+
+Excel queda solo como borde de importacion/exportacion: si se pide un .xlsx
+y el almacen tiene una copia al dia (mismo tamaño y fecha del Excel), se lee
+la copia; si no, se importa el Excel una vez y se guarda en el almacen.
+
+USO:
+    from almacen_datos import cargar_tabla, guardar_tabla
+
+    df = cargar_tabla('../03_datos_procesados/Base_Combinada.xlsx')
+    df = cargar_tabla('Base_Combinada')              # por nombre
+    guardar_tabla(df, '../03_datos_procesados/Base_Combinada_Snapped.xlsx')
+        # -> escribe el Excel (exportacion) y la tabla del almacen
+
+    python almacen_datos.py        # importa todos los Excel de 03
+
+AUTOR: Proyecto Rejas La Florida
+FECHA: Enero 2026
+================================================================================
+"""
+
+import json
+import os
+
+import pandas as pd
+import pyarrow as pa
+
+
+DIR_PROCESADOS = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                              '..', '03_datos_procesados')
+RUTA_ALMACEN = os.path.join(DIR_PROCESADOS, 'almacen')
+
+# Tipos del esquema comun (las demas columnas se guardan con el tipo que traen)
+ESQUEMA = {
+    'lat': 'float64',
+    'lon': 'float64',
+    'estado': 'int8',
+    'año': 'int16',
+    'fuente': 'category',
+}
+AÑO_POR_DEFECTO = 2024
+# Fuentes sin año de cierre conocido: su año queda vacio (no se completa)
+FUENTES_SIN_AÑO = ('Clasificador',)
+
+_CLAVE_ORIGEN = b'origen_excel'
+
+
+def tipar(df):
+    """
+    Aplica los tipos del esquema comun a las columnas presentes.
+
+    Los enteros con nulos quedan como tipo nullable (Int8/Int16); el año
+    vacio se completa con AÑO_POR_DEFECTO, igual que en el merge original,
+    salvo en las filas de FUENTES_SIN_AÑO.
+    """
+    df = df.copy()
+    for col, tipo in ESQUEMA.items():
+        if col not in df.columns:
+            continue
+        if col == 'año':
+            años = pd.to_numeric(df[col])
+            completar = años.isna()
+            if 'fuente' in df.columns:
+                completar &= ~df['fuente'].astype(str).isin(FUENTES_SIN_AÑO)
+            df[col] = años.mask(completar, AÑO_POR_DEFECTO)
+        if tipo == 'category':
+            df[col] = df[col].astype(str).astype('category')
+        elif tipo.startswith('int'):
+            valores = pd.to_numeric(df[col])
+            df[col] = valores.astype(tipo.capitalize() if valores.isna().any() else tipo)
+        else:
+            df[col] = pd.to_numeric(df[col]).astype(tipo)
+    return df
+
+
+def ruta_tabla(nombre, ruta=RUTA_ALMACEN):
+    """Archivo .arrow de una tabla; acepta el nombre o la ruta de su Excel."""
+    nombre = os.path.splitext(os.path.basename(nombre))[0]
+    return os.path.join(ruta, f"{nombre}.arrow")
+
+
+def _firma_excel(ruta_excel):
+    st = os.stat(ruta_excel)
+    return {'tamaño': st.st_size, 'mtime_ns': st.st_mtime_ns}
+
+
+def _escribir_arrow(df, destino, origen=None):
+    tabla = pa.Table.from_pandas(df, preserve_index=False)
+    if origen is not None:
+        meta = dict(tabla.schema.metadata or {})
+        meta[_CLAVE_ORIGEN] = json.dumps(origen).encode()
+        tabla = tabla.replace_schema_metadata(meta)
+
+    os.makedirs(os.path.dirname(destino), exist_ok=True)
+    tmp = destino + '.tmp'
+    with pa.OSFile(tmp, 'wb') as f:
+        with pa.ipc.new_file(f, tabla.schema) as escritor:
+            escritor.write_table(tabla)
+    os.replace(tmp, destino)
+
+
+def _leer_arrow(origen, columnas=None):
+    """Abre la tabla con memory-map; devuelve (DataFrame, firma del Excel o None)."""
+    with pa.memory_map(origen, 'r') as mm:
+        tabla = pa.ipc.open_file(mm).read_all()
+    if columnas is not None:
+        tabla = tabla.select(columnas)
+    meta = tabla.schema.metadata or {}
+    firma = json.loads(meta[_CLAVE_ORIGEN]) if _CLAVE_ORIGEN in meta else None
+    return tabla.to_pandas(), firma
+
+
+def importar_excel(ruta_excel, ruta=RUTA_ALMACEN):
+    """Lee un Excel (borde de entrada), lo tipa y lo guarda en el almacen."""
+    df = tipar(pd.read_excel(ruta_excel))
+    _escribir_arrow(df, ruta_tabla(ruta_excel, ruta), _firma_excel(ruta_excel))
+    return df
+
+
+def cargar_tabla(nombre, columnas=None, ruta=RUTA_ALMACEN):
+    """
+    Carga una tabla del almacen (memory-map).
+
+    Parametros:
+    -----------
+    nombre : str
+        Nombre de la tabla ('Base_Combinada') o ruta de su Excel. Con una ruta
+        .xlsx, si el Excel cambio desde la ultima importacion se vuelve a
+        importar automaticamente.
+    columnas : list, opcional
+        Leer solo estas columnas
+
+    Retorna:
+    --------
+    DataFrame con los tipos del esquema
+    """
+    destino = ruta_tabla(nombre, ruta)
+    es_excel = nombre.lower().endswith(('.xlsx', '.xls'))
+
+    if os.path.exists(destino):
+        df, firma = _leer_arrow(destino, columnas)
+        if not es_excel or not os.path.exists(nombre) or firma == _firma_excel(nombre):
+            return df
+
+    if not es_excel:
+        raise FileNotFoundError(f"No existe la tabla {nombre!r} en {ruta}")
+    df = importar_excel(nombre, ruta)
+    return df if columnas is None else df[columnas]
+
+
+def guardar_tabla(df, nombre, exportar_excel=True, ruta=RUTA_ALMACEN):
+    """
+    Guarda una tabla en el almacen.
+
+    Si nombre es una ruta .xlsx y exportar_excel=True, tambien escribe el
+    Excel (borde de salida, para compartir) y la tabla queda marcada como al
+    dia con ese archivo.
+    """
+    df = tipar(df)
+    origen = None
+    if exportar_excel and nombre.lower().endswith('.xlsx'):
+        df.to_excel(nombre, index=False)
+        origen = _firma_excel(nombre)
+    _escribir_arrow(df, ruta_tabla(nombre, ruta), origen)
+    return df
+
+
+# ==============================================================================
+# EJECUTAR
+# ==============================================================================
+if __name__ == "__main__":
+    import glob
+    import time
+
+    for ruta_excel in sorted(glob.glob(os.path.join(DIR_PROCESADOS, '*.xlsx'))):
+        t0 = time.time()
+        df = importar_excel(ruta_excel)
+        t_excel = time.time() - t0
+        t0 = time.time()
+        cargar_tabla(ruta_excel)
+        t_arrow = time.time() - t0
+        print(f"  {os.path.basename(ruta_excel):40s} {len(df):6d} filas  "
+              f"Excel {t_excel * 1000:7.0f} ms  ->  almacen {t_arrow * 1000:5.1f} ms")
@@ -0,0 +1,281 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+================================================================================
+BITACORA DE CLASIFICACION - Registro de cambios del clasificador y su fusion
+================================================================================
+
+El clasificador guardaba los cambios como un solo objeto JSON en localStorage
+(se reescribia completo en cada clic) y cada encuestador exportaba un CSV que
+habia que juntar a mano.
+
+Ahora cada clasificacion es una entrada de una bitacora que solo crece
+(IndexedDB en el navegador) y "Exportar Cambios" descarga la bitacora en un
+formato binario compacto (.rlog, little-endian):
+
+    b'RLOG1\\n'
+    linea JSON: {"clave": ..., "autores": [...], "n": ..., "escala": 1e7}
+    n registros de 24 bytes:
+        int32   id        punto del clasificador
+        int32   lat, lon  grados * escala
+        float64 ts        milisegundos desde 1970 (UTC)
+        uint16  autor     posicion en "autores"
+        uint8   estado    indice en ESTADOS (1 cerrada, 2 abierta, 3 otro)
+        uint8   inicial   estado del punto al generar el clasificador
+
+Este modulo lee muchas bitacoras (y los CSV exportados antes), resuelve los
+conflictos de forma deterministica y agrega el resultado a Base_Combinada
+como fuente 'Clasificador'. Las filas de esa fuente se reemplazan en cada
+fusion, asi que correrla dos veces da lo mismo.
+
+Reglas para un punto clasificado por varias personas:
+    'ultimo'  : gana la entrada mas reciente (empates: autor, archivo)
+    'mayoria' : cada autor vota con su ultima entrada; gana el estado con mas
+                votos y los empates se resuelven con 'ultimo'
+
+USO:
+    python bitacora_clasificacion.py exportes/*.rlog
+    python bitacora_clasificacion.py exportes/*.rlog exportes/*.csv --mayoria
+
+AUTOR: Proyecto Rejas La Florida
+FECHA: Enero 2026
+================================================================================
+"""
+
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from plantilla_clasificador import ESTADOS
+
+
+MAGIA = b'RLOG1\n'
+ESCALA = 10 ** 7
+REGISTRO = np.dtype([('id', '<i4'), ('lat', '<i4'), ('lon', '<i4'), ('ts', '<f8'),
+                     ('autor', '<u2'), ('estado', 'u1'), ('inicial', 'u1')])
+SIN_INICIAL = 255
+
+FUENTE = 'Clasificador'
+REGLAS = ('ultimo', 'mayoria')
+
+BASE = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                    '..', '03_datos_procesados', 'Base_Combinada.xlsx')
+
+
+# ==============================================================================
+# FORMATO
+# ==============================================================================
+
+def bitacora_bytes(df, clave=''):
+    """
+    Contenido de una bitacora .rlog.
+
+    df: columnas id, lat, lon, ts (ms), autor (texto), estado, inicial
+    (codigos de ESTADOS).
+    """
+    autores = sorted(df['autor'].astype(str).unique().tolist())
+    registros = np.zeros(len(df), dtype=REGISTRO)
+    registros['id'] = df['id'].to_numpy()
+    registros['lat'] = np.rint(df['lat'].to_numpy(dtype=np.float64) * ESCALA)
+    registros['lon'] = np.rint(df['lon'].to_numpy(dtype=np.float64) * ESCALA)
+    registros['ts'] = df['ts'].to_numpy(dtype=np.float64)
+    registros['autor'] = pd.Categorical(df['autor'].astype(str), categories=autores).codes
+    registros['estado'] = df['estado'].to_numpy()
+    registros['inicial'] = df['inicial'].to_numpy()
+    cabecera = {'clave': clave, 'autores': autores, 'n': len(df), 'escala': ESCALA}
+    return (MAGIA + json.dumps(cabecera, ensure_ascii=False).encode('utf-8') + b'\n'
+            + registros.tobytes())
+
+
+def escribir_bitacora(ruta, df, clave=''):
+    """Escribe una bitacora .rlog (columnas como en bitacora_bytes)."""
+    with open(ruta, 'wb') as f:
+        f.write(bitacora_bytes(df, clave))
+
+
+def _leer_rlog(ruta):
+    with open(ruta, 'rb') as f:
+        datos = f.read()
+    fin = datos.index(b'\n', len(MAGIA))
+    cabecera = json.loads(datos[len(MAGIA):fin].decode('utf-8'))
+    registros = np.frombuffer(datos, dtype=REGISTRO, count=cabecera['n'], offset=fin + 1)
+    escala = cabecera.get('escala', ESCALA)
+    autores = np.array(cabecera['autores'] or [''], dtype=object)
+    return pd.DataFrame({
+        'id': registros['id'].astype(np.int64),
+        'lat': registros['lat'] / escala,
+        'lon': registros['lon'] / escala,
+        'ts': registros['ts'],
+        'autor': autores[registros['autor']],
+        'estado': registros['estado'].astype(np.int64),
+        'inicial': registros['inicial'].astype(np.int64),
+        'clave': cabecera.get('clave', ''),
+    })
+
+
+# Nombres de columna de los CSV de cada version del clasificador
+COLUMNAS_CSV = {
+    'ts': ('timestamp', 'time'),
+    'autor': ('por', 'clasificado_por', 'clasificadoPor'),
+}
+
+
+def _columna_csv(csv, campo, ruta):
+    for nombre in COLUMNAS_CSV[campo]:
+        if nombre in csv.columns:
+            return csv[nombre]
+    raise ValueError(f"{ruta}: falta la columna {' / '.join(COLUMNAS_CSV[campo])}")
+
+
+def _leer_csv(ruta):
+    """
+    CSV de "Exportar Cambios" anterior: lat, lon, estado (0/1/2), timestamp y
+    autor ('por' en v4, 'clasificado_por' en v3 y completo).
+    """
+    csv = pd.read_csv(ruta)
+    # pandas >= 3 no usa siempre nanosegundos: se fija la unidad antes de pasar a ms
+    ts = pd.to_datetime(_columna_csv(csv, 'ts', ruta), utc=True, format='ISO8601')
+    return pd.DataFrame({
+        'id': -1,
+        'lat': csv['lat'].astype(float),
+        'lon': csv['lon'].astype(float),
+        'ts': ts.dt.as_unit('ms').astype('int64').astype(np.float64),
+        'autor': _columna_csv(csv, 'autor', ruta).fillna('').astype(str),
+        'estado': csv['estado'].astype(np.int64) + 1,
+        'inicial': SIN_INICIAL,
+        'clave': '',
+    })
+
+
+def leer_bitacora(ruta):
+    """
+    Lee una bitacora .rlog (o un CSV exportado por la version anterior).
+
+    Retorna:
+    --------
+    DataFrame con id, lat, lon, ts, autor, estado, inicial, clave, archivo
+    """
+    with open(ruta, 'rb') as f:
+        es_rlog = f.read(len(MAGIA)) == MAGIA
+    df = _leer_rlog(ruta) if es_rlog else _leer_csv(ruta)
+    df['archivo'] = os.path.basename(ruta)
+    return df
+
+
+# ==============================================================================
+# FUSION
+# ==============================================================================
+
+def resolver_conflictos(entradas, regla='ultimo'):
+    """
+    Un estado por punto a partir de todas las entradas.
+
+    El punto se identifica por sus coordenadas (a 1e-7 grados), que no cambian
+    si se vuelve a generar el clasificador; el id no sirve para eso.
+
+    Parametros:
+    -----------
+    entradas : DataFrame
+        Concatenacion de leer_bitacora
+    regla : str
+        'ultimo' o 'mayoria'
+
+    Retorna:
+    --------
+    DataFrame con lat, lon, estado (codigo de ESTADOS), ts, autor, n_entradas,
+    n_autores, conflicto (las entradas no coinciden)
+    """
+    if regla not in REGLAS:
+        raise ValueError(f"regla debe ser una de {REGLAS}, no {regla!r}")
+    df = entradas.copy()
+    df['lat_q'] = np.rint(df['lat'] * ESCALA).astype(np.int64)
+    df['lon_q'] = np.rint(df['lon'] * ESCALA).astype(np.int64)
+    # Orden total: el resultado no depende del orden de los archivos
+    df = df.sort_values(['lat_q', 'lon_q', 'ts', 'autor', 'archivo', 'estado'],
+                        kind='mergesort').reset_index(drop=True)
+    clave = ['lat_q', 'lon_q']
+    grupos = df.groupby(clave, sort=False)
+
+    ultimo = grupos.tail(1).set_index(clave)
+    resumen = grupos.agg(n_entradas=('estado', 'size'), n_autores=('autor', 'nunique'),
+                         n_estados=('estado', 'nunique'))
+
+    if regla == 'ultimo':
+        elegido = ultimo
+    else:
+        # Ultima entrada de cada autor; entre los estados con mas votos gana
+        # el que tiene el voto mas reciente
+        votos = df.groupby(clave + ['autor'], sort=False).tail(1)
+        conteo = votos.groupby(clave + ['estado']).size().rename('votos').reset_index()
+        votos = votos.merge(conteo, on=clave + ['estado'])
+        votos = votos.sort_values(clave + ['votos', 'ts', 'autor', 'archivo'], kind='mergesort')
+        elegido = votos.groupby(clave, sort=False).tail(1).set_index(clave)
+
+    resultado = elegido[['lat', 'lon', 'estado', 'ts', 'autor']].join(resumen)
+    resultado['conflicto'] = resultado.pop('n_estados') > 1
+    return resultado.reset_index(drop=True)
+
+
+def fusionar_en_base(base, resueltos, fuente=FUENTE):
+    """
+    Agrega los puntos resueltos a la base (estado 0/1/2 como en la base).
+
+    Las filas previas de `fuente` se descartan, asi la fusion es idempotente.
+    El año (de cierre) no se conoce: queda vacio, no es el de la clasificacion.
+    """
+    base = base[base['fuente'].astype(str) != fuente]
+    nuevos = pd.DataFrame({
+        'lat': resueltos['lat'].to_numpy(),
+        'lon': resueltos['lon'].to_numpy(),
+        'estado': resueltos['estado'].to_numpy() - 1,
+        'año': pd.array([pd.NA] * len(resueltos), dtype='Int16'),
+        'fuente': fuente,
+    })
+    nuevos = nuevos[nuevos['estado'] >= 0]
+    return pd.concat([base.astype({'fuente': str}), nuevos], ignore_index=True)
+
+
+def fusionar_bitacoras(rutas, regla='ultimo', ruta_base=BASE, guardar=True):
+    """
+    Lee las bitacoras, resuelve conflictos y los agrega a Base_Combinada.
+
+    Retorna:
+    --------
+    tuple (base_nueva, resueltos)
+    """
+    from almacen_datos import cargar_tabla, guardar_tabla
+
+    entradas = pd.concat([leer_bitacora(r) for r in rutas], ignore_index=True)
+    claves = sorted(set(entradas['clave']) - {''})
+    print(f"      {len(entradas)} entradas de {len(rutas)} archivos "
+          f"({entradas['autor'].nunique()} autores, clasificador: {', '.join(claves) or '?'})")
+
+    resueltos = resolver_conflictos(entradas, regla)
+    print(f"      {len(resueltos)} puntos, {int(resueltos['conflicto'].sum())} con "
+          f"entradas distintas (regla '{regla}')")
+    for k, n in resueltos['estado'].value_counts().sort_index().items():
+        print(f"        {ESTADOS[k]:8s} {n}")
+
+    base = fusionar_en_base(cargar_tabla(ruta_base), resueltos)
+    if guardar:
+        base = guardar_tabla(base, ruta_base)
+        print(f"      Guardado: {ruta_base} ({len(base)} filas)")
+    return base, resueltos
+
+
+# ==============================================================================
+# EJECUTAR
+# ==============================================================================
+if __name__ == "__main__":
+    import sys
+
+    rutas = [a for a in sys.argv[1:] if not a.startswith('--')]
+    if not rutas:
+        print("Uso: python bitacora_clasificacion.py bitacora1.rlog [...] [--mayoria]")
+        sys.exit(1)
+    print("=" * 70)
+    print("FUSION DE BITACORAS DEL CLASIFICADOR")
+    print("=" * 70)
+    fusionar_bitacoras(rutas, regla='mayoria' if '--mayoria' in sys.argv else 'ultimo')
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+================================================================================
+CACHE DE ETAPAS - Resultados intermedios guardados por el hash de sus entradas
+================================================================================
+
+Generar un clasificador es una cadena de etapas (seleccion de nodos, estados
+heredados, ruta) que dependen de pocas cosas: el hash de la red, el hash de
+los datos clasificados, la regla y algunos parametros. Cada etapa se guarda
+como .npz con un nombre que es el hash de esas dependencias: si al volver a
+generar nada cambio se lee del disco, y si cambio la regla o los datos solo
+se recalculan las etapas que dependen de eso.
+
+No hay que invalidar nada a mano: una entrada distinta da otro archivo. Los
+archivos viejos se pueden borrar sin riesgo (limpiar()).
+
+USO:
+    from cache_etapas import CacheEtapas
+
+    cache = CacheEtapas()
+    res = cache.obtener('seleccion', {'red': red.hash, 'regla': regla},
+                        lambda: {'idx': seleccionar_nodos(red, regla)})
+
+AUTOR: Proyecto Rejas La Florida
+FECHA: Enero 2026
+================================================================================
+"""
+
+import glob
+import hashlib
+import json
+import os
+
+import numpy as np
+
+
+RUTA_CACHE = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                          '..', '03_datos_procesados', 'cache_etapas')
+
+
+def hash_datos(*arreglos):
+    """Hash SHA-1 corto del contenido de uno o mas arreglos."""
+    h = hashlib.sha1()
+    for arr in arreglos:
+        arr = np.ascontiguousarray(arr)
+        h.update(str(arr.dtype).encode())
+        h.update(str(arr.shape).encode())
+        h.update(arr.tobytes())
+    return h.hexdigest()[:16]
+
+
+class CacheEtapas:
+    """
+    Cache en disco de etapas que producen un dict de arreglos.
+
+    Parametros:
+    -----------
+    carpeta : str
+        Donde se guardan los .npz
+    activo : bool
+        Con False siempre se recalcula (y no se escribe nada)
+    """
+
+    def __init__(self, carpeta=RUTA_CACHE, activo=True):
+        self.carpeta = carpeta
+        self.activo = activo
+        self.aciertos = []
+
+    def clave(self, etapa, dependencias):
+        texto = json.dumps(dependencias, sort_keys=True, default=str)
+        return f"{etapa}_{hashlib.sha1(texto.encode()).hexdigest()[:16]}"
+
+    def ruta(self, etapa, dependencias):
+        return os.path.join(self.carpeta, self.clave(etapa, dependencias) + '.npz')
+
+    def obtener(self, etapa, dependencias, calcular):
+        """
+        Resultado de la etapa: del disco si existe, si no calcular() y guardar.
+
+        Parametros:
+        -----------
+        etapa : str
+            Nombre de la etapa (prefijo del archivo)
+        dependencias : dict
+            Todo lo que determina el resultado (hashes y parametros; JSON)
+        calcular : callable
+            Sin argumentos; retorna dict nombre -> arreglo (o escalar)
+
+        Retorna:
+        --------
+        dict nombre -> np.ndarray
+        """
+        ruta = self.ruta(etapa, dependencias)
+        if self.activo and os.path.exists(ruta):
+            with np.load(ruta, allow_pickle=False) as npz:
+                self.aciertos.append(etapa)
+                return {k: npz[k] for k in npz.files}
+        resultado = {k: np.asarray(v) for k, v in calcular().items()}
+        if self.activo:
+            os.makedirs(self.carpeta, exist_ok=True)
+            # Escritura atomica: un .npz a medias nunca queda con el nombre final
+            tmp = ruta[:-4] + '.tmp.npz'
+            np.savez(tmp, **resultado)
+            os.replace(tmp, ruta)
+        return resultado
+
+    def limpiar(self):
+        """Borra todos los archivos de la cache."""
+        for ruta in glob.glob(os.path.join(self.carpeta, '*.npz')):
+            os.remove(ruta)
@@ -0,0 +1,234 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+================================================================================
+CAPAS DE MAPA - Capa de puntos compacta para folium
+================================================================================
+
+Los mapas creaban un folium.CircleMarker por fila, cada uno con su popup HTML
+completo escrito en el archivo (varios KB por reja). Con miles de rejas eso
+produce HTML de varios MB que tardan segundos en abrir.
+
+CapaPuntos escribe una sola vez por capa los datos en columnas (lat, lon,
+estado, año, fuente codificada, ...) y en el navegador:
+
+    - dibuja los circulos con el renderer canvas de Leaflet
+    - calcula el color con una funcion de estilo (estado, gradiente por año)
+    - arma el popup y el tooltip solo cuando se hace click / hover
+
+USO:
+    from capas_mapa import CapaPuntos
+
+    CapaPuntos(df[df['estado'] == 0], nombre='Cerradas',
+               estilo=ESTILO, popup=POPUP, tooltip="#{n}: {estado_txt} ({año})"
+               ).add_to(mapa)
+
+AUTOR: Proyecto Rejas La Florida
+FECHA: Enero 2026
+================================================================================
+"""
+
+import json
+
+import numpy as np
+import pandas as pd
+from branca.element import Element
+from folium.map import Layer
+from jinja2 import Template
+
+
+NOMBRES_ESTADO = {0: 'CERRADA', 1: 'ABIERTA', 2: 'OTRO TIPO'}
+
+# Estilo por defecto: cerradas con gradiente por año, abiertas verdes, otro morado
+ESTILO_BASE = {
+    'radio': 6,
+    'colores': {0: 'gradiente', 1: '#27ae60', 2: '#9b59b6'},
+    'borde': {},              # estado -> color de borde (por defecto = relleno)
+    'opacidad': 0.9,
+    'opacidad_relleno': 0.8,
+    'peso': 2,
+    'color_otro': '#95a5a6',
+    'color_sin_año': '#34495e',  # cerradas sin año de cierre (fuera del gradiente)
+}
+
+# Popup por defecto: (etiqueta, campo). Campos especiales: 'estado' (texto
+# coloreado) y 'coord' (lat, lon con 6 decimales). Campos vacios se omiten.
+# color_estado (estado -> color) fija el color del texto del estado; si no,
+# se usa el color del punto.
+POPUP_BASE = {
+    'titulo': 'Reja',
+    'ancho': 240,
+    'filas': [('Estado', 'estado'), ('Año', 'año'), ('Fuente', 'fuente'),
+              ('Coord', 'coord'), ('Dir', 'direccion')],
+}
+
+
+# Funciones JS compartidas por todas las capas del mapa (se escriben una vez)
+_JS_COMUN = """
+<script>
+function rejasColorGradiente(año, min, max) {
+    var t = (max === min) ? 0.5 : Math.max(0, Math.min(1, (año - min) / (max - min)));
+    var h = function (x) { return ('0' + Math.floor(x).toString(16)).slice(-2); };
+    return '#' + h(20 + 235 * t) + h(50 + 205 * t) + h(100 + 50 * t * 0.5);
+}
+
+function rejasPropiedades(d, i) {
+    var p = {n: d.n[i], lat: d.lat[i], lon: d.lon[i]};
+    for (var c in d.columnas) {
+        var v = d.columnas[c][i];
+        p[c] = (d.vocab[c] && v !== null) ? d.vocab[c][v] : v;
+    }
+    p.estado_txt = d.estilo.nombres[p.estado] || 'DESCONOCIDO';
+    return p;
+}
+
+function rejasEstilo(p, e) {
+    var c = e.colores[p.estado];
+    var color = (c !== 'gradiente') ? (c || e.color_otro)
+              : (p['año'] === null || p['año'] === undefined) ? e.color_sin_año
+              : rejasColorGradiente(p['año'], e.año_min, e.año_max);
+    return {
+        radius: e.radio, color: e.borde[p.estado] || color, fillColor: color,
+        fill: true, weight: e.peso,
+        opacity: (e.opacidad_por_estado[p.estado] !== undefined) ? e.opacidad_por_estado[p.estado] : e.opacidad,
+        fillOpacity: (e.relleno_por_estado[p.estado] !== undefined) ? e.relleno_por_estado[p.estado] : e.opacidad_relleno
+    };
+}
+
+function rejasPopup(p, cfg, estilo) {
+    var colorEstado = (cfg.color_estado && cfg.color_estado[p.estado]) || estilo.color;
+    var filas = cfg.filas.map(function (f) {
+        var etiqueta = f[0], campo = f[1], v;
+        if (campo === 'estado') {
+            return '<tr><td><b>' + etiqueta + ':</b></td><td style="color: ' + colorEstado +
+                   '; font-weight: bold;">' + p.estado_txt + '</td></tr>';
+        }
+        v = (campo === 'coord') ? p.lat.toFixed(6) + ', ' + p.lon.toFixed(6) : p[campo];
+        if (v === undefined || v === null || String(v).trim() === '') return '';
+        return '<tr><td><b>' + etiqueta + ':</b></td><td>' + v + '</td></tr>';
+    }).join('');
+    return '<div style="font-family: Arial; width: ' + cfg.ancho + 'px;">' +
+           '<h4 style="color: #2c3e50; margin-bottom: 10px;">' + cfg.titulo + ' #' + p.n + '</h4>' +
+           '<table style="width: 100%; font-size: 12px;">' + filas + '</table></div>';
+}
+
+function rejasTexto(plantilla, p) {
+    return plantilla.replace(/\\{([^{}]+)\\}/g, function (_, c) {
+        return (p[c] === null || p[c] === undefined) ? '-' : p[c];
+    });
+}
+
+function rejasCapaPuntos(grupo, d) {
+    var renderer = L.canvas({padding: 0.5});
+    for (var i = 0; i < d.lat.length; i++) {
+        (function (i) {
+            var p = rejasPropiedades(d, i);
+            var estilo = rejasEstilo(p, d.estilo);
+            estilo.renderer = renderer;
+            var m = L.circleMarker([p.lat, p.lon], estilo);
+            if (d.popup) {
+                m.bindPopup(function () {
+                    return rejasPopup(rejasPropiedades(d, i), d.popup, {color: estilo.fillColor});
+                }, {maxWidth: d.popup.ancho + 40});
+            }
+            if (d.tooltip) {
+                m.bindTooltip(function () { return rejasTexto(d.tooltip, rejasPropiedades(d, i)); });
+            }
+            m.addTo(grupo);
+        })(i);
+    }
+}
+</script>
+"""
+
+
+def _columna_json(serie):
+    """(valores, vocabulario) listos para JSON; texto como codigos."""
+    if pd.api.types.is_numeric_dtype(serie) and not pd.api.types.is_bool_dtype(serie):
+        valores = serie.astype(float)
+        if np.all(np.isnan(valores) | (valores == np.round(valores))):
+            return [None if np.isnan(x) else int(x) for x in valores], None
+        return [None if np.isnan(x) else float(x) for x in valores], None
+    texto = serie.astype(object).where(serie.notna(), '').astype(str)
+    codigos, vocab = pd.factorize(texto)
+    return codigos.tolist(), vocab.tolist()
+
+
+class CapaPuntos(Layer):
+    """
+    Capa de puntos (una por grupo de la leyenda) con estilo y popups en JS.
+
+    Parametros:
+    -----------
+    df : DataFrame
+        Con columnas lat, lon, estado y opcionalmente año, fuente, direccion...
+    nombre : str
+        Nombre en el control de capas
+    estilo : dict, opcional
+        Se combina con ESTILO_BASE. Claves extra: opacidad_por_estado,
+        relleno_por_estado (estado -> valor), año_min, año_max (por defecto
+        los del df)
+    popup : dict o None
+        Se combina con POPUP_BASE; None = sin popup
+    tooltip : str, opcional
+        Plantilla con campos entre llaves: n, estado_txt, año, fuente, ...
+    columnas : list, opcional
+        Columnas del df que se escriben (por defecto las que usan el popup y
+        el tooltip)
+    """
+
+    _template = Template(
+        """
+        {% macro script(this, kwargs) %}
+            var {{ this.get_name() }} = L.featureGroup();
+            rejasCapaPuntos({{ this.get_name() }}, {{ this.datos }});
+        {% endmacro %}
+        """
+    )
+
+    def __init__(self, df, nombre=None, estilo=None, popup=None, tooltip=None,
+                 columnas=None, show=True):
+        super().__init__(name=nombre, overlay=True, control=True, show=show)
+        self._name = 'CapaPuntos'
+
+        estilo = {**ESTILO_BASE, **(estilo or {})}
+        if 'año' in df.columns and df['año'].notna().any():
+            estilo.setdefault('año_min', int(df['año'].min()))
+            estilo.setdefault('año_max', int(df['año'].max()))
+        estilo.setdefault('año_min', 0)
+        estilo.setdefault('año_max', 0)
+        estilo.setdefault('opacidad_por_estado', {})
+        estilo.setdefault('relleno_por_estado', {})
+        estilo['nombres'] = NOMBRES_ESTADO
+        popup = {**POPUP_BASE, **popup} if popup is not None else None
+
+        if columnas is None:
+            usadas = {'estado', 'año'}
+            if popup:
+                usadas |= {campo for _, campo in popup['filas']}
+            if tooltip:
+                usadas |= {c for c in df.columns if '{' + c + '}' in tooltip}
+            columnas = [c for c in df.columns if c in usadas and c not in ('lat', 'lon')]
+
+        # Numero de reja = fila del df original + 1 (como idx + 1 en los ciclos)
+        n = np.asarray(df.index) + 1 if pd.api.types.is_integer_dtype(df.index) \
+            else np.arange(1, len(df) + 1)
+        datos = {
+            'n': [int(x) for x in n],
+            'lat': np.round(df['lat'].astype(float).values, 6).tolist(),
+            'lon': np.round(df['lon'].astype(float).values, 6).tolist(),
+            'columnas': {}, 'vocab': {},
+            'estilo': estilo, 'popup': popup, 'tooltip': tooltip,
+        }
+        for c in columnas:
+            valores, vocab = _columna_json(df[c])
+            datos['columnas'][c] = valores
+            if vocab is not None:
+                datos['vocab'][c] = vocab
+        self.n = len(df)
+        self.datos = json.dumps(datos, ensure_ascii=False, separators=(',', ':'))
+
+    def render(self, **kwargs):
+        # Las funciones comunes se agregan una sola vez (mismo nombre de hijo)
+        self.get_root().header.add_child(Element(_JS_COMUN), name='capas_mapa_js')
+        super().render(**kwargs)
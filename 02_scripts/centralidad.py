@@ -0,0 +1,364 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+================================================================================
+CENTRALIDAD - Betweenness de las calles por muestreo (Brandes), con y sin rejas
+================================================================================
+
+El reporte menciona "betweenness centrality" entre sus algoritmos, pero la
+version exacta de NetworkX sobre la red 'all' (~40k nodos) son horas de un
+solo nucleo: un Dijkstra y una acumulacion por cada nodo de origen.
+
+Aqui se usa el algoritmo de Brandes desde una muestra de k pivotes (origenes
+al azar), sobre la red de red_rejas con el largo de las calles:
+
+    - distancias: scipy (Dijkstra en C) para un lote de pivotes a la vez
+    - caminos mas cortos: arcos u->w con d[u] + largo = d[w] (con empates),
+      numero de caminos (sigma) y dependencias (delta) en orden de distancia
+    - estimador: fraccion media de caminos mas cortos que pasan por cada
+      calle (o nodo), delta_s / (n - 1) promediado sobre los pivotes
+
+Cota de error: cada pivote aporta un valor en [0, 1], asi que por Hoeffding,
+con probabilidad 1 - DELTA_CONFIANZA, TODAS las calles quedan a menos de
+sqrt(ln(2m / delta) / (2k)) de su valor exacto (m = numero de calles). Ademas
+se entrega el error estandar de cada calle (desviacion entre pivotes).
+
+Los lotes de pivotes se reparten entre procesos. La red (CSR de las calles
+abiertas) se copia una sola vez a memoria compartida y cada proceso la lee
+sin copiarla.
+
+Modo delta: la misma muestra de pivotes sobre la red sin rejas y con rejas;
+la diferencia por calle muestra hacia donde se desvian los viajes. Para cada
+calle cerrada se reporta el cambio en las calles abiertas cercanas (a menos
+de RADIO_DELTA_M): cuanto ganan y cual gana mas. Con muchas rejas cerradas a
+la vez el cambio es conjunto; se asigna a cada reja por cercania.
+
+Los resultados se guardan en cache_etapas por (hash de la red y de las
+rejas, pivotes, semilla).
+
+USO:
+    from centralidad import betweenness, delta_betweenness
+    from red_rejas import cargar_red_rejas
+
+    rr = cargar_red_rejas()
+    res = betweenness(rr, k=500)        # res['calles'], res['error_max']
+    d = delta_betweenness(rr, k=500)    # d['delta'], d['por_calle_cerrada']
+
+    python centralidad.py 500           # escribe 05_analisis/betweenness_calles.xlsx
+
+AUTOR: Proyecto Rejas La Florida
+FECHA: Enero 2026
+================================================================================
+"""
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+from scipy.sparse import csr_matrix
+from scipy.sparse.csgraph import dijkstra
+from scipy.spatial import cKDTree
+
+from cache_etapas import CacheEtapas, hash_datos
+from proyeccion import a_metros
+
+
+PIVOTES = 500
+DELTA_CONFIANZA = 0.05
+# Pivotes por llamada a dijkstra
+LOTE = 16
+# Vecindad de una calle cerrada para el modo delta
+RADIO_DELTA_M = 300
+# Tolerancia relativa para considerar dos caminos igual de cortos
+TOL = 1e-9
+
+
+# ==============================================================================
+# RED EN ARREGLOS (CSR de arcos abiertos)
+# ==============================================================================
+
+def arcos_abiertos(rr, abiertas=None):
+    """
+    Arcos dirigidos de las calles abiertas, ordenados por nodo de origen.
+
+    Retorna:
+    --------
+    dict de arrays: indptr (n+1), origen, destino, arista, largo (por arco)
+    """
+    abiertas = rr.abiertas(abiertas)
+    arco = abiertas[rr.arista]
+    origen = np.repeat(np.arange(rr.n_nodos), np.diff(rr.indptr))[arco]
+    indptr = np.zeros(rr.n_nodos + 1, dtype=np.int64)
+    np.cumsum(np.bincount(origen, minlength=rr.n_nodos), out=indptr[1:])
+    arista = rr.arista[arco]
+    return {
+        'indptr': indptr,
+        'origen': origen.astype(np.int64),
+        'destino': rr.vecino[arco].astype(np.int64),
+        'arista': arista.astype(np.int64),
+        'largo': np.maximum(rr.largo[arista], 1e-3),
+    }
+
+
+# Arreglos de cada proceso (se fijan una vez con el initializer del pool)
+_RED = {}
+
+
+def _iniciar_proceso(arreglos, n_aristas, memoria=None):
+    """
+    Con `memoria` los arreglos son (nombre del bloque, dtype, forma) de
+    memoria compartida; sin ella, los arreglos mismos.
+    """
+    _RED.clear()
+    bloques = []
+    if memoria:
+        vistas = {}
+        for nombre, (bloque, dtype, forma) in arreglos.items():
+            shm = shared_memory.SharedMemory(name=bloque)
+            bloques.append(shm)
+            vistas[nombre] = np.ndarray(forma, dtype=dtype, buffer=shm.buf)
+        arreglos = vistas
+    n = len(arreglos['indptr']) - 1
+    _RED.update(arreglos)
+    _RED['bloques'] = bloques
+    _RED['n_aristas'] = n_aristas
+    _RED['matriz'] = csr_matrix((arreglos['largo'], arreglos['destino'], arreglos['indptr']),
+                                shape=(n, n))
+
+
+def _acumular(pivotes):
+    """Sumas (y sumas de cuadrados) de las dependencias de varios pivotes."""
+    R = _RED
+    n = len(R['indptr']) - 1
+    s_calle = np.zeros(R['n_aristas'])
+    s2_calle = np.zeros(R['n_aristas'])
+    s_nodo = np.zeros(n)
+    s2_nodo = np.zeros(n)
+    for i in range(0, len(pivotes), LOTE):
+        lote = pivotes[i:i + LOTE]
+        D = dijkstra(R['matriz'], directed=True, indices=lote)
+        for s, d in zip(lote, D):
+            du, dw = d[R['origen']], d[R['destino']]
+            with np.errstate(invalid='ignore'):
+                en_camino = np.isfinite(du) & (np.abs(du + R['largo'] - dw) <= TOL * (1 + dw))
+            arcos = np.flatnonzero(en_camino)
+            arcos = arcos[np.argsort(dw[arcos], kind='stable')]
+            u = R['origen'][arcos].tolist()
+            w = R['destino'][arcos].tolist()
+
+            # Numero de caminos mas cortos (en orden de distancia creciente)
+            sigma = [0.0] * n
+            sigma[s] = 1.0
+            for j in range(len(u)):
+                sigma[w[j]] += sigma[u[j]]
+            # Dependencias (en orden decreciente)
+            delta = [0.0] * n
+            aporte = [0.0] * len(u)
+            for j in range(len(u) - 1, -1, -1):
+                c = sigma[u[j]] / sigma[w[j]] * (1.0 + delta[w[j]])
+                delta[u[j]] += c
+                aporte[j] = c
+            delta[s] = 0.0
+
+            x = np.bincount(R['arista'][arcos], weights=aporte, minlength=R['n_aristas']) / (n - 1)
+            y = np.array(delta) / (n - 1)
+            s_calle += x
+            s2_calle += x * x
+            s_nodo += y
+            s2_nodo += y * y
+    return s_calle, s2_calle, s_nodo, s2_nodo
+
+
+def _en_memoria_compartida(arreglos):
+    """Copia los arreglos a bloques de memoria compartida."""
+    bloques, descripcion = [], {}
+    for nombre, arr in arreglos.items():
+        arr = np.ascontiguousarray(arr)
+        shm = shared_memory.SharedMemory(create=True, size=max(arr.nbytes, 1))
+        np.ndarray(arr.shape, dtype=arr.dtype, buffer=shm.buf)[...] = arr
+        bloques.append(shm)
+        descripcion[nombre] = (shm.name, arr.dtype.str, arr.shape)
+    return bloques, descripcion
+
+
+def _betweenness(rr, abiertas, pivotes, procesos):
+    arreglos = arcos_abiertos(rr, abiertas)
+    lotes = [p.tolist() for p in np.array_split(pivotes, procesos * 4) if len(p)]
+    if procesos == 1:
+        _iniciar_proceso(arreglos, rr.n_aristas)
+        partes = [_acumular(lote) for lote in lotes]
+    else:
+        bloques, descripcion = _en_memoria_compartida(arreglos)
+        try:
+            with ProcessPoolExecutor(procesos, initializer=_iniciar_proceso,
+                                     initargs=(descripcion, rr.n_aristas, True)) as pool:
+                partes = list(pool.map(_acumular, lotes))
+        finally:
+            for shm in bloques:
+                shm.close()
+                shm.unlink()
+    return [sum(p[i] for p in partes) for i in range(4)]
+
+
+def betweenness(rr, k=PIVOTES, abiertas=None, procesos=None, semilla=0,
+                usar_cache=True, pivotes=None, verbose=True):
+    """
+    Betweenness estimada de calles y nodos desde k pivotes al azar.
+
+    Parametros:
+    -----------
+    rr : RedRejas
+        Modelo de red_rejas
+    k : int
+        Numero de pivotes (k >= n_nodos da el valor exacto)
+    abiertas : array bool, opcional
+        Calles abiertas (por defecto ~rr.bloqueada)
+    procesos : int, opcional
+        Procesos en paralelo (por defecto os.cpu_count(); 1 = sin pool)
+    semilla : int
+        Semilla de la muestra de pivotes
+    pivotes : array, opcional
+        Pivotes a usar (ignora k y semilla)
+
+    Retorna:
+    --------
+    dict con:
+        calles, nodos       : fraccion media de caminos mas cortos que pasan
+                              por cada calle / nodo
+        calles_se, nodos_se : error estandar de cada valor
+        error_max           : cota de Hoeffding, comun a todas las calles
+        pivotes
+    """
+    abiertas = rr.abiertas(abiertas)
+    if pivotes is None:
+        rng = np.random.default_rng(semilla)
+        pivotes = (np.arange(rr.n_nodos) if k >= rr.n_nodos
+                   else np.sort(rng.choice(rr.n_nodos, k, replace=False)))
+    pivotes = np.asarray(pivotes, dtype=np.int64)
+    k = len(pivotes)
+    procesos = max(1, min(procesos or os.cpu_count() or 1, k))
+
+    cache = CacheEtapas(activo=usar_cache)
+    dep = {'red': rr.meta['red'], 'bloqueo': rr.con_bloqueo(~abiertas).hash,
+           'pivotes': hash_datos(pivotes)}
+
+    def _calcular():
+        s, s2, sn, s2n = _betweenness(rr, abiertas, pivotes, procesos)
+        return {'s': s, 's2': s2, 'sn': sn, 's2n': s2n}
+    r = cache.obtener('betweenness', dep, _calcular)
+
+    media = r['s'] / k
+    media_n = r['sn'] / k
+    exacto = k >= rr.n_nodos
+    se = np.sqrt(np.maximum(r['s2'] / k - media ** 2, 0) / max(k - 1, 1))
+    se_n = np.sqrt(np.maximum(r['s2n'] / k - media_n ** 2, 0) / max(k - 1, 1))
+    error_max = 0.0 if exacto else float(np.sqrt(np.log(2 * max(rr.n_aristas, 1) / DELTA_CONFIANZA) / (2 * k)))
+    if verbose:
+        origen = 'cache' if cache.aciertos else f'{procesos} procesos'
+        print(f"      Betweenness con {k} pivotes ({origen}); "
+              f"cota de error {error_max:.4f} (confianza {1 - DELTA_CONFIANZA:.0%})")
+    return {
+        'calles': media,
+        'nodos': media_n,
+        'calles_se': np.zeros_like(se) if exacto else se,
+        'nodos_se': np.zeros_like(se_n) if exacto else se_n,
+        'error_max': error_max,
+        'pivotes': pivotes,
+    }
+
+
+def delta_betweenness(rr, k=PIVOTES, procesos=None, semilla=0, radio_m=RADIO_DELTA_M,
+                      usar_cache=True):
+    """
+    Cambio de betweenness por las rejas: con rejas menos sin rejas, con los
+    mismos pivotes en las dos redes.
+
+    Retorna:
+    --------
+    dict con:
+        sin, con           : resultados de betweenness()
+        delta              : con - sin, por calle
+        por_calle_cerrada  : DataFrame, una fila por calle con reja: su
+                             betweenness sin rejas, la ganancia de las calles
+                             abiertas a menos de radio_m y la que gana mas
+    """
+    import pandas as pd
+
+    sin = betweenness(rr, k, abiertas=rr.todas(), procesos=procesos, semilla=semilla,
+                      usar_cache=usar_cache)
+    con = betweenness(rr, abiertas=None, procesos=procesos, pivotes=sin['pivotes'],
+                      usar_cache=usar_cache)
+    delta = con['calles'] - sin['calles']
+
+    # Punto medio de cada calle, en metros
+    xm, ym = a_metros((rr.y[rr.a] + rr.y[rr.b]) / 2, (rr.x[rr.a] + rr.x[rr.b]) / 2)
+    arbol = cKDTree(np.column_stack([xm, ym]))
+    cerradas = np.flatnonzero(rr.bloqueada)
+    vecinas = arbol.query_ball_point(np.column_stack([xm[cerradas], ym[cerradas]]), r=radio_m)
+    filas = []
+    for e, vec in zip(cerradas, vecinas):
+        vec = np.array([v for v in vec if not rr.bloqueada[v]], dtype=np.int64)
+        gana = delta[vec] if len(vec) else np.zeros(0)
+        mejor = vec[np.argmax(gana)] if len(vec) else -1
+        filas.append({
+            'arista': e,
+            'lat': (rr.y[rr.a[e]] + rr.y[rr.b[e]]) / 2,
+            'lon': (rr.x[rr.a[e]] + rr.x[rr.b[e]]) / 2,
+            'betweenness_sin_rejas': sin['calles'][e],
+            'ganancia_vecinas': float(gana[gana > 0].sum()),
+            'calle_que_mas_gana': mejor,
+            'ganancia_maxima': float(gana.max()) if len(gana) else 0.0,
+        })
+    return {'sin': sin, 'con': con, 'delta': delta, 'por_calle_cerrada': pd.DataFrame(filas)}
+
+
+def tabla_calles(rr, d):
+    """DataFrame por calle con la betweenness sin y con rejas y su diferencia."""
+    import pandas as pd
+
+    return pd.DataFrame({
+        'arista': np.arange(rr.n_aristas),
+        'lat': (rr.y[rr.a] + rr.y[rr.b]) / 2,
+        'lon': (rr.x[rr.a] + rr.x[rr.b]) / 2,
+        'bloqueada': rr.bloqueada,
+        'betweenness_sin_rejas': d['sin']['calles'],
+        'betweenness_con_rejas': d['con']['calles'],
+        'delta': d['delta'],
+        'error_std': np.maximum(d['sin']['calles_se'], d['con']['calles_se']),
+    })
+
+
+# ==============================================================================
+# EJECUTAR
+# ==============================================================================
+if __name__ == "__main__":
+    import sys
+    import time
+
+    import pandas as pd
+
+    from red_rejas import cargar_red_rejas
+
+    k = int(sys.argv[1]) if len(sys.argv) > 1 else PIVOTES
+    procesos = int(sys.argv[2]) if len(sys.argv) > 2 else None
+
+    print("=" * 70)
+    print("BETWEENNESS DE LAS CALLES (BRANDES CON MUESTREO)")
+    print("=" * 70)
+    rr = cargar_red_rejas()
+    t0 = time.time()
+    d = delta_betweenness(rr, k=k, procesos=procesos)
+    print(f"      Tiempo: {time.time() - t0:.1f} s")
+
+    calles = tabla_calles(rr, d)
+    sube = calles.sort_values('delta', ascending=False).head(5)
+    print("      Calles que mas absorben trafico por las rejas:")
+    for _, f in sube.iterrows():
+        print(f"        ({f['lat']:.5f}, {f['lon']:.5f})  {f['betweenness_sin_rejas']:.4f} -> "
+              f"{f['betweenness_con_rejas']:.4f}")
+
+    with pd.ExcelWriter('../05_analisis/betweenness_calles.xlsx') as xl:
+        calles.to_excel(xl, sheet_name='calles', index=False)
+        d['por_calle_cerrada'].to_excel(xl, sheet_name='calles_cerradas', index=False)
+    print("      Guardado: ../05_analisis/betweenness_calles.xlsx")
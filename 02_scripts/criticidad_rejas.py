@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+================================================================================
+CRITICIDAD DE REJAS - Ganancia exacta de abrir cada reja cerrada
+================================================================================
+
+El analisis de resiliencia del reporte recalculaba los componentes conexos
+una vez por reja candidata, y por eso evaluo solo "200 rejas (muestra
+aleatoria)".
+
+Abrir UNA reja solo cambia una arista del modelo de red_rejas. Si sus dos
+extremos ya estaban en el mismo componente (la calle no es puente de la red
+bloqueada) no se reconecta nada; si estaban en componentes distintos, esos
+dos componentes se unen. Basta entonces con calcular los componentes una vez,
+con todas las rejas cerradas, y la ganancia de cada reja es una consulta a
+los tamaños de los componentes de sus extremos. Es exacto y vectorizado: las
+~1,400 rejas cerradas se evaluan en milisegundos, sin muestra ni procesos.
+
+Por reja se reporta:
+
+    ganancia_conectividad : nodos que se suman al componente gigante al
+                            abrirla (la metrica del reporte)
+    nodos_reconectados    : tamaño del menor de los dos componentes que une
+    criticidad            : ganancia_conectividad / numero de nodos
+    rejas_en_calle        : rejas cerradas en la misma calle. Si hay mas de
+                            una, abrir solo esta no reabre la calle y su
+                            ganancia es 0; ganancia_calle es la de abrirlas
+                            todas
+
+USO:
+    from criticidad_rejas import tabla_criticidad
+    from red_rejas import cargar_red_rejas
+
+    rr = cargar_red_rejas(tabla=df)
+    tabla = tabla_criticidad(rr, df)
+
+    python criticidad_rejas.py       # escribe 05_analisis/rejas_criticas.xlsx
+
+AUTOR: Proyecto Rejas La Florida
+FECHA: Enero 2026
+================================================================================
+"""
+
+import numpy as np
+
+
+def ganancia_aristas(rr, abiertas=None):
+    """
+    Ganancia de abrir cada arista por separado, con el resto como esta.
+
+    Parametros:
+    -----------
+    rr : RedRejas
+        Modelo de red_rejas
+    abiertas : array bool, opcional
+        Escenario de partida (por defecto, las aristas sin reja)
+
+    Retorna:
+    --------
+    dict de arrays por arista no dirigida:
+        gigante        : nodos que se suman al componente gigante
+        reconectados   : tamaño del menor componente que se une (0 si la
+                         arista ya estaba abierta o no une componentes)
+    """
+    abiertas = rr.abiertas(abiertas)
+    etiquetas = rr.componentes(abiertas)
+    tam = np.bincount(etiquetas)
+    g = tam.max()
+    ca, cb = etiquetas[rr.a], etiquetas[rr.b]
+    une = (ca != cb) & ~abiertas
+    ta, tb = tam[ca], tam[cb]
+    return {
+        'gigante': np.where(une, np.maximum(ta + tb, g) - g, 0),
+        'reconectados': np.where(une, np.minimum(ta, tb), 0),
+    }
+
+
+def criticidad_rejas(rr):
+    """
+    Ganancia de abrir cada reja cerrada del modelo.
+
+    Retorna:
+    --------
+    dict de arrays por reja (en el orden de rr.reja_fila): ganancia,
+    reconectados, criticidad, rejas_en_calle, ganancia_calle
+    """
+    g = ganancia_aristas(rr)
+    e = rr.reja_arista
+    ubicada = e >= 0
+    en_calle = np.bincount(e[ubicada], minlength=rr.n_aristas)
+    n_calle = np.zeros(rr.n_rejas, dtype=np.int64)
+    n_calle[ubicada] = en_calle[e[ubicada]]
+    ganancia_calle = np.zeros(rr.n_rejas, dtype=np.int64)
+    reconectados = np.zeros(rr.n_rejas, dtype=np.int64)
+    ganancia_calle[ubicada] = g['gigante'][e[ubicada]]
+    reconectados[ubicada] = g['reconectados'][e[ubicada]]
+    # Con otra reja en la misma calle, abrir solo esta no cambia nada
+    sola = n_calle == 1
+    ganancia = np.where(sola, ganancia_calle, 0)
+    return {
+        'ganancia': ganancia,
+        'reconectados': np.where(sola, reconectados, 0),
+        'criticidad': ganancia / rr.n_nodos,
+        'rejas_en_calle': n_calle,
+        'ganancia_calle': ganancia_calle,
+    }
+
+
+def tabla_criticidad(rr, df):
+    """
+    DataFrame de rejas_criticas.xlsx: todas las rejas cerradas, de mayor a
+    menor ganancia.
+
+    Parametros:
+    -----------
+    rr : RedRejas
+        Modelo armado desde `df` (cargar_red_rejas(tabla=df))
+    df : pd.DataFrame
+        Base con lat, lon y fuente
+    """
+    import pandas as pd
+
+    c = criticidad_rejas(rr)
+    filas = df.iloc[rr.reja_fila]
+    tabla = pd.DataFrame({
+        'lat': filas['lat'].to_numpy(),
+        'lon': filas['lon'].to_numpy(),
+        'fuente': filas['fuente'].to_numpy() if 'fuente' in df else '',
+        'ganancia_conectividad': c['ganancia'],
+        'criticidad': c['criticidad'],
+        'nodos_reconectados': c['reconectados'],
+        'rejas_en_calle': c['rejas_en_calle'],
+        'ganancia_calle': c['ganancia_calle'],
+    })
+    return tabla.sort_values(['ganancia_conectividad', 'ganancia_calle'], ascending=False,
+                             kind='stable').reset_index(drop=True)
+
+
+def graficar(tabla, ruta):
+    """Histograma de las ganancias (matplotlib es opcional)."""
+    try:
+        import matplotlib
+        matplotlib.use('Agg')
+        import matplotlib.pyplot as plt
+    except ImportError:
+        print("      (sin matplotlib: no se genera el grafico)")
+        return
+    positivas = tabla.loc[tabla['ganancia_conectividad'] > 0, 'ganancia_conectividad']
+    fig, ax = plt.subplots(figsize=(9, 5))
+    ax.hist(positivas, bins=40, color='#c0392b')
+    ax.set_xlabel('Nodos que se suman al componente gigante al abrir la reja')
+    ax.set_ylabel('Rejas')
+    ax.set_title(f"Criticidad de {len(tabla)} rejas cerradas ({len(positivas)} con ganancia > 0)")
+    fig.tight_layout()
+    fig.savefig(ruta, dpi=150)
+    plt.close(fig)
+
+
+# ==============================================================================
+# EJECUTAR
+# ==============================================================================
+if __name__ == "__main__":
+    import time
+
+    from almacen_datos import cargar_tabla
+    from red_rejas import DATOS, cargar_red_rejas
+
+    print("=" * 70)
+    print("CRITICIDAD DE REJAS (TODAS LAS CERRADAS)")
+    print("=" * 70)
+    df = cargar_tabla(DATOS)
+    rr = cargar_red_rejas(tabla=df)
+    t0 = time.time()
+    tabla = tabla_criticidad(rr, df)
+    print(f"      {len(tabla)} rejas evaluadas en {time.time() - t0:.2f} s")
+    print(f"      Con ganancia > 0: {int((tabla['ganancia_conectividad'] > 0).sum())}")
+    print(f"      Compartiendo calle con otra reja: {int((tabla['rejas_en_calle'] > 1).sum())}")
+    print(f"      Ganancia maxima: {int(tabla['ganancia_conectividad'].max())} nodos "
+          f"({tabla['criticidad'].max():.2%})")
+
+    tabla.to_excel('../05_analisis/rejas_criticas.xlsx', index=False)
+    graficar(tabla, '../05_analisis/3_resiliencia.png')
+    print("      Guardado: ../05_analisis/rejas_criticas.xlsx")
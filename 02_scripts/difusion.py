@@ -0,0 +1,251 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+================================================================================
+DIFUSION - Contagio de acceso por la red vial, muchos escenarios a la vez
+================================================================================
+
+El modelo de contagio del reporte ("10 pasos de difusion desde nodos
+abiertos", 2_contagio.png) avanzaba la difusion nodo por nodo en Python, un
+escenario por corrida.
+
+Aqui el estado es una matriz booleana nodos x escenarios: la columna s dice
+que nodos ya tienen acceso en el escenario s. Un paso es un producto matriz
+dispersa x matriz densa sobre la red de red_rejas:
+
+    - si todos los escenarios comparten la red (cambian solo las semillas):
+      frontera' = (A @ frontera) > 0, con A la adyacencia de las calles
+      abiertas
+    - si cada escenario tiene sus propias calles abiertas (columna de una
+      matriz aristas x escenarios): por cada arista se toma el estado de sus
+      dos extremos, se anula donde la arista esta cerrada en ese escenario y
+      se suma a los nodos del otro extremo con la incidencia (nodos x 2E)
+
+Asi cientos de escenarios "que pasa si" (rejas actuales, sin rejas, top-k
+abiertas, la historia de cierres año a año) avanzan en una sola llamada. Los
+escenarios se procesan en bloques de columnas para acotar la memoria.
+
+USO:
+    from difusion import difusion
+    from red_rejas import cargar_red_rejas
+
+    rr = cargar_red_rejas()
+    abiertas = np.column_stack([rr.todas(), ~rr.bloqueada])   # sin / con rejas
+    res = difusion(rr, semillas, abiertas, pasos=10)
+    res['cobertura']       # nodos con acceso por paso y escenario
+    res['llegada']         # paso en que cada nodo recibe acceso (-1 = nunca)
+
+    python difusion.py     # escenarios del reporte, escribe 05_analisis/contagio.xlsx
+
+AUTOR: Proyecto Rejas La Florida
+FECHA: Enero 2026
+================================================================================
+"""
+
+import numpy as np
+from scipy.sparse import csr_matrix
+
+
+PASOS = 10
+# Escenarios por bloque (columnas de la matriz densa en cada producto)
+BLOQUE = 256
+
+
+def incidencia(rr):
+    """Matriz dispersa nodos x 2E: la columna e suma en b y la E + e suma en a."""
+    e = rr.n_aristas
+    filas = np.concatenate([rr.b, rr.a])
+    return csr_matrix((np.ones(2 * e, dtype=np.float32), (filas, np.arange(2 * e))),
+                      shape=(rr.n_nodos, 2 * e))
+
+
+def _difundir_comun(A, frontera, pasos, hasta_estable):
+    """Todos los escenarios con la misma red (adyacencia A)."""
+    alcanzado = frontera.copy()
+    llegada = np.where(frontera, 0, -1).astype(np.int16)
+    cobertura = [alcanzado.sum(axis=0)]
+    paso = 0
+    while paso < pasos and (frontera.any() or not hasta_estable):
+        paso += 1
+        frontera = ((A @ frontera.astype(np.float32)) > 0) & ~alcanzado
+        alcanzado |= frontera
+        llegada[frontera] = paso
+        cobertura.append(alcanzado.sum(axis=0))
+        if hasta_estable and not frontera.any():
+            break
+    return llegada, np.array(cobertura)
+
+
+def _difundir_mascaras(rr, M, abiertas, frontera, pasos, hasta_estable):
+    """Cada escenario con sus calles abiertas (abiertas: aristas x escenarios)."""
+    alcanzado = frontera.copy()
+    llegada = np.where(frontera, 0, -1).astype(np.int16)
+    cobertura = [alcanzado.sum(axis=0)]
+    paso = 0
+    while paso < pasos and (frontera.any() or not hasta_estable):
+        paso += 1
+        # Estado de los extremos de cada arista, solo donde esta abierta
+        envio = np.concatenate([frontera[rr.a] & abiertas, frontera[rr.b] & abiertas])
+        frontera = ((M @ envio.astype(np.float32)) > 0) & ~alcanzado
+        alcanzado |= frontera
+        llegada[frontera] = paso
+        cobertura.append(alcanzado.sum(axis=0))
+        if hasta_estable and not frontera.any():
+            break
+    return llegada, np.array(cobertura)
+
+
+def difusion(rr, semillas, abiertas=None, pasos=PASOS, hasta_estable=False, bloque=BLOQUE):
+    """
+    Difusion por pasos desde las semillas, para varios escenarios a la vez.
+
+    Parametros:
+    -----------
+    rr : RedRejas
+        Modelo de red_rejas
+    semillas : array bool (n_nodos,) o (n_nodos, S)
+        Nodos con acceso al inicio; una columna por escenario o una para todos
+    abiertas : array bool, opcional
+        Calles abiertas: (n_aristas,) comun a todos los escenarios o
+        (n_aristas, S) una columna por escenario. Por defecto ~rr.bloqueada
+    pasos : int
+        Pasos de difusion (cada paso avanza una calle)
+    hasta_estable : bool
+        Cortar antes si ningun escenario avanza (la cobertura queda con
+        menos filas)
+    bloque : int
+        Escenarios por producto
+
+    Retorna:
+    --------
+    dict con:
+        llegada   : int16 (n_nodos, S), paso en que el nodo recibe acceso
+                    (0 = semilla, -1 = nunca)
+        cobertura : (pasos + 1, S) nodos con acceso despues de cada paso
+    """
+    semillas = np.asarray(semillas, dtype=bool)
+    abiertas = rr.abiertas(abiertas)
+    if semillas.ndim == 1:
+        semillas = semillas[:, None]
+    n_esc = max(semillas.shape[1], abiertas.shape[1] if abiertas.ndim == 2 else 1)
+    if semillas.shape[1] not in (1, n_esc) or (abiertas.ndim == 2 and abiertas.shape[1] not in (1, n_esc)):
+        raise ValueError("semillas y abiertas deben tener 1 o S columnas")
+
+    comun = abiertas.ndim == 1 or abiertas.shape[1] == 1
+    if comun:
+        A = rr.matriz(abiertas.reshape(-1)).astype(np.float32)
+    else:
+        M = incidencia(rr)
+
+    llegadas, coberturas = [], []
+    for i in range(0, n_esc, bloque):
+        cols = slice(i, min(i + bloque, n_esc))
+        ancho = cols.stop - cols.start
+        f = semillas[:, cols] if semillas.shape[1] > 1 else np.repeat(semillas, ancho, axis=1)
+        if comun:
+            ll, cob = _difundir_comun(A, f, pasos, hasta_estable)
+        else:
+            ll, cob = _difundir_mascaras(rr, M, abiertas[:, cols], f, pasos, hasta_estable)
+        llegadas.append(ll)
+        coberturas.append(cob)
+    # Con hasta_estable los bloques pueden cortar en pasos distintos: se
+    # completa con la ultima fila (la cobertura ya no cambia)
+    n_filas = max(len(c) for c in coberturas)
+    coberturas = [np.vstack([c] + [c[-1:]] * (n_filas - len(c))) for c in coberturas]
+    return {'llegada': np.hstack(llegadas), 'cobertura': np.hstack(coberturas)}
+
+
+def escenarios_rejas(rr, abrir=None):
+    """
+    Matriz aristas x escenarios con los escenarios base del reporte.
+
+    Parametros:
+    -----------
+    abrir : dict nombre -> aristas, opcional
+        Escenarios extra: las rejas actuales con esas calles abiertas (p. ej.
+        el portafolio de portafolio_rejas)
+
+    Retorna:
+    --------
+    (nombres, abiertas)
+    """
+    nombres = ['sin_rejas', 'con_rejas']
+    columnas = [rr.todas(), ~rr.bloqueada]
+    for nombre, aristas in (abrir or {}).items():
+        m = ~rr.bloqueada
+        m[np.asarray(aristas, dtype=np.int64)] = True
+        nombres.append(nombre)
+        columnas.append(m)
+    return nombres, np.column_stack(columnas)
+
+
+def graficar(nombres, cobertura, n_nodos, ruta):
+    """Cobertura por paso de cada escenario (matplotlib es opcional)."""
+    try:
+        import matplotlib
+        matplotlib.use('Agg')
+        import matplotlib.pyplot as plt
+    except ImportError:
+        print("      (sin matplotlib: no se genera el grafico)")
+        return
+    fig, ax = plt.subplots(figsize=(9, 5))
+    for j, nombre in enumerate(nombres):
+        ax.plot(cobertura[:, j] / n_nodos * 100, marker='o', label=nombre)
+    ax.set_xlabel('Paso de difusion')
+    ax.set_ylabel('% de nodos con acceso')
+    ax.set_title('Difusion de acceso desde los puntos abiertos')
+    ax.legend()
+    fig.tight_layout()
+    fig.savefig(ruta, dpi=150)
+    plt.close(fig)
+
+
+# ==============================================================================
+# EJECUTAR
+# ==============================================================================
+if __name__ == "__main__":
+    import sys
+    import time
+
+    import pandas as pd
+
+    from accesibilidad import nodos_cercanos
+    from almacen_datos import cargar_tabla
+    from portafolio_rejas import portafolio
+    from red_rejas import DATOS, cargar_red_rejas
+
+    pasos = int(sys.argv[1]) if len(sys.argv) > 1 else PASOS
+
+    print("=" * 70)
+    print(f"DIFUSION DE ACCESO ({pasos} pasos)")
+    print("=" * 70)
+    df = cargar_tabla(DATOS)
+    rr = cargar_red_rejas(tabla=df)
+    abiertos = df[df['estado'] == 1]
+    semillas = np.zeros(rr.n_nodos, dtype=bool)
+    semillas[nodos_cercanos(rr, abiertos['lat'].to_numpy(), abiertos['lon'].to_numpy())[0]] = True
+    print(f"      {int(semillas.sum())} nodos semilla ({len(abiertos)} puntos abiertos)")
+
+    calles = portafolio(rr, k=50)['calles']
+    nombres, abiertas = escenarios_rejas(rr, {'top_15': calles[:15], 'top_50': calles[:50]})
+    # Ademas: cada calle bloqueada abierta por separado (un escenario por calle)
+    bloqueadas = np.flatnonzero(rr.bloqueada)
+    individuales = np.repeat((~rr.bloqueada)[:, None], len(bloqueadas), axis=1)
+    individuales[bloqueadas, np.arange(len(bloqueadas))] = True
+
+    t0 = time.time()
+    res = difusion(rr, semillas, np.hstack([abiertas, individuales]), pasos=pasos)
+    print(f"      {res['cobertura'].shape[1]} escenarios en {time.time() - t0:.2f} s")
+
+    cob = res['cobertura'][:, :len(nombres)]
+    for nombre, final in zip(nombres, cob[-1]):
+        print(f"      {nombre:<10} {int(final):>6} nodos con acceso ({final / rr.n_nodos:.1%})")
+    ganancia = res['cobertura'][-1, len(nombres):] - cob[-1, 1]
+    print(f"      Calles que por si solas suman acceso: {int((ganancia > 0).sum())} "
+          f"(maximo {int(ganancia.max()) if len(ganancia) else 0} nodos)")
+
+    tabla = pd.DataFrame(cob, columns=nombres)
+    tabla.insert(0, 'paso', np.arange(len(tabla)))
+    tabla.to_excel('../05_analisis/contagio.xlsx', index=False)
+    graficar(nombres, cob, rr.n_nodos, '../05_analisis/2_contagio.png')
+    print("      Guardado: ../05_analisis/contagio.xlsx")
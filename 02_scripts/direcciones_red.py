@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+================================================================================
+DIRECCIONES DESDE LA RED - Reverse geocoding offline con los nombres de OSM
+================================================================================
+
+Cada arista de la red vial ya trae el tag `name` de OSM. Para la mayoria de
+las rejas basta con eso: se proyecta el punto sobre la calle con nombre mas
+cercana (snap_vial, con un indice de solo esas aristas: un pasaje o acceso
+sin nombre al lado no debe esconder la calle) y se leen, sin ninguna
+consulta HTTP:
+
+    calle  : nombre de la arista donde quedo el punto
+    cruce  : otra calle que llega a la interseccion mas cercana (el extremo
+             u o v de la arista segun la posicion del punto en ella)
+    comuna : la del lugar con que se descargo la red
+
+Solo los puntos que quedaron a mas de dist_max_m de una calle con nombre se
+mandan a Nominatim (geocodificacion.geocodificar), si se pide.
+
+USO:
+    from red_vial import cargar_red
+    from snap_vial import indice_aristas
+    from direcciones_red import direcciones_offline
+
+    red = cargar_red(network_type='all')
+    res = direcciones_offline(indice_aristas(red), df['lat'], df['lon'])
+    res['direccion'], res['calle'], res['cruce'], res['comuna']
+
+AUTOR: Proyecto Rejas La Florida
+FECHA: Enero 2026
+================================================================================
+"""
+
+import numpy as np
+from shapely import STRtree
+
+from geocodificacion import SIN_DIRECCION, geocodificar
+from snap_vial import snap_puntos
+
+
+# Mas lejos que esto de una calle con nombre se considera que el punto no
+# esta sobre la red (o la red no lo cubre) y se usa el fallback
+DIST_MAX_M = 50
+
+
+def nombres_calles(red):
+    """
+    Vocabulario de nombres para mostrar y codigo de cada arista.
+
+    En OSM un `name` puede ser lista (se guardo como "A;B"); se usa el primero.
+    El codigo 0 es siempre "sin nombre".
+    """
+    visibles = [str(n).split(';')[0].strip() for n in red.nombre_vocab]
+    vocab, codigo_vocab = np.unique([''] + visibles, return_inverse=True)
+    # np.unique ordena y '' queda primero, asi que su codigo es 0
+    return vocab, codigo_vocab[1:][np.asarray(red.nombre_cod)]
+
+
+def indice_con_nombre(indice):
+    """
+    El indice de snap_vial.indice_aristas restringido a las aristas con nombre.
+
+    Se arma una vez y queda guardado en el mismo indice ('con_nombre').
+    """
+    if 'con_nombre' not in indice:
+        _, cod_arista = nombres_calles(indice['red'])
+        m = cod_arista[indice['aristas']] > 0
+        geometrias = indice['geometrias'][m]
+        indice['con_nombre'] = {
+            'arbol': STRtree(geometrias),
+            'geometrias': geometrias,
+            'aristas': indice['aristas'][m],
+            'largo_m': indice['largo_m'][m],
+            'red': indice['red'],
+        }
+    return indice['con_nombre']
+
+
+def _nombres_por_nodo(red, cod_arista, n_max=3):
+    """
+    Hasta n_max nombres distintos (no vacios) de las calles que tocan cada nodo.
+
+    Retorna una matriz (n_nodos, n_max) de codigos, 0 = no hay.
+    """
+    n = red.n_nodos
+    nodo = np.concatenate([np.asarray(red.u), np.asarray(red.v)]).astype(np.int64)
+    cod = np.concatenate([cod_arista, cod_arista]).astype(np.int64)
+    con_nombre = cod > 0
+    pares = np.unique(nodo[con_nombre] * (cod.max() + 1) + cod[con_nombre])
+    nodo_p, cod_p = pares // (cod.max() + 1), pares % (cod.max() + 1)
+
+    # Posicion de cada par dentro de su nodo (pares viene ordenado por nodo)
+    inicio = np.searchsorted(nodo_p, nodo_p, side='left')
+    rango = np.arange(len(nodo_p)) - inicio
+    tabla = np.zeros((n, n_max), dtype=np.int64)
+    ok = rango < n_max
+    tabla[nodo_p[ok], rango[ok]] = cod_p[ok]
+    return tabla
+
+
+def _cruce(tabla, nodo, calle):
+    """Primer nombre en el nodo distinto de la calle (0 si no hay)."""
+    candidatos = tabla[nodo]
+    validos = (candidatos > 0) & (candidatos != calle[:, None])
+    primero = np.argmax(validos, axis=1)
+    return np.where(validos.any(axis=1), candidatos[np.arange(len(nodo)), primero], 0)
+
+
+def comuna_de_red(red):
+    """Comuna del lugar con que se descargo la red ("La Florida, Santiago, ...")."""
+    lugar = red.meta.get('lugar', '')
+    if not lugar or lugar[0].isdigit() or lugar[0] == '-':
+        return None      # red descargada por coordenadas
+    return lugar.split(',')[0].strip()
+
+
+def direcciones_offline(indice, lat, lon, arista=None, fraccion=None, dist_m=None,
+                        dist_max_m=DIST_MAX_M, fallback=False, **kw_geocodificar):
+    """
+    Calle, cruce y comuna de cada punto usando solo la red vial.
+
+    Parametros:
+    -----------
+    indice : dict
+        Resultado de snap_vial.indice_aristas
+    lat, lon : array
+        Coordenadas (originales o ya ajustadas)
+    arista, fraccion, dist_m : array, opcional
+        Si los puntos ya se ajustaron (snap_to_road), el indice de arista, la
+        posicion en ella y la distancia del ajuste; asi solo se vuelven a
+        proyectar los que quedaron en una calle sin nombre
+    dist_max_m : float
+        Puntos mas lejos que esto de una calle con nombre quedan sin resolver
+    fallback : bool
+        Resolver esos puntos con Nominatim (geocodificacion.geocodificar,
+        con los parametros extra kw_geocodificar)
+
+    Retorna:
+    --------
+    dict de arrays (uno por punto):
+        direccion : "calle, comuna" (mismo formato que geocodificar)
+        calle, cruce, comuna : str ('' si no hay)
+        dist_m    : distancia a la calle
+        offline   : bool, True si se resolvio sin consultas HTTP
+    """
+    red = indice['red']
+    lat = np.asarray(lat, dtype=np.float64)
+    lon = np.asarray(lon, dtype=np.float64)
+    vocab, cod_arista = nombres_calles(red)
+
+    if arista is None:
+        res = snap_puntos(indice_con_nombre(indice), lat, lon)
+        arista, fraccion, dist_m = res['arista'], res['fraccion'], res['dist_m']
+    else:
+        arista = np.array(arista, dtype=np.int64)
+        fraccion = np.array(fraccion, dtype=np.float64)
+        dist_m = np.zeros(len(arista)) if dist_m is None else np.array(dist_m, dtype=np.float64)
+        # Ajustados a una calle sin nombre: la calle con nombre mas cercana
+        sin_nombre = (arista < 0) | (cod_arista[np.maximum(arista, 0)] == 0)
+        if sin_nombre.any():
+            res = snap_puntos(indice_con_nombre(indice), lat[sin_nombre], lon[sin_nombre],
+                              dist_max_m=dist_max_m)
+            arista[sin_nombre] = res['arista']
+            fraccion[sin_nombre] = res['fraccion']
+            dist_m[sin_nombre] = res['dist_m']
+
+    ok = arista >= 0
+    e = np.where(ok, arista, 0)
+    calle = np.where(ok, cod_arista[e], 0)
+
+    # Interseccion mas cercana: el extremo de la arista hacia donde esta el punto
+    u, v = np.asarray(red.u)[e], np.asarray(red.v)[e]
+    cerca = np.where(np.nan_to_num(fraccion) <= 0.5, u, v)
+    lejos = np.where(np.nan_to_num(fraccion) <= 0.5, v, u)
+    tabla = _nombres_por_nodo(red, cod_arista)
+    cruce = _cruce(tabla, cerca, calle)
+    cruce = np.where(cruce > 0, cruce, _cruce(tabla, lejos, calle))
+    cruce = np.where(ok, cruce, 0)
+
+    comuna = comuna_de_red(red) or ''
+    offline = ok & (calle > 0) & (dist_m <= dist_max_m)
+    calle_txt = vocab[calle]
+    direccion = np.full(len(lat), SIN_DIRECCION, dtype=object)
+    direccion[offline] = [f"{c}, {comuna}" if comuna else c for c in calle_txt[offline]]
+
+    if fallback and (~offline).any():
+        direccion[~offline] = geocodificar(lat[~offline], lon[~offline], **kw_geocodificar)
+
+    return {
+        'direccion': direccion,
+        'calle': np.where(offline, calle_txt, ''),
+        'cruce': np.where(offline, vocab[cruce], ''),
+        'comuna': np.where(offline, comuna, ''),
+        'dist_m': dist_m,
+        'offline': offline,
+    }
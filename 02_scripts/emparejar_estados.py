@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Emparejamiento de puntos candidatos con el estado de la reja clasificada mas
+cercana, en metros y en una sola consulta vectorizada.
+
+Reemplaza el ciclo del paso "[4/5] Determinando estados" de los generadores
+(tree.query([lat, lon]) punto a punto + df.iloc[idx]) y el umbral en grados
+30 / 111000, que en longitud equivale a ~26 m a -33.5° de latitud.
+
+Ademas del estado, reporta:
+    - empate    : dos o mas puntos clasificados a la misma distancia minima
+    - conflicto : dentro del radio hay puntos con estados distintos
+"""
+
+import numpy as np
+from scipy.spatial import cKDTree
+
+from proyeccion import a_metros
+
+
+ESTADOS_TXT = {0: 'cerrada', 1: 'abierta', 2: 'otro'}
+SIN_ESTADO = -1
+
+
+def emparejar_estados(lat, lon, lat_ref, lon_ref, estados_ref, radio_m=30,
+                      k=16, tolerancia_empate_m=0.01):
+    """
+    Asigna a cada punto el estado del punto de referencia mas cercano.
+
+    Parametros:
+    -----------
+    lat, lon : array
+        Puntos a clasificar (p.ej. nodos de OSM)
+    lat_ref, lon_ref, estados_ref : array
+        Puntos ya clasificados y su estado (0, 1, 2)
+    radio_m : float
+        Distancia maxima en metros para heredar un estado
+    k : int
+        Vecinos revisados por punto para detectar empates y conflictos
+    tolerancia_empate_m : float
+        Diferencia de distancia bajo la cual dos vecinos se consideran empate
+
+    Retorna:
+    --------
+    dict de arrays (uno por punto):
+        estado     : int8, estado heredado o SIN_ESTADO (-1)
+        indice     : int64, fila del punto de referencia o -1
+        dist_m     : float64, distancia al mas cercano (inf si fuera del radio)
+        n_vecinos  : int64, puntos de referencia dentro del radio
+        empate     : bool
+        conflicto  : bool
+    """
+    estados_ref = np.asarray(estados_ref)
+    xq, yq = a_metros(lat, lon)
+    xr, yr = a_metros(lat_ref, lon_ref)
+    consulta = np.column_stack([xq, yq])
+    arbol = cKDTree(np.column_stack([xr, yr]))
+
+    k = max(1, min(k, len(estados_ref)))
+    dist, idx = arbol.query(consulta, k=k, distance_upper_bound=radio_m, workers=-1)
+    if k == 1:
+        dist, idx = dist[:, None], idx[:, None]
+
+    valido = np.isfinite(dist)
+    dentro = valido[:, 0]
+    # cKDTree marca "sin vecino" con idx == len(ref); se recorta para indexar
+    idx_seguro = np.minimum(idx, len(estados_ref) - 1)
+    estados_vecinos = np.where(valido, estados_ref[idx_seguro], SIN_ESTADO)
+
+    estado = np.where(dentro, estados_vecinos[:, 0], SIN_ESTADO).astype(np.int8)
+    indice = np.where(dentro, idx[:, 0], -1).astype(np.int64)
+
+    if k > 1:
+        diferencia = np.subtract(dist[:, 1], dist[:, 0], where=valido[:, 1],
+                                 out=np.full(len(dist), np.inf))
+        empate = dentro & (diferencia <= tolerancia_empate_m)
+        conflicto = dentro & (valido & (estados_vecinos != estado[:, None])).any(axis=1)
+    else:
+        empate = np.zeros(len(estado), dtype=bool)
+        conflicto = np.zeros(len(estado), dtype=bool)
+
+    n_vecinos = arbol.query_ball_point(consulta, r=radio_m, return_length=True, workers=-1)
+
+    return {
+        'estado': estado,
+        'indice': indice,
+        'dist_m': dist[:, 0],
+        'n_vecinos': np.asarray(n_vecinos, dtype=np.int64),
+        'empate': empate,
+        'conflicto': conflicto,
+    }
+
+
+def estados_texto(estado, sin_estado='pending'):
+    """Convierte el arreglo de estados numericos a los textos del clasificador."""
+    tabla = np.array([sin_estado, ESTADOS_TXT[0], ESTADOS_TXT[1], ESTADOS_TXT[2]])
+    return tabla[np.asarray(estado) + 1].tolist()
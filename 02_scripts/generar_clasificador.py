@@ -1,104 +1,269 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 """
-Genera el Clasificador Interactivo con los datos de intersecciones faltantes.
+================================================================================
+GENERAR CLASIFICADOR - Un solo generador parametrizado con cache de etapas
+================================================================================
+
+Antes habia cinco generadores casi iguales (este, _completo, _v3, _v4 y
+_todos), cada uno con su ciclo de filtrado y, algunos, con su propia copia de
+la plantilla HTML. Ahora un clasificador se define por:
+
+    regla   : regla de seleccion_nodos (que nodos se muestran)
+    radio_m : radio para heredar el estado de los puntos ya clasificados
+    perfil  : textos, clave de la bitacora, tamaños y si se muestran solo
+              los pendientes (PERFILES)
+
+y se arma en etapas guardadas en cache_etapas, con clave:
+
+    seleccion : (hash de la red, regla)
+    estados   : (hash de la red, hash de los datos, regla, radio)
+    ruta      : lo anterior + orden y numero de paquetes
+
+Si cambian los datos se reutiliza la seleccion; si cambia la regla se
+recalcula desde la seleccion. La red (red_vial) y la tabla (almacen_datos)
+ya tienen su propio snapshot local, asi que volver a generar toma segundos.
+
+Los scripts generar_clasificador_{completo,v3,v4,todos}.py quedan como atajos
+a su perfil.
+
+USO:
+    python generar_clasificador.py                     # perfil 'faltantes'
+    python generar_clasificador.py cruces
+    python generar_clasificador.py todos --regla no_cruces --radio 20
+    python generar_clasificador.py todos --sin-cache
+
+    from generar_clasificador import generar
+    generar('pasajes', radio_m=25)
+
+AUTOR: Proyecto Rejas La Florida
+FECHA: Enero 2026
+================================================================================
 """
 
-import pandas as pd
-import osmnx as ox
-from scipy.spatial import cKDTree
-import json
-
-print("="*70)
-print("GENERANDO CLASIFICADOR INTERACTIVO")
-print("="*70)
-
-# 1. Cargar datos clasificados
-print("\n[1/4] Cargando datos existentes...")
-df = pd.read_excel('../03_datos_procesados/Base_Combinada_Snapped_v2.xlsx')
-print(f"      {len(df)} puntos clasificados")
-
-# 2. Descargar red vial
-print("\n[2/4] Descargando red vial de La Florida...")
-G = ox.graph_from_place("La Florida, Santiago, Chile", network_type='all', simplify=True)
-print(f"      {len(G.nodes)} nodos, {len(G.edges)} aristas")
-
-# 3. Identificar intersecciones residenciales faltantes
-print("\n[3/4] Identificando intersecciones sin clasificar...")
-
-tipos_residenciales = {'residential', 'living_street'}
-nodos_residenciales = set()
-
-for u, v, data in G.edges(data=True):
-    highway = data.get('highway', '')
-    tipos = set(highway) if isinstance(highway, list) else {highway}
-    if tipos & tipos_residenciales:
-        nodos_residenciales.add(u)
-        nodos_residenciales.add(v)
-
-# Filtrar intersecciones (grado > 1)
-intersecciones = []
-for node in nodos_residenciales:
-    if G.degree(node) > 1:
-        data = G.nodes[node]
-        intersecciones.append({
-            'lat': data['y'],
-            'lon': data['x'],
-            'grado': G.degree(node)
-        })
-
-print(f"      {len(intersecciones)} intersecciones residenciales")
-
-# Filtrar las que ya tienen clasificación
-tree = cKDTree(df[['lat', 'lon']].values)
-umbral = 30 / 111000
-
-faltantes = []
-for inter in intersecciones:
-    dist, _ = tree.query([inter['lat'], inter['lon']])
-    if dist > umbral:
-        faltantes.append(inter)
-
-print(f"      {len(faltantes)} sin clasificar")
-
-# 4. Generar HTML
-print("\n[4/4] Generando HTML...")
-
-# Leer template
-with open('../04_mapas_html/Clasificador_Interactivo.html', 'r', encoding='utf-8') as f:
-    template = f.read()
-
-# Calcular centro
-centro_lat = sum(i['lat'] for i in faltantes) / len(faltantes)
-centro_lon = sum(i['lon'] for i in faltantes) / len(faltantes)
-
-# Generar datos JavaScript
-datos_js = json.dumps(faltantes, indent=12)
-
-# Reemplazar placeholder y centro
-html_final = template.replace(
-    '// DATOS_PLACEHOLDER - Será reemplazado por Python',
-    datos_js[1:-1]  # Quitar corchetes externos
-)
-
-html_final = html_final.replace(
-    "centro: [-33.52, -70.60]",
-    f"centro: [{centro_lat:.6f}, {centro_lon:.6f}]"
-)
-
-# Guardar
-output_path = '../04_mapas_html/Clasificador_Rejas.html'
-with open(output_path, 'w', encoding='utf-8') as f:
-    f.write(html_final)
-
-print(f"\n{'='*70}")
-print("CLASIFICADOR GENERADO")
-print("="*70)
-print(f"  Archivo: {output_path}")
-print(f"  Puntos a clasificar: {len(faltantes)}")
-print(f"\n  Instrucciones:")
-print(f"  1. Abrir el archivo HTML en un navegador")
-print(f"  2. Hacer clic en los puntos naranjas")
-print(f"  3. Seleccionar si está cerrada o abierta")
-print(f"  4. Al terminar, exportar las clasificaciones")
-print("="*70)
+import os
+import time
+
+import numpy as np
+
+from almacen_datos import cargar_tabla
+from cache_etapas import CacheEtapas, hash_datos
+from emparejar_estados import emparejar_estados, estados_texto
+from plantilla_clasificador import escribir_teselas, html_clasificador
+from red_vial import cargar_red
+from ruta_clasificacion import ruta_pendientes
+from seleccion_nodos import REGLAS, seleccionar_nodos
+
+
+DATOS = '../03_datos_procesados/Base_Combinada_Snapped_v2.xlsx'
+LUGAR = "La Florida, Santiago, Chile"
+SALIDA = '../04_mapas_html/Clasificador_Rejas.html'
+
+# Dibujo de los puntos: 'canvas' (rapido con miles de puntos) o 'svg'
+RENDER = 'canvas'
+
+# Orden de visita de los pendientes ('vecino' o 'hilbert') y numero de
+# paquetes de trabajo (uno por encuestador)
+ORDEN_RUTA = 'vecino'
+N_PAQUETES = 4
+
+# Datos de los puntos: 'teselas' (archivos binarios que el navegador pide
+# segun la vista; abrir con un servidor HTTP) o 'inline' (dentro del HTML)
+FORMATO_DATOS = 'teselas'
+DIR_TESELAS = 'Clasificador_Rejas_teselas'
+
+RADIO_M = 30
+
+# Perfiles de salida. 'clave' es la de cada generador anterior: los cambios
+# guardados en el navegador con la version vieja se migran a la bitacora
+PERFILES = {
+    'faltantes': {
+        'titulo': "INTERSECCIONES SIN CLASIFICAR",
+        'regla': 'intersecciones_residenciales',
+        'solo_pendientes': True,
+        'clave': 'clasificaciones_rejas',
+        'etiqueta': 'Punto',
+        'instrucciones': """Haz clic en los puntos <span style="color:#f39c12;">naranjas</span> para clasificarlos como cerrados o abiertos.""",
+        'radio_pendiente': 8, 'radio': 6, 'zoom_siguiente': 17,
+    },
+    'completo': {
+        'titulo': "CLASIFICADOR COMPLETO",
+        'regla': 'intersecciones_residenciales',
+        'solo_pendientes': False,
+        'clave': 'clasificaciones_rejas_v2',
+        'etiqueta': 'Punto',
+        'instrucciones': """Haz clic en los puntos para clasificarlos.<br>
+            <span style="color:#f39c12;">Naranjas</span> = pendientes<br>
+            Los demas ya tienen clasificacion previa.""",
+        'radio_pendiente': 8, 'radio': 6, 'zoom_siguiente': 17,
+    },
+    'pasajes': {
+        'titulo': "INICIOS DE PASAJE",
+        'regla': 'inicios_pasaje',
+        'solo_pendientes': False,
+        'clave': 'clasificaciones_rejas_v3',
+        'etiqueta': 'Inicio de Pasaje',
+        'instrucciones': """<strong>Inicios de pasaje:</strong> donde calle residencial conecta con calle principal.<br><br>
+            Haz clic en los puntos <span style="color:#f39c12;">naranjas</span> para clasificarlos.""",
+        'radio_pendiente': 8, 'radio': 6, 'zoom_siguiente': 17,
+    },
+    'cruces': {
+        'titulo': "CRUCES RESIDENCIALES",
+        'regla': 'cruces_residenciales',
+        'solo_pendientes': False,
+        'clave': 'rejas_v4',
+        'etiqueta': 'Cruce',
+        'instrucciones': """<strong>Cruces de calles residenciales</strong><br>
+            Puntos <span style="color:#f39c12;">naranjas</span> = pendientes""",
+        'radio_pendiente': 8, 'radio': 6, 'zoom_siguiente': 17,
+    },
+    'todos': {
+        'titulo': "TODOS LOS NODOS CERRABLES",
+        'regla': 'cerrables',
+        'solo_pendientes': False,
+        'clave': 'rejas_all',
+        'etiqueta': 'Punto',
+        'instrucciones': """<strong>Todos los puntos cerrables</strong><br>
+            (excluye cruces de calles principales)<br><br>
+            <span style="color:#f39c12">Naranjas</span> = pendientes""",
+        'radio_pendiente': 7, 'radio': 5, 'zoom_siguiente': 18,
+    },
+}
+
+
+def generar(perfil='faltantes', regla=None, radio_m=RADIO_M, salida=SALIDA,
+            datos=DATOS, usar_cache=True):
+    """
+    Genera el HTML del clasificador (y sus teselas).
+
+    Parametros:
+    -----------
+    perfil : str
+        Nombre en PERFILES
+    regla : str, opcional
+        Regla de seleccion_nodos; por defecto la del perfil
+    radio_m : float
+        Radio para heredar estados de los puntos clasificados
+    salida : str
+        Ruta del HTML; las teselas van en DIR_TESELAS junto a el
+    datos : str
+        Excel (o tabla del almacen) con lat, lon, estado
+    usar_cache : bool
+        Con False se recalculan todas las etapas
+
+    Retorna:
+    --------
+    dict con puntos, estados (resultado de emparejar_estados), ruta y
+    cache (etapas leidas del disco)
+    """
+    if perfil not in PERFILES:
+        raise ValueError(f"Perfil desconocido: {perfil!r}. Opciones: {', '.join(PERFILES)}")
+    p = PERFILES[perfil]
+    regla = regla or p['regla']
+    radio_m = float(radio_m)
+    if regla not in REGLAS:
+        raise ValueError(f"Regla desconocida: {regla!r}. Opciones: {', '.join(REGLAS)}")
+    cache = CacheEtapas(activo=usar_cache)
+    t0 = time.time()
+
+    print("=" * 70)
+    print(f"CLASIFICADOR - {p['titulo']}")
+    print("=" * 70)
+    print(f"      Perfil: {perfil} | Regla: {regla} | Radio: {radio_m} m")
+
+    # 1. Datos y red (snapshots locales)
+    print("\n[1/5] Cargando datos y red vial...")
+    df = cargar_tabla(datos)
+    ref_lat = df['lat'].to_numpy(dtype=np.float64)
+    ref_lon = df['lon'].to_numpy(dtype=np.float64)
+    ref_estado = df['estado'].to_numpy()
+    h_datos = hash_datos(ref_lat, ref_lon, ref_estado.astype(np.float64))
+    red = cargar_red(LUGAR, network_type='all', simplify=True)
+    print(f"      {len(df)} puntos clasificados (hash {h_datos[:8]})")
+    print(f"      {red.n_nodos} nodos (hash {red.hash[:8]})")
+
+    # 2. Seleccion de nodos
+    print("\n[2/5] Seleccionando nodos...")
+    dep = {'red': red.hash, 'regla': regla}
+    idx = cache.obtener('seleccion', dep,
+                        lambda: {'idx': seleccionar_nodos(red, regla)})['idx']
+    lat = np.asarray(red.y, dtype=np.float64)[idx]
+    lon = np.asarray(red.x, dtype=np.float64)[idx]
+    print(f"      {len(idx)} nodos ({REGLAS[regla][0]})")
+
+    # 3. Estados heredados
+    print("\n[3/5] Determinando estados...")
+    dep = dict(dep, datos=h_datos, radio_m=radio_m)
+    emp = cache.obtener('estados', dep, lambda: emparejar_estados(
+        lat, lon, ref_lat, ref_lon, ref_estado, radio_m=radio_m))
+    n_con = int((emp['estado'] >= 0).sum())
+    print(f"      Con clasificacion: {n_con}")
+    print(f"      Pendientes: {len(idx) - n_con}")
+    print(f"      Empates: {int(emp['empate'].sum())} | "
+          f"Vecinos con estados distintos: {int(emp['conflicto'].sum())}")
+
+    mostrar = emp['estado'] < 0 if p['solo_pendientes'] else np.ones(len(idx), dtype=bool)
+    puntos = [
+        {'lat': float(a), 'lon': float(b), 'estadoInicial': e}
+        for a, b, e in zip(lat[mostrar], lon[mostrar], estados_texto(emp['estado'][mostrar]))
+    ]
+
+    # 4. Ruta de los pendientes
+    print("\n[4/5] Calculando ruta...")
+    dep = dict(dep, solo_pendientes=p['solo_pendientes'], orden=ORDEN_RUTA,
+               n_paquetes=N_PAQUETES)
+
+    def _ruta():
+        r = ruta_pendientes(lat[mostrar], lon[mostrar], emp['estado'][mostrar] < 0,
+                            metodo=ORDEN_RUTA, n_paquetes=N_PAQUETES)
+        return {'orden': r['orden'], 'paquetes': np.array(r['paquetes']).reshape(-1, 2),
+                'largo_m': r['largo_m']}
+    r = cache.obtener('ruta', dep, _ruta)
+    ruta = {'orden': r['orden'], 'paquetes': [tuple(int(v) for v in f) for f in r['paquetes']],
+            'largo_m': float(r['largo_m'])}
+    print(f"      Ruta de pendientes ({ORDEN_RUTA}): {ruta['largo_m'] / 1000:.1f} km "
+          f"en {len(ruta['paquetes'])} paquetes")
+
+    # 5. HTML
+    print("\n[5/5] Generando HTML...")
+    html = html_clasificador(puntos, p['instrucciones'], clave_storage=p['clave'],
+                             etiqueta=p['etiqueta'], radio_pendiente=p['radio_pendiente'],
+                             radio=p['radio'], zoom_siguiente=p['zoom_siguiente'],
+                             render=RENDER, ruta=ruta, datos=FORMATO_DATOS,
+                             url_teselas=DIR_TESELAS + '/')
+    with open(salida, 'w', encoding='utf-8') as f:
+        f.write(html)
+    if FORMATO_DATOS == 'teselas':
+        escribir_teselas(puntos, os.path.join(os.path.dirname(salida), DIR_TESELAS), ruta=ruta)
+
+    n_pend = sum(1 for q in puntos if q['estadoInicial'] == 'pending')
+    print(f"\n{'=' * 70}")
+    print(f"Archivo: {salida}")
+    print(f"Total puntos: {len(puntos)}")
+    print(f"Clasificados: {len(puntos) - n_pend}")
+    print(f"Pendientes: {n_pend}")
+    print(f"Etapas desde cache: {', '.join(cache.aciertos) or 'ninguna'} "
+          f"({time.time() - t0:.1f} s)")
+    print("=" * 70)
+    return {'puntos': puntos, 'estados': emp, 'ruta': ruta, 'cache': cache.aciertos}
+
+
+# ==============================================================================
+# EJECUTAR
+# ==============================================================================
+if __name__ == "__main__":
+    import sys
+
+    args = sys.argv[1:]
+
+    def _opcion(nombre, defecto=None):
+        if nombre in args:
+            return args[args.index(nombre) + 1]
+        return defecto
+
+    posicionales = [a for j, a in enumerate(args)
+                    if not a.startswith('--') and (j == 0 or args[j - 1] not in ('--regla', '--radio'))]
+    generar(posicionales[0] if posicionales else 'faltantes',
+            regla=_opcion('--regla'),
+            radio_m=float(_opcion('--radio', RADIO_M)),
+            usar_cache='--sin-cache' not in args)
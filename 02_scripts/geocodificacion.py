@@ -0,0 +1,305 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+================================================================================
+GEOCODIFICACION - Reverse geocoding con cache, limite de tasa y pipelining
+================================================================================
+
+Reemplaza el ciclo serial de agregar_direcciones.py (una consulta, sleep 1.5 s,
+sin cache) por:
+
+    - Cache persistente (SQLite) por coordenada redondeada: puntos cercanos y
+      re-ejecuciones no vuelven a consultar.
+    - Limitador token-bucket: se consulta exactamente a la tasa permitida por
+      el proveedor (1 req/s en nominatim.openstreetmap.org), sin dormir
+      despues de cada llamada.
+    - Consultas concurrentes con asyncio contra un endpoint configurable (un
+      Nominatim local puede correr sin limite).
+    - Checkpoints: cada respuesta se escribe al cache en lotes, asi que si el
+      proceso se corta basta volver a ejecutarlo y sigue donde quedo.
+
+USO:
+    from geocodificacion import geocodificar
+
+    direcciones = geocodificar(df['lat'], df['lon'])
+    direcciones = geocodificar(lat, lon, endpoint='http://localhost:8080/reverse',
+                               tasa=None, concurrencia=16)
+
+AUTOR: Proyecto Rejas La Florida
+FECHA: Enero 2026
+================================================================================
+"""
+
+import asyncio
+import json
+import os
+import sqlite3
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+
+import numpy as np
+
+
+ENDPOINT_NOMINATIM = 'https://nominatim.openstreetmap.org/reverse'
+USER_AGENT = 'mapa_rejas_chile'
+RUTA_CACHE = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                          '..', '03_datos_procesados', 'cache_geocodificacion.sqlite')
+# 4 decimales ~ 11 m en latitud: puntos de la misma cuadra comparten consulta
+DECIMALES = 4
+# Politica de uso de nominatim.openstreetmap.org: maximo 1 consulta por segundo
+TASA_NOMINATIM = 1.0
+
+SIN_DIRECCION = "No disponible"
+
+
+def formatear_direccion(respuesta):
+    """
+    Arma "calle, numero, comuna" desde la respuesta JSON de Nominatim.
+
+    Si no hay partes especificas devuelve display_name; None si no hay nada.
+    """
+    if not respuesta or 'error' in respuesta:
+        return None
+    address = respuesta.get('address', {})
+    partes = []
+
+    # Nombre de calle
+    if 'road' in address:
+        partes.append(address['road'])
+    elif 'street' in address:
+        partes.append(address['street'])
+
+    # Numero
+    if 'house_number' in address:
+        partes.append(address['house_number'])
+
+    # Comuna
+    for clave in ('municipality', 'suburb', 'city'):
+        if clave in address:
+            partes.append(address[clave])
+            break
+
+    if partes:
+        return ', '.join(partes)
+    return respuesta.get('display_name')
+
+
+# ==============================================================================
+# CACHE / CHECKPOINT
+# ==============================================================================
+
+class CacheGeocodificacion:
+    """
+    Cache persistente en SQLite, clave = coordenadas redondeadas a DECIMALES.
+
+    Guarda la direccion formateada y la respuesta cruda, para poder cambiar
+    el formato sin volver a consultar.
+    """
+
+    def __init__(self, ruta=RUTA_CACHE, decimales=DECIMALES):
+        self.decimales = decimales
+        self.escala = 10 ** decimales
+        os.makedirs(os.path.dirname(os.path.abspath(ruta)), exist_ok=True)
+        self.conexion = sqlite3.connect(ruta)
+        self.conexion.execute(
+            "CREATE TABLE IF NOT EXISTS direcciones ("
+            " lat_r INTEGER, lon_r INTEGER, decimales INTEGER,"
+            " direccion TEXT, respuesta TEXT, fecha REAL,"
+            " PRIMARY KEY (lat_r, lon_r, decimales))")
+
+    def claves(self, lat, lon):
+        """Coordenadas redondeadas como enteros (lat_r, lon_r)."""
+        lat_r = np.rint(np.asarray(lat, dtype=np.float64) * self.escala).astype(np.int64)
+        lon_r = np.rint(np.asarray(lon, dtype=np.float64) * self.escala).astype(np.int64)
+        return lat_r, lon_r
+
+    def buscar(self, claves):
+        """dict (lat_r, lon_r) -> direccion para las claves que ya estan en cache."""
+        encontradas = {}
+        claves = list(claves)
+        for i in range(0, len(claves), 400):
+            lote = claves[i:i + 400]
+            condicion = ' OR '.join(['(lat_r = ? AND lon_r = ?)'] * len(lote))
+            filas = self.conexion.execute(
+                f"SELECT lat_r, lon_r, direccion FROM direcciones "
+                f"WHERE decimales = ? AND ({condicion})",
+                [self.decimales] + [int(x) for par in lote for x in par])
+            encontradas.update({(a, b): d for a, b, d in filas})
+        return encontradas
+
+    def guardar(self, resultados):
+        """resultados: lista de ((lat_r, lon_r), direccion, respuesta_cruda)."""
+        self.conexion.executemany(
+            "INSERT OR REPLACE INTO direcciones VALUES (?, ?, ?, ?, ?, ?)",
+            [(int(k[0]), int(k[1]), self.decimales, d, json.dumps(r, ensure_ascii=False),
+              time.time()) for k, d, r in resultados])
+        self.conexion.commit()
+
+    def cerrar(self):
+        self.conexion.close()
+
+
+# ==============================================================================
+# LIMITADOR DE TASA
+# ==============================================================================
+
+class LimitadorTokens:
+    """
+    Token bucket: se reponen `tasa` fichas por segundo hasta `capacidad`.
+
+    Cada consulta consume una ficha; si no hay, espera justo lo necesario
+    hasta que se reponga la siguiente.
+    """
+
+    def __init__(self, tasa, capacidad=1):
+        self.tasa = float(tasa)
+        self.capacidad = float(capacidad)
+        self.fichas = float(capacidad)
+        self.ultimo = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def adquirir(self):
+        async with self._lock:
+            while True:
+                ahora = time.monotonic()
+                self.fichas = min(self.capacidad,
+                                  self.fichas + (ahora - self.ultimo) * self.tasa)
+                self.ultimo = ahora
+                if self.fichas >= 1:
+                    self.fichas -= 1
+                    return
+                await asyncio.sleep((1 - self.fichas) / self.tasa)
+
+
+# ==============================================================================
+# CONSULTAS
+# ==============================================================================
+
+def _consultar(endpoint, lat, lon, user_agent, timeout):
+    """Una consulta HTTP sincronica (se ejecuta en un hilo)."""
+    parametros = urllib.parse.urlencode({
+        'format': 'jsonv2', 'lat': f"{lat:.7f}", 'lon': f"{lon:.7f}",
+        'accept-language': 'es', 'addressdetails': 1,
+    })
+    solicitud = urllib.request.Request(f"{endpoint}?{parametros}",
+                                       headers={'User-Agent': user_agent})
+    with urllib.request.urlopen(solicitud, timeout=timeout) as r:
+        return json.loads(r.read().decode('utf-8'))
+
+
+async def _geocodificar_async(pendientes, cache, endpoint, tasa, concurrencia,
+                              reintentos, timeout, user_agent, lote_checkpoint,
+                              verbose):
+    limitador = LimitadorTokens(tasa) if tasa else None
+    cola = asyncio.Queue()
+    for item in pendientes:
+        cola.put_nowait(item)
+
+    buffer = []
+    stats = {'ok': 0, 'fallidas': 0}
+    total = len(pendientes)
+
+    def checkpoint():
+        if buffer:
+            cache.guardar(buffer)
+            buffer.clear()
+
+    async def trabajador():
+        while True:
+            try:
+                clave, lat, lon = cola.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            respuesta = None
+            for intento in range(reintentos):
+                if limitador:
+                    await limitador.adquirir()
+                try:
+                    respuesta = await asyncio.to_thread(
+                        _consultar, endpoint, lat, lon, user_agent, timeout)
+                    break
+                except urllib.error.HTTPError as e:
+                    # 429 / 5xx: el servidor pide esperar; otros errores no se reintentan
+                    if e.code != 429 and e.code < 500:
+                        print(f"  Error del servicio en ({lat}, {lon}): {e}")
+                        break
+                    await asyncio.sleep(2 ** intento)
+                except (urllib.error.URLError, TimeoutError, OSError) as e:
+                    print(f"  Timeout/conexion en intento {intento + 1}/{reintentos}: {e}")
+                    await asyncio.sleep(2 ** intento)
+
+            if respuesta is None:
+                # No se guarda en cache: se vuelve a intentar en la proxima ejecucion
+                stats['fallidas'] += 1
+                continue
+            buffer.append((clave, formatear_direccion(respuesta), respuesta))
+            stats['ok'] += 1
+            if len(buffer) >= lote_checkpoint:
+                checkpoint()
+            hechas = stats['ok'] + stats['fallidas']
+            if verbose and (hechas % 50 == 0 or hechas == total):
+                print(f"      {hechas}/{total} consultas")
+
+    try:
+        await asyncio.gather(*(trabajador() for _ in range(max(1, concurrencia))))
+    finally:
+        checkpoint()
+    return stats
+
+
+def geocodificar(lat, lon, endpoint=None, tasa=TASA_NOMINATIM, concurrencia=4,
+                 ruta_cache=RUTA_CACHE, decimales=DECIMALES, reintentos=3,
+                 timeout=10, user_agent=USER_AGENT, lote_checkpoint=25,
+                 verbose=True):
+    """
+    Obtiene la direccion de cada punto (reverse geocoding).
+
+    Parametros:
+    -----------
+    lat, lon : array
+        Coordenadas de los puntos
+    endpoint : str, opcional
+        URL del servicio /reverse compatible con Nominatim. Por defecto la
+        variable de entorno NOMINATIM_URL o el servidor publico
+    tasa : float o None
+        Consultas por segundo (None = sin limite, para un servidor local)
+    concurrencia : int
+        Consultas en vuelo al mismo tiempo
+    ruta_cache : str
+        Archivo SQLite del cache (tambien sirve de checkpoint)
+    decimales : int
+        Redondeo de las coordenadas para la clave del cache
+
+    Retorna:
+    --------
+    list con una direccion por punto (SIN_DIRECCION si no se pudo obtener)
+    """
+    endpoint = endpoint or os.environ.get('NOMINATIM_URL', ENDPOINT_NOMINATIM)
+    cache = CacheGeocodificacion(ruta_cache, decimales)
+    try:
+        lat_r, lon_r = cache.claves(lat, lon)
+        claves = list(zip(lat_r.tolist(), lon_r.tolist()))
+        unicas = list(dict.fromkeys(claves))
+        encontradas = cache.buscar(unicas)
+
+        pendientes = [(k, k[0] / cache.escala, k[1] / cache.escala)
+                      for k in unicas if k not in encontradas]
+        if verbose:
+            print(f"      {len(claves)} puntos, {len(unicas)} coordenadas distintas, "
+                  f"{len(encontradas)} en cache, {len(pendientes)} por consultar")
+
+        if pendientes:
+            t0 = time.time()
+            stats = asyncio.run(_geocodificar_async(
+                pendientes, cache, endpoint, tasa, concurrencia, reintentos,
+                timeout, user_agent, lote_checkpoint, verbose))
+            encontradas.update(cache.buscar([p[0] for p in pendientes]))
+            if verbose:
+                print(f"      {stats['ok']} consultas en {time.time() - t0:.1f} s "
+                      f"({stats['fallidas']} fallidas)")
+
+        return [encontradas.get(k) or SIN_DIRECCION for k in claves]
+    finally:
+        cache.cerrar()
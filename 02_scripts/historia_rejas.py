@@ -0,0 +1,246 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+================================================================================
+HISTORIA DE REJAS - Como se fue fragmentando la red, año por año
+================================================================================
+
+Cada reja tiene `año` (año de cierre) y los mapas ya la colorean por año,
+pero ningun analisis mostraba como se degrado la conectividad en el tiempo.
+
+Una calle queda bloqueada desde el primer año en que se cerro alguna de sus
+rejas. Cerrar calles es quitar aristas, y union-find solo sabe unir; por eso
+la historia se recorre hacia atras:
+
+    - se parte del ultimo año (todas las rejas cerradas): componentes una vez
+    - para cada año, de mas nuevo a mas viejo, se registra el estado y se
+      reabren las calles cerradas ese año (uniones en el union-find)
+
+En una sola pasada se obtiene, para todos los años desde AÑO_INICIO, el
+componente gigante, el numero de fragmentos y los nodos fuera del gigante.
+
+Desvio: para las calles que se cierran cada año, distancia por la red de ese
+año entre los extremos de la calle menos su largo (Dijkstra acotado a
+LIMITE_DESVIO_M desde esos extremos; mas alla cuenta como sin camino). Es la
+unica parte que se calcula por año, y solo desde las calles nuevas.
+
+bloqueo_por_año() entrega la matriz aristas x años de calles abiertas, lista
+para usar como escenarios en difusion.py.
+
+USO:
+    from historia_rejas import historia
+    from red_rejas import cargar_red_rejas
+
+    rr = cargar_red_rejas(tabla=df)
+    serie = historia(rr, df['año'].to_numpy()[rr.reja_fila])
+
+    python historia_rejas.py        # escribe 05_analisis/historia_rejas.xlsx
+
+AUTOR: Proyecto Rejas La Florida
+FECHA: Enero 2026
+================================================================================
+"""
+
+import numpy as np
+from scipy.sparse.csgraph import dijkstra
+
+
+AÑO_INICIO = 2000
+# Radio de busqueda del desvio alrededor de cada calle cerrada
+LIMITE_DESVIO_M = 3000
+
+
+def _años(años):
+    """Años como float64, con NaN donde falta (p. ej. filas del Clasificador)."""
+    import pandas as pd
+    return pd.array(np.asarray(años, dtype=object), dtype='Float64').to_numpy(
+        dtype=np.float64, na_value=np.nan)
+
+
+def año_cierre_aristas(rr, años):
+    """
+    Año desde el que cada calle esta bloqueada (el de su reja mas antigua).
+
+    Parametros:
+    -----------
+    años : array
+        Año de cada reja del modelo (en el orden de rr.reja_fila); las rejas
+        sin año no cuentan
+
+    Retorna:
+    --------
+    np.ndarray int (n_aristas,), 0 para las calles sin reja
+    """
+    años = _años(años)
+    ok = (rr.reja_arista >= 0) & ~np.isnan(años)
+    cierre = np.full(rr.n_aristas, np.iinfo(np.int64).max)
+    np.minimum.at(cierre, rr.reja_arista[ok], años[ok].astype(np.int64))
+    cierre[cierre == np.iinfo(np.int64).max] = 0
+    return cierre
+
+
+def bloqueo_por_año(rr, años, lista_años):
+    """Matriz (n_aristas, len(lista_años)) de calles abiertas al final de cada año."""
+    cierre = año_cierre_aristas(rr, años)
+    lista_años = np.asarray(lista_años)
+    return (cierre[:, None] == 0) | (cierre[:, None] > lista_años[None, :])
+
+
+def desvios_calles(rr, aristas, abiertas, limite_m=LIMITE_DESVIO_M):
+    """
+    Distancia extra para ir de un extremo al otro de cada calle sin usarla.
+
+    Retorna:
+    --------
+    np.ndarray (len(aristas),) en metros; inf si no hay camino dentro de
+    limite_m
+    """
+    aristas = np.asarray(aristas, dtype=np.int64)
+    if len(aristas) == 0:
+        return np.zeros(0)
+    origenes, inv = np.unique(rr.a[aristas], return_inverse=True)
+    d = dijkstra(rr.matriz(abiertas, pesos='largo'), directed=False, indices=origenes,
+                 limit=limite_m)
+    return d[inv, rr.b[aristas]] - rr.largo[aristas]
+
+
+def historia(rr, años, inicio=AÑO_INICIO, fin=None, desvios=True, verbose=True):
+    """
+    Serie anual de la fragmentacion de la red.
+
+    Parametros:
+    -----------
+    rr : RedRejas
+        Modelo de red_rejas
+    años : array
+        Año de cierre de cada reja (orden de rr.reja_fila); las rejas sin año
+        se omiten
+    inicio, fin : int
+        Primer y ultimo año de la serie (fin: el año mas reciente)
+    desvios : bool
+        Calcular el desvio de las calles cerradas cada año
+
+    Retorna:
+    --------
+    DataFrame con una fila por año
+    """
+    import pandas as pd
+
+    años = _años(años)
+    cierre = año_cierre_aristas(rr, años)
+    con_año = años[~np.isnan(años)]
+    fin = int(fin or max(con_año.max() if len(con_año) else inicio, inicio))
+    lista = np.arange(inicio, fin + 1)
+
+    # Red al final de `fin`: libres todas las calles sin reja o cerradas despues
+    final = (cierre == 0) | (cierre > fin)
+    etiquetas = rr.componentes(final)
+    w = np.bincount(etiquetas).tolist()
+    padre = list(range(len(w)))
+    g, c = max(w), len(w)
+    ca, cb = etiquetas[rr.a].tolist(), etiquetas[rr.b].tolist()
+
+    def raiz(x):
+        while padre[x] != x:
+            padre[x] = padre[padre[x]]
+            x = padre[x]
+        return x
+
+    gigante, componentes = {}, {}
+    for año in lista[::-1]:
+        gigante[año], componentes[año] = g, c
+        # Reabrir las calles cerradas este año: queda la red del año anterior
+        for e in np.flatnonzero(cierre == año).tolist():
+            x, y = raiz(ca[e]), raiz(cb[e])
+            if x != y:
+                if w[x] < w[y]:
+                    x, y = y, x
+                padre[y] = x
+                w[x] += w[y]
+                g = max(g, w[x])
+                c -= 1
+
+    ok = (rr.reja_arista >= 0) & ~np.isnan(años)
+    serie = pd.DataFrame({
+        'año': lista,
+        'rejas_nuevas': [int((años == a).sum()) for a in lista],
+        'rejas_acumuladas': [int((años <= a).sum()) for a in lista],
+        'calles_nuevas': [int((cierre == a).sum()) for a in lista],
+        'calles_bloqueadas': [int(((cierre > 0) & (cierre <= a)).sum()) for a in lista],
+        'gigante': [gigante[a] / rr.n_nodos for a in lista],
+        'componentes': [componentes[a] for a in lista],
+        'nodos_fuera_gigante': [rr.n_nodos - gigante[a] for a in lista],
+    })
+    serie['fraccion_bloqueada'] = serie['calles_bloqueadas'] / max(rr.n_aristas, 1)
+    if verbose:
+        print(f"      {int(ok.sum())} rejas con calle, {int((cierre > 0).sum())} calles "
+              f"cerradas entre {inicio} y {fin}")
+        if np.isnan(años).any():
+            print(f"      {int(np.isnan(años).sum())} rejas sin año de cierre (se omiten)")
+
+    if desvios:
+        medio, maximo, sin_camino = [], [], []
+        for año in lista:
+            nuevas = np.flatnonzero(cierre == año)
+            abiertas = (cierre == 0) | (cierre > año)
+            d = desvios_calles(rr, nuevas, abiertas)
+            fin_ok = d[np.isfinite(d)]
+            medio.append(float(fin_ok.mean()) if len(fin_ok) else np.nan)
+            maximo.append(float(fin_ok.max()) if len(fin_ok) else np.nan)
+            sin_camino.append(int((~np.isfinite(d)).sum()))
+        serie['desvio_medio_m'] = medio
+        serie['desvio_max_m'] = maximo
+        serie['calles_sin_desvio'] = sin_camino
+    return serie
+
+
+def graficar(serie, ruta):
+    """Gigante y fragmentos por año (matplotlib es opcional)."""
+    try:
+        import matplotlib
+        matplotlib.use('Agg')
+        import matplotlib.pyplot as plt
+    except ImportError:
+        print("      (sin matplotlib: no se genera el grafico)")
+        return
+    fig, ax = plt.subplots(figsize=(9, 5))
+    ax.plot(serie['año'], serie['gigante'] * 100, color='#c0392b', marker='o',
+            label='Componente gigante (%)')
+    ax.set_xlabel('Año')
+    ax.set_ylabel('% de nodos en el componente gigante')
+    ax2 = ax.twinx()
+    ax2.bar(serie['año'], serie['componentes'], color='#7f8c8d', alpha=0.3, label='Fragmentos')
+    ax2.set_ylabel('Fragmentos')
+    ax.set_title('Fragmentacion de la red por año de cierre')
+    fig.tight_layout()
+    fig.savefig(ruta, dpi=150)
+    plt.close(fig)
+
+
+# ==============================================================================
+# EJECUTAR
+# ==============================================================================
+if __name__ == "__main__":
+    import sys
+    import time
+
+    from almacen_datos import cargar_tabla
+    from red_rejas import DATOS, cargar_red_rejas
+
+    inicio = int(sys.argv[1]) if len(sys.argv) > 1 else AÑO_INICIO
+
+    print("=" * 70)
+    print("HISTORIA DE LA FRAGMENTACION POR AÑO DE CIERRE")
+    print("=" * 70)
+    df = cargar_tabla(DATOS)
+    rr = cargar_red_rejas(tabla=df)
+    t0 = time.time()
+    serie = historia(rr, df['año'].to_numpy()[rr.reja_fila], inicio=inicio)
+    print(f"      Tiempo: {time.time() - t0:.2f} s")
+    cambios = serie[serie['rejas_nuevas'] > 0]
+    print(cambios[['año', 'rejas_nuevas', 'calles_bloqueadas', 'gigante', 'componentes']]
+          .to_string(index=False))
+
+    serie.to_excel('../05_analisis/historia_rejas.xlsx', index=False)
+    graficar(serie, '../05_analisis/historia_rejas.png')
+    print("      Guardado: ../05_analisis/historia_rejas.xlsx")
@@ -10,6 +10,8 @@ import pandas as pd
 import folium
 from folium import plugins
 
+from capas_mapa import CapaPuntos
+
 def main():
     print("="*80)
     print(" "*30 + "MAPA DE REJAS")
@@ -52,92 +54,35 @@ def main():
     folium.TileLayer('CartoDB positron', name='CartoDB Positron').add_to(mapa)
     folium.TileLayer('CartoDB dark_matter', name='CartoDB Dark').add_to(mapa)
 
-    # Crear grupos por estado
-    grupo_abiertas = folium.FeatureGroup(name='Rejas Abiertas (1)')
-    grupo_cerradas = folium.FeatureGroup(name='Rejas Cerradas (0)')
-
     # Rango de años para gradiente
     año_min = df['año'].min()
     año_max = df['año'].max()
 
     print(f"\n4. Agregando {len(df)} rejas al mapa...")
 
-    for idx, row in df.iterrows():
-        lat = row['Latitud']
-        lon = row['Longitud']
-        estado = row['estado']
-        año = row['año']
-
-        # Estado texto
-        estado_texto = "ABIERTA" if estado == 1 else "CERRADA"
-        estado_color = "#2ecc71" if estado == 1 else "#e74c3c"
-
-        # Color según estado
-        if estado == 0:
-            # CERRADAS: Calcular color según año (gradiente continuo)
-            gradiente = (año - año_min) / (año_max - año_min) if año_max > año_min else 0.5
-            gradiente = max(0, min(1, gradiente))
-
-            # Gradiente de oscuro (antiguo) a claro (moderno)
-            r = int(20 + (255 - 20) * gradiente)
-            g = int(50 + (255 - 50) * gradiente)
-            b = int(100 + (150 - 100) * gradiente * 0.5)
-            color = f'#{r:02x}{g:02x}{b:02x}'
-        else:
-            # ABIERTAS: Rojo
-            color = '#e74c3c'
-
-        # Crear popup
-        popup_html = f"""
-        <div style="font-family: Arial; width: 220px;">
-            <h4 style="color: #2c3e50; margin-bottom: 10px;">Reja #{idx + 1}</h4>
-            <table style="width: 100%; font-size: 12px;">
-                <tr>
-                    <td><b>Estado:</b></td>
-                    <td style="color: {estado_color}; font-weight: bold;">{estado_texto}</td>
-                </tr>
-                <tr><td><b>Año cierre:</b></td><td>{año}</td></tr>
-                <tr><td><b>Coordenadas:</b></td><td>{lat:.6f}, {lon:.6f}</td></tr>
-            </table>
-        </div>
-        """
-
-        # Seleccionar grupo según estado
-        grupo = grupo_abiertas if estado == 1 else grupo_cerradas
-
-        # Crear marcador - mismo tamaño para todos (radio 7)
-        if estado == 1:
-            # Rejas abiertas: círculo rojo
-            folium.CircleMarker(
-                location=[lat, lon],
-                radius=7,
-                popup=folium.Popup(popup_html, max_width=250),
-                tooltip=f"Reja #{idx+1}: {estado_texto}",
-                color='#c0392b',
-                fill=True,
-                fillColor='#e74c3c',
-                fillOpacity=0.7,
-                weight=2,
-                opacity=0.9
-            ).add_to(grupo)
-        else:
-            # Rejas cerradas: círculo con gradiente de color por año
-            folium.CircleMarker(
-                location=[lat, lon],
-                radius=7,
-                popup=folium.Popup(popup_html, max_width=250),
-                tooltip=f"Reja #{idx+1}: {estado_texto} ({año})",
-                color=color,
-                fill=True,
-                fillColor=color,
-                fillOpacity=0.9,
-                weight=2,
-                opacity=1.0
-            ).add_to(grupo)
-
-    # Agregar grupos al mapa
-    grupo_abiertas.add_to(mapa)
-    grupo_cerradas.add_to(mapa)
+    # Abiertas: circulo rojo; cerradas: gradiente por año (calculado en el
+    # navegador); otro tipo va en la capa de cerradas, pero en rojo fijo
+    estilo = {
+        'radio': 7,
+        'colores': {0: 'gradiente', 1: '#e74c3c', 2: '#e74c3c'},
+        'borde': {1: '#c0392b'},
+        'opacidad_por_estado': {0: 1.0, 1: 0.9, 2: 1.0},
+        'relleno_por_estado': {0: 0.9, 1: 0.7, 2: 0.9},
+        'año_min': int(año_min),
+        'año_max': int(año_max),
+    }
+    popup = {
+        'titulo': 'Reja',
+        'ancho': 220,
+        'filas': [('Estado', 'estado'), ('Año cierre', 'año'), ('Coordenadas', 'coord')],
+        'color_estado': {0: '#e74c3c', 1: '#2ecc71', 2: '#e74c3c'},
+    }
+
+    puntos = df.rename(columns={'Latitud': 'lat', 'Longitud': 'lon'})
+    CapaPuntos(puntos[puntos['estado'] == 1], nombre='Rejas Abiertas (1)', estilo=estilo,
+               popup=popup, tooltip="Reja #{n}: {estado_txt}").add_to(mapa)
+    CapaPuntos(puntos[puntos['estado'] != 1], nombre='Rejas Cerradas (0)', estilo=estilo,
+               popup=popup, tooltip="Reja #{n}: {estado_txt} ({año})").add_to(mapa)
 
     # Leyenda
     leyenda_html = f"""
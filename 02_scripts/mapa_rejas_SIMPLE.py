@@ -32,84 +32,7 @@ import pandas as pd
 import folium
 from folium import plugins
 
-
-def calcular_color_gradiente(año, año_min, año_max):
-    """
-    Calcula el color para una reja cerrada basado en su año de cierre.
-
-    Parámetros:
-    -----------
-    año : int
-        Año de cierre de la reja
-    año_min : int
-        Año más antiguo en el dataset
-    año_max : int
-        Año más reciente en el dataset
-
-    Retorna:
-    --------
-    str
-        Color en formato hexadecimal (ej: '#1a2b3c')
-
-    Lógica:
-    -------
-    - Normaliza el año a un valor entre 0 (más antiguo) y 1 (más reciente)
-    - Interpola colores RGB:
-      * Años antiguos (2012): Azul oscuro (#143264)
-      * Años recientes (2025): Amarillo claro (#f0ff96)
-    """
-    # Evitar división por cero si todos los años son iguales
-    if año_max == año_min:
-        gradiente = 0.5
-    else:
-        # Normalizar año al rango 0-1
-        gradiente = (año - año_min) / (año_max - año_min)
-        gradiente = max(0, min(1, gradiente))  # Limitar entre 0 y 1
-
-    # Interpolar valores RGB (de oscuro a claro)
-    r = int(20 + (255 - 20) * gradiente)  # Rojo: 20 -> 255
-    g = int(50 + (255 - 50) * gradiente)  # Verde: 50 -> 255
-    b = int(100 + (150 - 100) * gradiente * 0.5)  # Azul: 100 -> 150 (más lento)
-
-    # Convertir a formato hexadecimal
-    return f'#{r:02x}{g:02x}{b:02x}'
-
-
-def crear_popup_html(idx, estado_texto, estado_color, año, lat, lon):
-    """
-    Crea el HTML para el popup que aparece al hacer click en una reja.
-
-    Parámetros:
-    -----------
-    idx : int
-        Índice de la reja
-    estado_texto : str
-        "ABIERTA" o "CERRADA"
-    estado_color : str
-        Color hex para el estado
-    año : int
-        Año de cierre
-    lat, lon : float
-        Coordenadas de la reja
-
-    Retorna:
-    --------
-    str
-        HTML formateado para el popup
-    """
-    return f"""
-    <div style="font-family: Arial; width: 220px;">
-        <h4 style="color: #2c3e50; margin-bottom: 10px;">Reja #{idx + 1}</h4>
-        <table style="width: 100%; font-size: 12px;">
-            <tr>
-                <td><b>Estado:</b></td>
-                <td style="color: {estado_color}; font-weight: bold;">{estado_texto}</td>
-            </tr>
-            <tr><td><b>Año cierre:</b></td><td>{año}</td></tr>
-            <tr><td><b>Coordenadas:</b></td><td>{lat:.6f}, {lon:.6f}</td></tr>
-        </table>
-    </div>
-    """
+from capas_mapa import CapaPuntos
 
 
 def main():
@@ -168,60 +91,41 @@ def main():
     # =========================================================================
     print("\n[4/5] Agregando rejas al mapa...")
 
-    # Crear grupos de marcadores para poder filtrar por estado
-    grupo_abiertas = folium.FeatureGroup(name=' Rejas Abiertas (1)')
-    grupo_cerradas = folium.FeatureGroup(name=' Rejas Cerradas (0)')
-
     # Obtener rango de años para el gradiente
     año_min = df['año'].min()
     año_max = df['año'].max()
 
-    # Iterar sobre cada reja y crear su marcador
-    for idx, row in df.iterrows():
-        # Extraer datos de la reja
-        lat = row['Latitud']
-        lon = row['Longitud']
-        estado = row['estado']  # 0 o 1
-        año = row['año']
-
-        # Determinar texto y color del estado
-        estado_texto = "ABIERTA" if estado == 1 else "CERRADA"
-        estado_color = "#e74c3c" if estado == 1 else "#27ae60"  # Rojo o Verde
-
-        # Calcular color del marcador según estado
-        if estado == 0:
-            # REJAS CERRADAS: Color con gradiente por año
-            color = calcular_color_gradiente(año, año_min, año_max)
-        else:
-            # REJAS ABIERTAS: Color rojo fijo
-            color = '#e74c3c'
-
-        # Crear HTML del popup (ventana que aparece al hacer click)
-        popup_html = crear_popup_html(idx, estado_texto, estado_color, año, lat, lon)
-
-        # Seleccionar el grupo según el estado
-        grupo = grupo_abiertas if estado == 1 else grupo_cerradas
-
-        # Crear el marcador circular en el mapa
-        folium.CircleMarker(
-            location=[lat, lon],                          # Posición
-            radius=7,                                     # Tamaño del círculo
-            popup=folium.Popup(popup_html, max_width=250),  # Ventana emergente
-            tooltip=f"Reja #{idx+1}: {estado_texto}",    # Texto al pasar el mouse
-            color=color,                                  # Color del borde
-            fill=True,                                    # Rellenar el círculo
-            fillColor=color,                              # Color de relleno
-            fillOpacity=0.9 if estado == 0 else 0.7,    # Opacidad
-            weight=2,                                     # Grosor del borde
-            opacity=1.0 if estado == 0 else 0.9          # Opacidad del borde
-        ).add_to(grupo)
+    # Estilo de los puntos. El color de cada reja se calcula en el navegador:
+    #   - ABIERTAS (y otro tipo, en la capa de cerradas): rojo fijo
+    #   - CERRADAS: gradiente por año, de azul oscuro (#143264, más antiguo)
+    #               a amarillo claro (#f0ff96, más reciente)
+    estilo = {
+        'radio': 7,                                               # Tamaño del círculo
+        'colores': {0: 'gradiente', 1: '#e74c3c', 2: '#e74c3c'},  # Color por estado
+        'opacidad_por_estado': {0: 1.0, 1: 0.9, 2: 0.9},          # Opacidad del borde
+        'relleno_por_estado': {0: 0.9, 1: 0.7, 2: 0.7},           # Opacidad del relleno
+        'año_min': int(año_min),
+        'año_max': int(año_max),
+    }
+
+    # Contenido del popup (ventana que aparece al hacer click). Se arma recién
+    # al hacer click, así el HTML no guarda un popup por cada reja.
+    popup = {
+        'titulo': 'Reja',
+        'ancho': 220,
+        'filas': [('Estado', 'estado'), ('Año cierre', 'año'), ('Coordenadas', 'coord')],
+        'color_estado': {0: '#27ae60', 1: '#e74c3c', 2: '#27ae60'},  # Verde o Rojo
+    }
+
+    # Una capa por estado, para poder filtrarlas en el control de capas
+    puntos = df.rename(columns={'Latitud': 'lat', 'Longitud': 'lon'})
+    CapaPuntos(puntos[puntos['estado'] == 1], nombre=' Rejas Abiertas (1)', estilo=estilo,
+               popup=popup, tooltip="Reja #{n}: {estado_txt}").add_to(mapa)
+    CapaPuntos(puntos[puntos['estado'] != 1], nombre=' Rejas Cerradas (0)', estilo=estilo,
+               popup=popup, tooltip="Reja #{n}: {estado_txt}").add_to(mapa)
 
     print(f"      [OK] {len(df)} marcadores agregados")
 
-    # Agregar los grupos al mapa
-    grupo_abiertas.add_to(mapa)
-    grupo_cerradas.add_to(mapa)
-
     # =========================================================================
     # PASO 4: AGREGAR LEYENDA Y CONTROLES
     # =========================================================================
@@ -9,24 +9,11 @@ Estados: 0=Cerrada, 1=Abierta, 2=Otro tipo de cierre
 ================================================================================
 """
 
-import pandas as pd
 import folium
 from folium import plugins
 
-
-def calcular_color_gradiente(año, año_min, año_max):
-    """Calcula color para rejas cerradas basado en año de cierre."""
-    if año_max == año_min:
-        gradiente = 0.5
-    else:
-        gradiente = (año - año_min) / (año_max - año_min)
-        gradiente = max(0, min(1, gradiente))
-
-    r = int(20 + (255 - 20) * gradiente)
-    g = int(50 + (255 - 50) * gradiente)
-    b = int(100 + (150 - 100) * gradiente * 0.5)
-
-    return f'#{r:02x}{g:02x}{b:02x}'
+from almacen_datos import cargar_tabla
+from capas_mapa import CapaPuntos
 
 
 def main():
@@ -36,7 +23,7 @@ def main():
 
     # Cargar datos combinados
     print("\n[1/5] Cargando datos combinados...")
-    df = pd.read_excel('../03_datos_procesados/Base_Combinada.xlsx')
+    df = cargar_tabla('../03_datos_procesados/Base_Combinada.xlsx')
     print(f"      Total: {len(df)} rejas")
 
     # Estadisticas por estado
@@ -68,83 +55,33 @@ def main():
     folium.TileLayer('CartoDB positron', name='Mapa Claro').add_to(mapa)
     folium.TileLayer('CartoDB dark_matter', name='Mapa Oscuro').add_to(mapa)
 
-    # Crear grupos por estado
-    print("\n[3/5] Creando grupos de marcadores...")
-    grupo_cerradas = folium.FeatureGroup(name=f'Cerradas ({estado_0})')
-    grupo_abiertas = folium.FeatureGroup(name=f'Abiertas ({estado_1})')
-    grupo_otro = folium.FeatureGroup(name=f'Otro tipo ({estado_2})')
-
-    grupos = {0: grupo_cerradas, 1: grupo_abiertas, 2: grupo_otro}
-
-    # Colores base
-    colores_estado = {
-        0: None,  # Se calcula con gradiente
-        1: '#27ae60',  # Verde - Abierta
-        2: '#9b59b6'   # Morado - Otro tipo
-    }
-
-    nombres_estado = {
-        0: 'CERRADA',
-        1: 'ABIERTA',
-        2: 'OTRO TIPO'
-    }
+    # Una capa compacta por estado (estilo y popups se arman en el navegador)
+    print("\n[3/5] Creando capas por estado...")
 
     # Rango de años para gradiente
     año_min = int(df['año'].min())
     año_max = int(df['año'].max())
 
-    print(f"\n[4/5] Agregando {len(df)} marcadores...")
-
-    for idx, row in df.iterrows():
-        lat = row['lat']
-        lon = row['lon']
-        estado = int(row['estado'])
-        año = int(row['año']) if pd.notna(row['año']) else año_min
-        fuente = row['fuente']
-        direccion = row.get('direccion', '')
-
-        estado_texto = nombres_estado.get(estado, 'DESCONOCIDO')
-
-        # Determinar color
-        if estado == 0:
-            color = calcular_color_gradiente(año, año_min, año_max)
-        else:
-            color = colores_estado.get(estado, '#95a5a6')
-
-        # Crear popup
-        popup_html = f"""
-        <div style="font-family: Arial; width: 240px;">
-            <h4 style="color: #2c3e50; margin-bottom: 10px;">Reja #{idx + 1}</h4>
-            <table style="width: 100%; font-size: 12px;">
-                <tr>
-                    <td><b>Estado:</b></td>
-                    <td style="color: {color}; font-weight: bold;">{estado_texto}</td>
-                </tr>
-                <tr><td><b>Año:</b></td><td>{año}</td></tr>
-                <tr><td><b>Fuente:</b></td><td>{fuente}</td></tr>
-                <tr><td><b>Coord:</b></td><td>{lat:.6f}, {lon:.6f}</td></tr>
-        """
-        if direccion and str(direccion).strip():
-            popup_html += f"<tr><td><b>Dir:</b></td><td>{direccion}</td></tr>"
-        popup_html += "</table></div>"
-
-        # Agregar marcador
-        folium.CircleMarker(
-            location=[lat, lon],
-            radius=6,
-            popup=folium.Popup(popup_html, max_width=280),
-            tooltip=f"#{idx+1}: {estado_texto} ({año})",
-            color=color,
-            fill=True,
-            fillColor=color,
-            fillOpacity=0.8,
-            weight=2,
-            opacity=0.9
-        ).add_to(grupos[estado])
-
-    # Agregar grupos al mapa
-    for grupo in grupos.values():
-        grupo.add_to(mapa)
+    estilo = {
+        'radio': 6,
+        'colores': {0: 'gradiente', 1: '#27ae60', 2: '#9b59b6'},
+        'opacidad': 0.9,
+        'opacidad_relleno': 0.8,
+        'año_min': año_min,
+        'año_max': año_max,
+    }
+    popup = {
+        'titulo': 'Reja',
+        'ancho': 240,
+        'filas': [('Estado', 'estado'), ('Año', 'año'), ('Fuente', 'fuente'),
+                  ('Coord', 'coord'), ('Dir', 'direccion')],
+    }
+
+    print(f"\n[4/5] Agregando {len(df)} puntos...")
+    for estado, nombre in [(0, f'Cerradas ({estado_0})'), (1, f'Abiertas ({estado_1})'),
+                           (2, f'Otro tipo ({estado_2})')]:
+        CapaPuntos(df[df['estado'] == estado], nombre=nombre, estilo=estilo,
+                   popup=popup, tooltip="#{n}: {estado_txt} ({año})").add_to(mapa)
 
     # Leyenda
     leyenda_html = f"""
@@ -0,0 +1,328 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+================================================================================
+PERCOLACION - Curva de fragmentacion de la red vial (Newman-Ziff)
+================================================================================
+
+La curva del reporte (1_percolacion.png: componente gigante vs % bloqueado)
+se obtuvo quitando aristas y recalculando componentes en cada fraccion, sobre
+un grafo de distancias entre los puntos encuestados.
+
+Aqui se usa la red vial de OSM con las rejas cerradas en sus calles
+(modelo de red_rejas: aristas no dirigidas y mascara de bloqueo) y el algoritmo de
+Newman-Ziff: bloquear aristas en un orden dado equivale a agregarlas en el
+orden inverso partiendo de la red vacia. Con union-find (union por tamaño y
+compresion de caminos) cada arista agregada cuesta O(alfa(E)), y en una sola
+pasada se obtiene el tamaño del componente gigante para TODAS las fracciones
+de bloqueo, no solo para una grilla.
+
+Cada orden aleatorio es una realizacion; las realizaciones se reparten entre
+procesos y se promedian (media y desviacion por fraccion). Ordenes:
+
+    'aleatorio' : todas las aristas en orden al azar (percolacion clasica)
+    'rejas'     : primero las aristas con reja cerrada (la curva pasa por el
+                  estado actual) y despues el resto al azar
+
+USO:
+    from percolacion import percolacion_red
+    from red_rejas import cargar_red_rejas
+
+    res = percolacion_red(cargar_red_rejas(), n_realizaciones=1000)
+    res['fraccion_bloqueada'], res['gigante'], res['gigante_std'], res['umbral']
+
+    python percolacion.py            # 1000 realizaciones
+    python percolacion.py 5000 4     # 5000 realizaciones en 4 procesos
+
+AUTOR: Proyecto Rejas La Florida
+FECHA: Enero 2026
+================================================================================
+"""
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from scipy.stats import binom
+
+
+ORDENES = ('aleatorio', 'rejas')
+
+
+# ==============================================================================
+# NEWMAN-ZIFF
+# ==============================================================================
+
+def curva_union_find(n_nodos, a, b, orden):
+    """
+    Agrega las aristas en `orden` y registra, despues de cada una, el tamaño
+    del componente gigante y el numero de componentes.
+
+    a, b y orden son listas de Python (el ciclo es mas rapido que con NumPy
+    escalar).
+
+    Retorna:
+    --------
+    (gigante, n_componentes): np.ndarray de largo len(orden) + 1; la posicion k
+    es la red con las primeras k aristas de `orden`
+    """
+    padre = list(range(n_nodos))
+    tam = [1] * n_nodos
+    gigante = [0] * (len(orden) + 1)
+    n_comp = [0] * (len(orden) + 1)
+    g, c = (1 if n_nodos else 0), n_nodos
+    gigante[0], n_comp[0] = g, c
+    for k, e in enumerate(orden, 1):
+        x = a[e]
+        while padre[x] != x:
+            padre[x] = padre[padre[x]]
+            x = padre[x]
+        y = b[e]
+        while padre[y] != y:
+            padre[y] = padre[padre[y]]
+            y = padre[y]
+        if x != y:
+            if tam[x] < tam[y]:
+                x, y = y, x
+            padre[y] = x
+            tam[x] += tam[y]
+            c -= 1
+            if tam[x] > g:
+                g = tam[x]
+        gigante[k] = g
+        n_comp[k] = c
+    return np.array(gigante, dtype=np.float64), np.array(n_comp, dtype=np.float64)
+
+
+def orden_insercion(n_aristas, rng, modo='aleatorio', bloqueada=None):
+    """
+    Orden en que se agregan las aristas (el inverso del orden de bloqueo).
+
+    Con modo 'rejas' las aristas con reja se bloquean primero, asi que se
+    agregan al final.
+    """
+    if modo == 'aleatorio':
+        return rng.permutation(n_aristas)
+    libres = np.flatnonzero(~bloqueada)
+    con_reja = np.flatnonzero(bloqueada)
+    return np.concatenate([rng.permutation(libres), rng.permutation(con_reja)])
+
+
+# Estado de cada proceso (se fija una vez con el initializer del pool)
+_RED = {}
+
+
+def _iniciar_proceso(n_nodos, a, b, bloqueada):
+    _RED.update(n_nodos=n_nodos, a=list(map(int, a)), b=list(map(int, b)),
+                bloqueada=bloqueada)
+
+
+def _realizaciones(semillas, modo):
+    """Sumas de gigante, gigante^2 y componentes sobre varias realizaciones."""
+    n, a, b = _RED['n_nodos'], _RED['a'], _RED['b']
+    s1 = s2 = sc = 0.0
+    for semilla in semillas:
+        rng = np.random.default_rng(semilla)
+        orden = orden_insercion(len(a), rng, modo, _RED['bloqueada']).tolist()
+        g, c = curva_union_find(n, a, b, orden)
+        s1 = s1 + g
+        s2 = s2 + g * g
+        sc = sc + c
+    return s1, s2, sc, len(semillas)
+
+
+def percolacion(n_nodos, a, b, n_realizaciones=1000, modo='aleatorio', bloqueada=None,
+                procesos=None, semilla=0, verbose=True):
+    """
+    Curva de percolacion promediada sobre muchos ordenes de bloqueo.
+
+    Parametros:
+    -----------
+    n_nodos : int
+    a, b : array int
+        Extremos de las aristas no dirigidas
+    n_realizaciones : int
+        Ordenes aleatorios a promediar
+    modo : str
+        'aleatorio' o 'rejas' (requiere `bloqueada`)
+    bloqueada : array bool, opcional
+        Aristas con reja cerrada
+    procesos : int, opcional
+        Procesos en paralelo (por defecto os.cpu_count(); 1 = sin pool)
+    semilla : int
+        Semilla base; cada realizacion usa una semilla derivada, asi el
+        resultado no depende del numero de procesos
+
+    Retorna:
+    --------
+    dict con:
+        fraccion_bloqueada : array (E+1,), de 1 (todo bloqueado) a 0
+        gigante, gigante_std : fraccion de nodos en el componente gigante
+        componentes : numero medio de componentes
+        umbral : fraccion bloqueada donde la desviacion del gigante es maxima
+                 (estimador de tamaño finito del punto critico)
+        n_realizaciones, modo
+    """
+    if modo not in ORDENES:
+        raise ValueError(f"modo debe ser uno de {ORDENES}, no {modo!r}")
+    if modo == 'rejas' and bloqueada is None:
+        raise ValueError("modo 'rejas' necesita el arreglo `bloqueada`")
+    a = np.asarray(a, dtype=np.int64)
+    b = np.asarray(b, dtype=np.int64)
+    bloqueada = None if bloqueada is None else np.asarray(bloqueada, dtype=bool)
+    semillas = np.random.SeedSequence(semilla).generate_state(n_realizaciones, dtype=np.uint64)
+    procesos = max(1, min(procesos or os.cpu_count() or 1, n_realizaciones))
+    lotes = [s.tolist() for s in np.array_split(semillas, procesos * 4) if len(s)]
+
+    if procesos == 1:
+        _iniciar_proceso(n_nodos, a, b, bloqueada)
+        partes = [_realizaciones(lote, modo) for lote in lotes]
+    else:
+        with ProcessPoolExecutor(procesos, initializer=_iniciar_proceso,
+                                 initargs=(n_nodos, a, b, bloqueada)) as pool:
+            partes = list(pool.map(_realizaciones, lotes, [modo] * len(lotes)))
+    s1 = sum(p[0] for p in partes)
+    s2 = sum(p[1] for p in partes)
+    sc = sum(p[2] for p in partes)
+    n = sum(p[3] for p in partes)
+
+    media = s1 / n
+    std = np.sqrt(np.maximum(s2 / n - media ** 2, 0))
+    n_aristas = len(a)
+    fraccion = 1 - np.arange(n_aristas + 1) / max(n_aristas, 1)
+    umbral = float(fraccion[np.argmax(std)])
+    if verbose:
+        print(f"      {n} realizaciones ({modo}) en {procesos} procesos; "
+              f"umbral ~ {umbral:.1%} bloqueado")
+    return {
+        'fraccion_bloqueada': fraccion,
+        'gigante': media / n_nodos,
+        'gigante_std': std / n_nodos,
+        'componentes': sc / n,
+        'umbral': umbral,
+        'n_realizaciones': n,
+        'modo': modo,
+    }
+
+
+def curva_canonica(gigante, fraccion_bloqueada):
+    """
+    Promedio canonico de Newman-Ziff: la curva con k aristas presentes
+    (microcanonica) convolucionada con la binomial, para una probabilidad
+    de bloqueo por arista dada (cada arista bloqueada de forma independiente).
+
+    Parametros:
+    -----------
+    gigante : array (E+1,)
+        Resultado de percolacion (indice k = aristas presentes)
+    fraccion_bloqueada : float o array
+        Probabilidades de bloqueo donde evaluar
+    """
+    gigante = np.asarray(gigante, dtype=np.float64)
+    n_aristas = len(gigante) - 1
+    k = np.arange(n_aristas + 1)
+    q = np.atleast_1d(np.asarray(fraccion_bloqueada, dtype=np.float64))
+    return np.array([binom.pmf(k, n_aristas, 1 - f) @ gigante for f in q])
+
+
+def percolacion_red(rr, n_realizaciones=1000, modo='aleatorio', procesos=None, semilla=0):
+    """
+    Percolacion sobre la red vial con las rejas cerradas en sus calles.
+
+    Parametros:
+    -----------
+    rr : RedRejas
+        Modelo de red_rejas (aristas no dirigidas y mascara de bloqueo)
+
+    Retorna:
+    --------
+    dict de percolacion() mas:
+        actual : {'fraccion_bloqueada', 'gigante', 'componentes'} de la red
+                 con las aristas con reja bloqueadas
+        n_aristas, n_bloqueadas
+    """
+    print(f"      {rr.n_nodos} nodos, {rr.n_aristas} calles, "
+          f"{int(rr.bloqueada.sum())} con reja cerrada")
+    tam = np.bincount(rr.componentes())
+    res = percolacion(rr.n_nodos, rr.a, rr.b, n_realizaciones, modo=modo,
+                      bloqueada=rr.bloqueada, procesos=procesos, semilla=semilla)
+    res['actual'] = {
+        'fraccion_bloqueada': float(rr.bloqueada.mean()) if rr.n_aristas else 0.0,
+        'gigante': float(tam.max() / rr.n_nodos),
+        'componentes': int(len(tam)),
+    }
+    res['n_aristas'] = int(rr.n_aristas)
+    res['n_bloqueadas'] = int(rr.bloqueada.sum())
+    return res
+
+
+def tabla_curva(res, paso=0.01):
+    """DataFrame con la curva cada `paso` de fraccion bloqueada."""
+    import pandas as pd
+
+    n_aristas = len(res['gigante']) - 1
+    fracciones = np.round(np.arange(0, 1 + paso / 2, paso), 6)
+    k = np.rint((1 - fracciones) * n_aristas).astype(int)
+    return pd.DataFrame({
+        'fraccion_bloqueada': fracciones,
+        'gigante': res['gigante'][k],
+        'gigante_std': res['gigante_std'][k],
+        'componentes': res['componentes'][k],
+    })
+
+
+def graficar(res, ruta):
+    """Grafico de la curva (matplotlib es opcional)."""
+    try:
+        import matplotlib
+        matplotlib.use('Agg')
+        import matplotlib.pyplot as plt
+    except ImportError:
+        print("      (sin matplotlib: no se genera el grafico)")
+        return
+    f = res['fraccion_bloqueada'] * 100
+    fig, ax = plt.subplots(figsize=(9, 5))
+    ax.plot(f, res['gigante'] * 100, color='#c0392b', label='Componente gigante (media)')
+    ax.fill_between(f, (res['gigante'] - res['gigante_std']) * 100,
+                    (res['gigante'] + res['gigante_std']) * 100, color='#c0392b', alpha=0.2)
+    ax.axvline(res['umbral'] * 100, color='#555', ls='--', label=f"Umbral ~{res['umbral']:.0%}")
+    if 'actual' in res:
+        act = res['actual']
+        ax.scatter([act['fraccion_bloqueada'] * 100], [act['gigante'] * 100], color='k', zorder=3,
+                   label=f"Estado actual ({act['fraccion_bloqueada']:.1%})")
+    ax.set_xlabel('% de calles bloqueadas')
+    ax.set_ylabel('% de nodos en el componente gigante')
+    ax.set_title(f"Percolacion de la red vial ({res['n_realizaciones']} realizaciones, orden {res['modo']})")
+    ax.legend()
+    fig.tight_layout()
+    fig.savefig(ruta, dpi=150)
+    plt.close(fig)
+
+
+# ==============================================================================
+# EJECUTAR
+# ==============================================================================
+if __name__ == "__main__":
+    import sys
+    import time
+
+    from red_rejas import cargar_red_rejas
+
+    n_real = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    procesos = int(sys.argv[2]) if len(sys.argv) > 2 else None
+
+    print("=" * 70)
+    print("PERCOLACION DE LA RED VIAL (NEWMAN-ZIFF)")
+    print("=" * 70)
+    rr = cargar_red_rejas()
+    print(f"      {rr.n_rejas} rejas cerradas")
+
+    t0 = time.time()
+    res = percolacion_red(rr, n_realizaciones=n_real, procesos=procesos)
+    print(f"      Estado actual: {res['actual']['fraccion_bloqueada']:.1%} bloqueado, "
+          f"gigante {res['actual']['gigante']:.1%}, {res['actual']['componentes']} componentes")
+    print(f"      Tiempo: {time.time() - t0:.1f} s")
+
+    tabla_curva(res).to_excel('../05_analisis/percolacion_curva.xlsx', index=False)
+    graficar(res, '../05_analisis/1_percolacion.png')
+    print("      Guardado: ../05_analisis/percolacion_curva.xlsx")
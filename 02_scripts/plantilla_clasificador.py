@@ -0,0 +1,974 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+================================================================================
+PLANTILLA DEL CLASIFICADOR - HTML comun de los generadores
+================================================================================
+
+generar_clasificador_todos.py y generar_clasificador_v4.py producian el mismo
+HTML (panel, filtros, exportacion) con pequeñas diferencias de texto y
+tamaño. Aqui queda una sola plantilla parametrizada.
+
+Modos de dibujo (render):
+    'canvas' : una sola capa <canvas> para todos los puntos. Solo se dibujan
+               los puntos dentro de la vista (culling por grilla), el estilo
+               es una tabla indexada por estado y el click se resuelve
+               buscando en las celdas de la grilla cercanas. Cambiar un filtro
+               o reclasificar un punto es solo redibujar la vista.
+    'svg'    : un L.circleMarker por punto (comportamiento anterior).
+
+Los puntos no van como JSON sino en teselas binarias z/x/y (teselas_puntos):
+el navegador solo decodifica las teselas de la vista, asi que la primera
+vista no depende del total de puntos. Modos de datos:
+    'inline'  : las teselas van en base64 dentro del HTML (doble click)
+    'teselas' : el HTML lleva solo el indice y pide cada tesela por HTTP
+
+Cada clic cuesta lo mismo sin importar cuantos puntos haya: los contadores
+del panel parten de los totales del indice y se actualizan en cada cambio, y
+"siguiente" es el pendiente mas cercano al punto recien clasificado (busqueda
+por anillos en una grilla con la cantidad de pendientes por celda), no el
+siguiente indice del arreglo.
+
+Si se entrega una ruta (ruta_clasificacion.ruta_pendientes), "siguiente"
+sigue el orden de visita precalculado dentro del paquete elegido en el
+panel, uno por encuestador.
+
+Servido por servidor_clasificador.py, el clasificador manda su bitacora al
+servidor en lotes, aplica en vivo las entradas de los demas (server-sent
+events) y salta los puntos que otro encuestador tiene abiertos.
+
+USO:
+    from plantilla_clasificador import html_clasificador
+
+    html = html_clasificador(puntos, instrucciones="<strong>...</strong>",
+                             clave_storage='rejas_all')
+
+    html = html_clasificador(..., datos='teselas', url_teselas='Clasificador_teselas/')
+    escribir_teselas(puntos, '../04_mapas_html/Clasificador_teselas', ruta=ruta)
+
+AUTOR: Proyecto Rejas La Florida
+FECHA: Enero 2026
+================================================================================
+"""
+
+import base64
+import json
+
+from teselas_puntos import empaquetar_teselas, guardar_teselas
+
+
+ESTADOS = ('pending', 'cerrada', 'abierta', 'otro')
+COLORES = {'pending': '#f39c12', 'cerrada': '#e74c3c', 'abierta': '#2ecc71', 'otro': '#9b59b6'}
+
+
+# ==============================================================================
+# CAPA CANVAS Y COLA DE PENDIENTES
+# ==============================================================================
+# Coordenadas en pixeles de mundo (Web Mercator a zoom 0, 256 px): se calculan
+# una vez; a zoom z el pixel es mundo * 2^z. La capa agrupa los puntos en
+# celdas de ~256 px a zoom 14; la cola de pendientes usa celdas de ~256 px a
+# zoom 17 (~200 m), para que cada busqueda revise pocos puntos.
+JS_CAPA_CANVAS = r"""
+const DESCONOCIDO = 255;    // estado de un punto cuya tesela todavia no llega
+
+function aMundo(lat, lon) {
+    const s = Math.sin(lat * Math.PI / 180);
+    return [(lon + 180) / 360 * 256, (0.5 - Math.log((1 + s) / (1 - s)) / (4 * Math.PI)) * 256];
+}
+
+// Grilla dispersa: celda -> indices de sus puntos. Los puntos se agregan a
+// medida que llegan las teselas; x, y son los arreglos de coordenadas de mundo.
+class GrillaPuntos {
+    constructor(x, y, tam) {
+        this.x = x; this.y = y; this.tam = tam;
+        this.celdas = new Map();
+        this.cx0 = this.cy0 = Infinity; this.cx1 = this.cy1 = -Infinity;
+    }
+
+    static clave(cx, cy) { return cx * 4194304 + cy; }
+
+    celdaDe(i) { return [Math.floor(this.x[i] / this.tam), Math.floor(this.y[i] / this.tam)]; }
+
+    agregar(ids) {
+        for (const i of ids) {
+            const [cx, cy] = this.celdaDe(i), c = GrillaPuntos.clave(cx, cy);
+            let lista = this.celdas.get(c);
+            if (!lista) { lista = []; this.celdas.set(c, lista); }
+            lista.push(i);
+            this.cx0 = Math.min(this.cx0, cx); this.cx1 = Math.max(this.cx1, cx);
+            this.cy0 = Math.min(this.cy0, cy); this.cy1 = Math.max(this.cy1, cy);
+        }
+    }
+
+    // Recorre los puntos de las celdas que tocan el rectangulo (unidades de mundo)
+    enRectangulo(ax, ay, bx, by, fn) {
+        const cx0 = Math.max(this.cx0, Math.floor(ax / this.tam)), cx1 = Math.min(this.cx1, Math.floor(bx / this.tam));
+        const cy0 = Math.max(this.cy0, Math.floor(ay / this.tam)), cy1 = Math.min(this.cy1, Math.floor(by / this.tam));
+        for (let cx = cx0; cx <= cx1; cx++) {
+            for (let cy = cy0; cy <= cy1; cy++) {
+                const lista = this.celdas.get(GrillaPuntos.clave(cx, cy));
+                if (lista) for (let j = 0; j < lista.length; j++) fn(lista[j]);
+            }
+        }
+    }
+}
+
+// Puntos en el estado k (los pendientes) con un contador por celda de la grilla.
+// cercano() busca por anillos de celdas alrededor del origen, saltando las
+// celdas sin pendientes, y se detiene cuando el anillo siguiente ya no puede
+// tener uno mas cerca: el costo depende de la densidad local, no del total.
+class ColaPendientes {
+    constructor(grilla, estado, k) {
+        this.grilla = grilla; this.estado = estado; this.k = k;
+        this.cuenta = new Map();
+        this.total = 0;
+    }
+
+    _sumar(i, d) {
+        const [cx, cy] = this.grilla.celdaDe(i), c = GrillaPuntos.clave(cx, cy);
+        this.cuenta.set(c, (this.cuenta.get(c) || 0) + d);
+        this.total += d;
+    }
+
+    agregar(ids) {
+        this.grilla.agregar(ids);
+        for (const i of ids) if (this.estado[i] === this.k) this._sumar(i, 1);
+    }
+
+    actualizar(i, antes, despues) {
+        if (antes === this.k) this._sumar(i, -1);
+        if (despues === this.k) this._sumar(i, 1);
+    }
+
+    // Punto mas cercano a (px, py) (unidades de mundo) sin contar `excluir` ni
+    // los que cumplan omitir(i), o -1
+    cercano(px, py, excluir, omitir) {
+        if (!this.total) return -1;
+        const g = this.grilla, cx = Math.floor(px / g.tam), cy = Math.floor(py / g.tam);
+        const rmax = Math.max(cx - g.cx0, g.cx1 - cx, cy - g.cy0, g.cy1 - cy);
+        let mejor = -1, mejorD = Infinity;
+        for (let r = 0; r <= rmax; r++) {
+            // Toda celda del anillo r esta a mas de (r - 1) celdas del origen
+            if (mejor >= 0 && mejorD <= (r - 1) * g.tam) break;
+            for (let ix = Math.max(cx - r, g.cx0); ix <= Math.min(cx + r, g.cx1); ix++) {
+                const paso = (ix === cx - r || ix === cx + r) ? 1 : 2 * r;
+                for (let iy = cy - r; iy <= cy + r; iy += paso) {
+                    if (iy < g.cy0 || iy > g.cy1) continue;
+                    const c = GrillaPuntos.clave(ix, iy);
+                    if (!this.cuenta.get(c)) continue;
+                    for (const i of g.celdas.get(c)) {
+                        if (i === excluir || this.estado[i] !== this.k || (omitir && omitir(i))) continue;
+                        const d = Math.hypot(g.x[i] - px, g.y[i] - py);
+                        if (d < mejorD) { mejor = i; mejorD = d; }
+                    }
+                }
+            }
+        }
+        return mejor;
+    }
+}
+
+// p: {lat, lon, x, y, estado}, arreglos de largo N compartidos con la app;
+// la capa solo conoce los puntos que se le agregan. tam: celda de la grilla
+const CapaCanvas = L.Layer.extend({
+    initialize: function (p, estilos, tam) {
+        this._estado = p.estado;          // Uint8Array, indice en ESTADOS
+        this._estilos = estilos;          // [{radio, relleno, borde, peso}] por estado
+        this._visible = estilos.map(() => true);
+        this._x = p.x;
+        this._y = p.y;
+        this._grilla = new GrillaPuntos(p.x, p.y, tam || 256 / Math.pow(2, 14));
+        this._buffers = estilos.map(() => new Int32Array(p.estado.length));
+    },
+
+    agregar: function (ids) { this._grilla.agregar(ids); this._pedirDibujo(); },
+
+    onAdd: function (map) {
+        this._canvas = L.DomUtil.create('canvas', 'leaflet-zoom-hide');
+        this._canvas.style.pointerEvents = 'none';
+        this._ctx = this._canvas.getContext('2d');
+        map.getPanes().overlayPane.appendChild(this._canvas);
+        map.on('moveend zoomend resize viewreset', this._reiniciar, this);
+        map.on('click', this._click, this);
+        map.on('mousemove', this._cursor, this);
+        this._reiniciar();
+    },
+
+    onRemove: function (map) {
+        L.DomUtil.remove(this._canvas);
+        map.off('moveend zoomend resize viewreset', this._reiniciar, this);
+        map.off('click', this._click, this);
+        map.off('mousemove', this._cursor, this);
+    },
+
+    setEstado: function (i, k) { this._estado[i] = k; this._pedirDibujo(); },
+    // miembros: indices en el estado k (la capa canvas no los necesita)
+    setFiltro: function (k, visible, miembros) { this._visible[k] = visible; this._pedirDibujo(); },
+
+    _pedirDibujo: function () {
+        if (this._pendiente || !this._map) return;
+        this._pendiente = L.Util.requestAnimFrame(() => { this._pendiente = null; this._dibujar(); });
+    },
+
+    _reiniciar: function () {
+        const map = this._map, tam = map.getSize(), dpr = window.devicePixelRatio || 1;
+        const esquina = map.containerPointToLayerPoint([0, 0]);
+        L.DomUtil.setPosition(this._canvas, esquina);
+        this._canvas.width = tam.x * dpr; this._canvas.height = tam.y * dpr;
+        this._canvas.style.width = tam.x + 'px'; this._canvas.style.height = tam.y + 'px';
+        this._dibujar();
+    },
+
+    _dibujar: function () {
+        const map = this._map, ctx = this._ctx, dpr = window.devicePixelRatio || 1;
+        const escala = Math.pow(2, map.getZoom());
+        const vista = map.getPixelBounds();
+        const margen = 20;
+        const ox = vista.min.x, oy = vista.min.y;
+        ctx.setTransform(dpr, 0, 0, dpr, 0, 0);
+        ctx.clearRect(0, 0, this._canvas.width, this._canvas.height);
+
+        // Culling: solo celdas dentro de la vista; se separan por estado
+        const cuenta = this._estilos.map(() => 0);
+        this._grilla.enRectangulo((ox - margen) / escala, (oy - margen) / escala,
+                                  (vista.max.x + margen) / escala, (vista.max.y + margen) / escala, (i) => {
+            const k = this._estado[i];
+            if (this._visible[k]) this._buffers[k][cuenta[k]++] = i;
+        });
+
+        // Un path por estado: el estilo se busca una sola vez (pendientes al final, encima)
+        const orden = [1, 2, 3, 0];
+        for (const k of orden) {
+            const e = this._estilos[k], b = this._buffers[k];
+            if (!cuenta[k]) continue;
+            ctx.beginPath();
+            for (let j = 0; j < cuenta[k]; j++) {
+                const i = b[j], px = this._x[i] * escala - ox, py = this._y[i] * escala - oy;
+                ctx.moveTo(px + e.radio, py);
+                ctx.arc(px, py, e.radio, 0, 2 * Math.PI);
+            }
+            ctx.globalAlpha = 0.8; ctx.fillStyle = e.relleno; ctx.fill();
+            ctx.globalAlpha = 1; ctx.lineWidth = e.peso; ctx.strokeStyle = e.borde; ctx.stroke();
+        }
+    },
+
+    // Punto visible mas cercano al pixel de contenedor, o -1
+    puntoEn: function (containerPoint) {
+        const map = this._map, escala = Math.pow(2, map.getZoom());
+        const p = map.containerPointToLayerPoint(containerPoint).add(map.getPixelOrigin());
+        const tol = Math.max(...this._estilos.map(e => e.radio + e.peso)) + 2;
+        let mejor = -1, mejorD = Infinity;
+        this._grilla.enRectangulo((p.x - tol) / escala, (p.y - tol) / escala,
+                                  (p.x + tol) / escala, (p.y + tol) / escala, (i) => {
+            const k = this._estado[i];
+            if (!this._visible[k]) return;
+            const dx = this._x[i] * escala - p.x, dy = this._y[i] * escala - p.y;
+            const d = Math.sqrt(dx * dx + dy * dy), r = this._estilos[k].radio + this._estilos[k].peso + 2;
+            if (d <= r && d < mejorD) { mejor = i; mejorD = d; }
+        });
+        return mejor;
+    },
+
+    _click: function (ev) {
+        const i = this.puntoEn(ev.containerPoint);
+        if (i >= 0) this.fire('clickpunto', {indice: i});
+    },
+
+    _cursor: function (ev) {
+        this._map.getContainer().style.cursor = this.puntoEn(ev.containerPoint) >= 0 ? 'pointer' : '';
+    }
+});
+
+// Misma interfaz con un L.circleMarker por punto (modo anterior)
+const CapaSVG = L.Layer.extend({
+    initialize: function (p, estilos) {
+        this._p = p; this._estado = p.estado; this._estilos = estilos;
+        this._visible = estilos.map(() => true);
+        this._marcadores = new Map();
+    },
+    _estilo: function (i) {
+        const k = this._estado[i], e = this._estilos[k], v = this._visible[k];
+        return {radius: e.radio, fillColor: e.relleno, color: e.borde, weight: e.peso,
+                opacity: v ? 1 : 0, fillOpacity: v ? 0.8 : 0};
+    },
+    agregar: function (ids) {
+        for (const i of ids) {
+            const m = L.circleMarker([this._p.lat[i], this._p.lon[i]], this._estilo(i));
+            m.on('click', () => this.fire('clickpunto', {indice: i}));
+            this._marcadores.set(i, m);
+            if (this._map) m.addTo(this._map);
+        }
+    },
+    onAdd: function (map) { this._marcadores.forEach(m => m.addTo(map)); },
+    onRemove: function () { this._marcadores.forEach(m => m.remove()); },
+    setEstado: function (i, k) { this._estado[i] = k; this._marcadores.get(i).setStyle(this._estilo(i)); },
+    setFiltro: function (k, visible, miembros) {
+        this._visible[k] = visible;
+        for (const i of miembros) this._marcadores.get(i).setStyle(this._estilo(i));
+    }
+});
+"""
+
+
+# ==============================================================================
+# BITACORA
+# ==============================================================================
+# Los cambios se guardan como entradas que solo se agregan (una transaccion
+# por clic, sin reescribir lo anterior). Entrada:
+#     [id, estado, lat_q, lon_q, inicial, ts_ms, autor]
+# con lat_q/lon_q en grados * INDICE.escala. exportar() arma el .rlog que lee
+# bitacora_clasificacion.py.
+JS_BITACORA = r"""
+class Bitacora {
+    constructor(nombre) { this.nombre = nombre; this.db = null; this.n = 0; }
+
+    // Promise con todas las entradas. Sin IndexedDB (o si falla al abrir) se usa
+    // localStorage con una clave por entrada: agregar sigue sin reescribir nada
+    abrir() {
+        return new Promise(ok => {
+            if (typeof indexedDB === 'undefined' || !indexedDB) { ok(this._leerLocal()); return; }
+            const req = indexedDB.open(this.nombre, 1);
+            req.onupgradeneeded = () => req.result.createObjectStore('entradas', {autoIncrement: true});
+            req.onerror = () => ok(this._leerLocal());
+            req.onsuccess = () => {
+                this.db = req.result;
+                const r = this.db.transaction('entradas', 'readonly').objectStore('entradas').getAll();
+                r.onsuccess = () => ok(r.result);
+                r.onerror = () => { this.db = null; ok(this._leerLocal()); };
+            };
+        });
+    }
+
+    _leerLocal() {
+        this.n = +(localStorage.getItem(this.nombre + ':n') || 0);
+        const lista = [];
+        for (let j = 0; j < this.n; j++) {
+            const e = localStorage.getItem(this.nombre + ':' + j);
+            if (e) lista.push(JSON.parse(e));
+        }
+        return lista;
+    }
+
+    agregar(lista) {
+        if (this.db) {
+            const almacen = this.db.transaction('entradas', 'readwrite').objectStore('entradas');
+            for (const e of lista) almacen.add(e);
+            return;
+        }
+        for (const e of lista) localStorage.setItem(this.nombre + ':' + (this.n++), JSON.stringify(e));
+        localStorage.setItem(this.nombre + ':n', this.n);
+    }
+
+    vaciar() {
+        if (this.db) { this.db.transaction('entradas', 'readwrite').objectStore('entradas').clear(); return; }
+        for (let j = 0; j < this.n; j++) localStorage.removeItem(this.nombre + ':' + j);
+        localStorage.removeItem(this.nombre + ':n');
+        this.n = 0;
+    }
+
+    // .rlog: 'RLOG1\n' + cabecera JSON + registros de 24 bytes little-endian
+    static exportar(entradas, clave, escala) {
+        const autores = [...new Set(entradas.map(e => e[6]))].sort(), codigo = new Map(autores.map((a, k) => [a, k]));
+        const cab = new TextEncoder().encode('RLOG1\n' + JSON.stringify({clave: clave, autores: autores, n: entradas.length, escala: escala}) + '\n');
+        const buf = new ArrayBuffer(cab.length + 24 * entradas.length), dv = new DataView(buf);
+        new Uint8Array(buf).set(cab);
+        entradas.forEach((e, j) => {
+            const o = cab.length + 24 * j;
+            dv.setInt32(o, e[0], true); dv.setInt32(o + 4, e[2], true); dv.setInt32(o + 8, e[3], true);
+            dv.setFloat64(o + 12, e[5], true); dv.setUint16(o + 20, codigo.get(e[6]), true);
+            dv.setUint8(o + 22, e[1]); dv.setUint8(o + 23, e[4]);
+        });
+        return buf;
+    }
+}
+"""
+
+
+# ==============================================================================
+# APLICACION
+# ==============================================================================
+# Lee la configuracion de CFG, INDICE y TESELAS (escritos por html_clasificador).
+# Los arreglos por punto tienen largo N (el id del punto es su indice) y se
+# llenan cuando llega la tesela que lo contiene; antes su estado es DESCONOCIDO.
+# Los contadores del panel parten de los totales del indice y se corrigen con
+# los cambios guardados, asi que no hace falta cargar todo para mostrarlos.
+# cambios[i] es la ultima entrada de la bitacora para el punto i.
+JS_APP = r"""
+const K = {pending: 0, cerrada: 1, abierta: 2, otro: 3};
+const TXT = {pending: 'Pendiente', cerrada: 'Cerrada', abierta: 'Abierta', otro: 'Otro'};
+const N = INDICE.n;
+const P = {lat: new Float64Array(N), lon: new Float64Array(N), x: new Float64Array(N),
+           y: new Float64Array(N), estado: new Uint8Array(N).fill(DESCONOCIDO)};
+const estado = P.estado, inicial = new Uint8Array(N);
+const indices = ESTADOS.map(() => new Set());      // puntos cargados por estado
+const filtros = {pending: true, cerrada: true, abierta: true, otro: true};
+const existentes = new Map(INDICE.teselas.map(t => [t[0] + '/' + t[1], t]));
+const teselas = new Map();                          // "x/y" -> Promise de la carga
+let capa, cola, resumen, conteo, bitacora, cambios = {}, entradas = [];
+// Ruta: posRuta[i] posicion de i en ruta.id (-1 = fuera); pendPaquete: pendientes
+// por paquete; cursor[p]: antes de esta posicion del paquete no hay pendientes
+let ruta = null, paquete = -1, posRuta, paqueteDe, pendPaquete, cursor;
+// Con servidor_clasificador.py: servidor = {enviadas, enviando, conectados}
+// (enviadas: cuantas entradas locales ya estan en el servidor; la bitacora solo
+// crece, asi que basta un contador) y tomados[i] = [autor, vence] de los puntos
+// que otro encuestador tiene abiertos
+let servidor = null;
+const tomados = new Map();
+
+const map = L.map('map').setView(INDICE.centro, 14);
+L.tileLayer('https://{s}.basemaps.cartocdn.com/dark_all/{z}/{x}/{y}{r}.png', {maxZoom: 19}).addTo(map);
+
+// ---- Bitacora --------------------------------------------------------------
+function aplicar(e) {
+    const c = cambios[e[0]];
+    if (c && c.time > e[5]) return;
+    cambios[e[0]] = {estado: ESTADOS[e[1]], lat: e[2] / INDICE.escala, lon: e[3] / INDICE.escala,
+                     prev: ESTADOS[e[4]], time: e[5], por: e[6]};
+}
+
+// Cambios de la version anterior (un objeto JSON en localStorage): su clave es
+// la posicion del punto en el DATA de entonces, que no sirve ahora (los puntos
+// van ordenados por nodo). Cada cambio se busca por coordenadas, en la grilla
+// de INDICE.escala, en la tesela que le toca; los que no aparecen se descartan.
+// Lo mismo para las claves de los generadores mas viejos (clasificaciones_rejas,
+// _v2, _v3), que guardaban estadoPrevio/timestamp/clasificadoPor; se ignoran los
+// cambios sin coordenadas o con un estado que no existe
+function migrarCambios(viejo) {
+    const validos = Object.values(JSON.parse(viejo)).filter(c => c && K[c.estado] > 0 &&
+        Number.isFinite(c.lat) && Number.isFinite(c.lon));
+    const previos = validos.map(c => ({c: c,
+        lat_q: Math.round(c.lat * INDICE.escala), lon_q: Math.round(c.lon * INDICE.escala)}));
+    const claves = new Set(previos.map(v => claveTesela(v.c.lat, v.c.lon)));
+    const ids = new Map();                            // "lat_q,lon_q" -> id
+    return Promise.all([...claves].filter(k => existentes.has(k)).map(k => {
+        const [x, y] = k.split('/');
+        return leer(INDICE.zoom + '/' + x + '/' + y + '.bin', TESELAS ? TESELAS[k] : undefined).then(buf => {
+            const t = columnas(buf, false);
+            for (let j = 0; j < t.n; j++) ids.set(t.lat[j] + ',' + t.lon[j], t.id[j]);
+        });
+    })).then(() => previos.filter(v => ids.has(v.lat_q + ',' + v.lon_q)).map(({c, lat_q, lon_q}) => [
+        ids.get(lat_q + ',' + lon_q), K[c.estado], lat_q, lon_q, K[c.prev || c.estadoPrevio] || K.pending,
+        Date.parse(c.time || c.timestamp) || Date.now(), c.por || c.clasificadoPor || '']));
+}
+
+// Abre la bitacora y migra una sola vez los cambios de la version anterior (si
+// sus teselas no se pueden leer, quedan en localStorage para la proxima vez)
+function abrirBitacora() {
+    bitacora = new Bitacora('bitacora_' + CFG.clave);
+    return bitacora.abrir().then(lista => {
+        const viejo = localStorage.getItem(CFG.clave);
+        if (!viejo) return lista;
+        return migrarCambios(viejo).then(migradas => {
+            bitacora.agregar(migradas);
+            localStorage.removeItem(CFG.clave);
+            return lista.concat(migradas);
+        }, () => lista);
+    }).then(lista => {
+        entradas = lista;
+        entradas.forEach(aplicar);
+    });
+}
+
+// ---- Teselas --------------------------------------------------------------
+function binario(b64) {
+    const s = atob(b64), u = new Uint8Array(s.length);
+    for (let i = 0; i < s.length; i++) u[i] = s.charCodeAt(i);
+    return u.buffer;
+}
+
+// Con TESELAS (modo inline) los datos vienen en el HTML; si no, se piden al servidor
+function leer(archivo, b64) {
+    if (b64 !== undefined) return Promise.resolve(binario(b64));
+    return fetch(CFG.url_teselas + archivo).then(r => {
+        if (!r.ok) throw new Error(archivo + ': ' + r.status);
+        return r.arrayBuffer();
+    });
+}
+
+// uint32 n | int32 id[n] | int32 lat[n] | int32 lon[n] | uint8 estado[n]
+function columnas(buf, conEstado) {
+    const n = new Uint32Array(buf, 0, 1)[0];
+    const c = {n: n, id: new Int32Array(buf, 4, n), lat: new Int32Array(buf, 4 + 4 * n, n),
+               lon: new Int32Array(buf, 4 + 8 * n, n)};
+    if (conEstado) c.estado = new Uint8Array(buf, 4 + 12 * n, n);
+    return c;
+}
+
+function cargarTesela(clave) {
+    if (!existentes.has(clave)) return Promise.resolve();
+    if (!teselas.has(clave)) {
+        const [x, y] = clave.split('/');
+        teselas.set(clave, leer(INDICE.zoom + '/' + x + '/' + y + '.bin', TESELAS ? TESELAS[clave] : undefined).then(buf => {
+            const c = columnas(buf, true);
+            for (let j = 0; j < c.n; j++) {
+                const i = c.id[j];
+                P.lat[i] = c.lat[j] / INDICE.escala; P.lon[i] = c.lon[j] / INDICE.escala;
+                [P.x[i], P.y[i]] = aMundo(P.lat[i], P.lon[i]);
+                inicial[i] = c.estado[j];
+                estado[i] = cambios[i] ? K[cambios[i].estado] : c.estado[j];
+                indices[estado[i]].add(i);
+            }
+            capa.agregar(c.id); cola.agregar(c.id);
+            resumen.removeLayer(existentes.get(clave).marcador);
+        }).catch(err => {
+            teselas.delete(clave);
+            showToast(location.protocol === 'file:' ? 'Abrir el HTML con un servidor (ver README)' : 'Error al cargar ' + clave);
+            throw err;
+        }));
+    }
+    return teselas.get(clave);
+}
+
+function claveTesela(la, lo) {
+    const [x, y] = aMundo(la, lo), f = Math.pow(2, INDICE.zoom) / 256;
+    return Math.floor(x * f) + '/' + Math.floor(y * f);
+}
+
+// Pide las teselas que tocan la vista (desde zoom_min)
+function cargarVista() {
+    if (map.getZoom() < INDICE.zoom_min) return;
+    const b = map.getPixelBounds(), f = Math.pow(2, INDICE.zoom - map.getZoom()) / 256;
+    for (let x = Math.floor(b.min.x * f); x <= Math.floor(b.max.x * f); x++) {
+        for (let y = Math.floor(b.min.y * f); y <= Math.floor(b.max.y * f); y++) {
+            if (existentes.has(x + '/' + y)) cargarTesela(x + '/' + y).catch(() => {});
+        }
+    }
+}
+
+// Un circulo por tesela sin cargar, con su cantidad de puntos
+function crearResumen() {
+    resumen = L.layerGroup().addTo(map);
+    existentes.forEach(t => {
+        const [, , n, la, lo] = t;
+        t.marcador = L.circleMarker([la, lo], {radius: 6 + Math.sqrt(n) / 2, color: '#888', fillColor: '#555',
+                                               fillOpacity: 0.5, weight: 1});
+        t.marcador.bindTooltip(n + ' puntos (acercar para cargar)');
+        t.marcador.on('click', () => map.setView([la, lo], Math.max(map.getZoom() + 1, INDICE.zoom_min)));
+        resumen.addLayer(t.marcador);
+    });
+}
+
+// ---- Estados y contadores -------------------------------------------------
+function iniciarConteo() {
+    conteo = INDICE.conteo.slice();
+    for (const c of Object.values(cambios)) { conteo[K[c.prev]]--; conteo[K[c.estado]]++; }
+}
+
+// Estado aunque la tesela no haya llegado (la ruta solo tiene pendientes iniciales)
+function estadoDe(i) {
+    if (estado[i] !== DESCONOCIDO) return estado[i];
+    if (cambios[i]) return K[cambios[i].estado];
+    return ruta && posRuta[i] >= 0 ? K.pending : DESCONOCIDO;
+}
+
+function contar(i, antes, k) {
+    if (antes === k) return;
+    conteo[antes]--; conteo[k]++;
+    if (ruta && paqueteDe[i] >= 0) {
+        const p = paqueteDe[i];
+        if (antes === K.pending) pendPaquete[p]--;
+        if (k === K.pending) { pendPaquete[p]++; cursor[p] = Math.min(cursor[p], posRuta[i]); }
+    }
+}
+
+function updateMarker(i, e) {
+    const antes = estado[i], k = K[e];
+    if (antes === k) return;
+    indices[antes].delete(i); indices[k].add(i);
+    cola.actualizar(i, antes, k); capa.setEstado(i, k);
+    contar(i, antes, k);
+}
+
+// Pendiente y sin reserva de otro encuestador
+function tomado(i) { const t = tomados.get(i); return t !== undefined && t[1] > Date.now(); }
+function libre(i) { return estadoDe(i) === K.pending && !tomado(i); }
+
+// ---- Ruta -----------------------------------------------------------------
+function cargarRuta() {
+    leer('ruta.bin', TESELAS ? TESELAS.ruta : undefined).then(buf => {
+        const r = columnas(buf, false);
+        posRuta = new Int32Array(N).fill(-1); paqueteDe = new Int32Array(N).fill(-1);
+        INDICE.paquetes.forEach(([a, b], p) => { for (let j = a; j < b; j++) { posRuta[r.id[j]] = j; paqueteDe[r.id[j]] = p; } });
+        ruta = r;
+        pendPaquete = new Int32Array(INDICE.paquetes.length);
+        for (let j = 0; j < r.n; j++) if (estadoDe(r.id[j]) === K.pending) pendPaquete[paqueteDe[r.id[j]]]++;
+        cursor = INDICE.paquetes.map(([a]) => a);
+        const g = localStorage.getItem(CFG.clave + '_paquete');
+        if (g !== null && +g < INDICE.paquetes.length) { paquete = +g; document.getElementById('paquete').value = g; }
+        updateStats();
+    }).catch(() => showToast('No se pudo cargar la ruta'));
+}
+
+function elegirPaquete(p) {
+    paquete = p; localStorage.setItem(CFG.clave + '_paquete', p); updateStats();
+    if (p >= 0) goNext(-1);
+}
+
+// Siguiente pendiente en la ruta despues de curr, dentro del paquete elegido
+function siguienteEnRuta(curr) {
+    const paqs = paquete >= 0 ? [paquete] : INDICE.paquetes.map((_, p) => p);
+    const j0 = curr >= 0 ? posRuta[curr] : -1;
+    if (j0 >= 0 && paqs.includes(paqueteDe[curr])) {
+        for (let j = j0 + 1; j < INDICE.paquetes[paqueteDe[curr]][1]; j++) if (libre(ruta.id[j])) return ruta.id[j];
+    }
+    for (const p of paqs) {
+        if (!pendPaquete[p]) continue;
+        while (estadoDe(ruta.id[cursor[p]]) !== K.pending) cursor[p]++;
+        for (let j = cursor[p]; j < INDICE.paquetes[p][1]; j++) if (libre(ruta.id[j])) return ruta.id[j];
+    }
+    return -1;
+}
+
+// ---- Servidor -------------------------------------------------------------
+// Solo si el HTML lo sirve servidor_clasificador.py (con http.server o file://
+// api/entradas no existe y el clasificador trabaja solo con su bitacora)
+const API = 'api/', LOTE_ENVIO = 500;
+
+function conectarServidor() {
+    if (location.protocol === 'file:' || typeof fetch === 'undefined') return;
+    const clave = encodeURIComponent(CFG.clave);
+    fetch(API + 'entradas?clave=' + clave + '&desde=0').then(r => r.ok ? r.json() : null).then(d => {
+        if (!d || !d.entradas) return;
+        servidor = {enviadas: Math.min(+(localStorage.getItem(CFG.clave + '_enviadas') || 0), entradas.length),
+                    enviando: false, conectados: d.conectados};
+        d.entradas.forEach(recibir); d.reservas.forEach(reservar);
+        updateStats(); enviarPendientes();
+        // EventSource se reconecta solo y pide desde el ultimo id recibido
+        const fuente = new EventSource(API + 'eventos?clave=' + clave + '&desde=' + d.ultimo);
+        fuente.onmessage = ev => { JSON.parse(ev.data).forEach(recibir); updateStats(); };
+        fuente.addEventListener('reserva', ev => reservar(JSON.parse(ev.data)));
+        fuente.addEventListener('conectados', ev => { servidor.conectados = +JSON.parse(ev.data); updateStats(); });
+        fuente.onopen = () => enviarPendientes();
+    }).catch(() => {});
+}
+
+// Entrada de otro encuestador (o propia ya aplicada, que se ignora)
+function recibir(e) {
+    const i = e[0], c = cambios[i];
+    if (i < 0 || i >= N || (c && c.time >= e[5])) return;
+    const antes = estado[i] !== DESCONOCIDO ? estado[i] : (c ? K[c.estado] : e[4]);
+    aplicar(e); tomados.delete(i);
+    if (estado[i] !== DESCONOCIDO) updateMarker(i, ESTADOS[e[1]]);
+    else contar(i, antes, e[1]);
+}
+
+function reservar([i, autor, ms]) {
+    if (autor !== document.getElementById('assistantName').value) tomados.set(i, [autor, Date.now() + ms]);
+}
+
+// Manda lo que falta en un POST; los clics que llegan mientras tanto salen
+// juntos en el siguiente. Si falla se reintenta y nada se pierde: la
+// bitacora local sigue teniendo todo
+function enviarPendientes() {
+    if (!servidor || servidor.enviando || servidor.enviadas >= entradas.length) return;
+    const hasta = Math.min(entradas.length, servidor.enviadas + LOTE_ENVIO);
+    servidor.enviando = true;
+    fetch(API + 'entradas', {method: 'POST', headers: {'Content-Type': 'application/json'},
+                             body: JSON.stringify({clave: CFG.clave, entradas: entradas.slice(servidor.enviadas, hasta)})})
+        .then(r => { if (!r.ok) throw new Error(r.status); })
+        .then(() => {
+            servidor.enviadas = hasta; servidor.enviando = false;
+            localStorage.setItem(CFG.clave + '_enviadas', hasta);
+            updateStats(); enviarPendientes();
+        }, () => { servidor.enviando = false; updateStats(); setTimeout(enviarPendientes, 5000); });
+}
+
+// ---- Interfaz -------------------------------------------------------------
+function openPopup(i) {
+    const e = ESTADOS[estado[i]], t = tomado(i) ? tomados.get(i)[0] : '';
+    if (servidor) {
+        fetch(API + 'reservas', {method: 'POST', headers: {'Content-Type': 'application/json'},
+            body: JSON.stringify({clave: CFG.clave, id: i, autor: document.getElementById('assistantName').value || 'Anonimo'})}).catch(() => {});
+    }
+    L.popup().setLatLng([P.lat[i], P.lon[i]]).setContent(`
+        <div class="classify-popup">
+            <h3>${CFG.etiqueta} #${i + 1}</h3>
+            <div class="coord">${P.lat[i].toFixed(6)}, ${P.lon[i].toFixed(6)}</div>
+            <div style="margin-bottom:10px">Estado: <strong>${TXT[e]}</strong></div>
+            ${t ? `<div style="margin-bottom:10px;color:#e67e22">Abierto por ${t}</div>` : ''}
+            <button class="btn btn-cerrada" onclick="clasificar(${i},'cerrada')">CERRADA</button>
+            <button class="btn btn-abierta" onclick="clasificar(${i},'abierta')">ABIERTA</button>
+            <button class="btn btn-otro" onclick="clasificar(${i},'otro')">OTRO</button>
+        </div>
+    `).openOn(map);
+}
+
+function clasificar(i, e) {
+    const n = document.getElementById('assistantName').value || 'Anonimo';
+    const entrada = [i, K[e], Math.round(P.lat[i] * INDICE.escala), Math.round(P.lon[i] * INDICE.escala),
+                     inicial[i], Date.now(), n];
+    bitacora.agregar([entrada]); entradas.push(entrada); aplicar(entrada);
+    updateMarker(i, e); enviarPendientes(); updateStats(); map.closePopup();
+    showToast(e.toUpperCase()); goNext(i);
+}
+
+// Siguiente = el que sigue en la ruta, o sin ruta el pendiente cargado mas cercano
+function goNext(curr) {
+    let i = -1, destino;
+    if (INDICE.paquetes) {
+        if (!ruta) { showToast('Cargando ruta...'); return; }
+        i = siguienteEnRuta(curr);
+        if (i >= 0) destino = [ruta.lat[posRuta[i]] / INDICE.escala, ruta.lon[posRuta[i]] / INDICE.escala];
+    } else {
+        const c = map.getCenter(), [x, y] = curr >= 0 ? [P.x[curr], P.y[curr]] : aMundo(c.lat, c.lng);
+        i = cola.cercano(x, y, curr, tomado);
+        if (i >= 0) destino = [P.lat[i], P.lon[i]];
+    }
+    if (i < 0) {
+        if (!conteo[K.pending]) showToast('Todos clasificados!');
+        else showToast(INDICE.paquetes ? 'Paquete completo!' : 'Sin pendientes en la zona cargada');
+        return;
+    }
+    map.setView(destino, CFG.zoom_siguiente);
+    cargarTesela(claveTesela(destino[0], destino[1])).then(() => setTimeout(() => openPopup(i), 300)).catch(() => {});
+}
+
+function updateStats() {
+    document.getElementById('pendingCount').textContent = conteo[K.pending];
+    document.getElementById('cerradaCount').textContent = conteo[K.cerrada];
+    document.getElementById('abiertaCount').textContent = conteo[K.abierta];
+    document.getElementById('otroCount').textContent = conteo[K.otro];
+    const pct = Math.round(((N - conteo[K.pending]) / N) * 100);
+    document.getElementById('progressFill').style.width = pct + '%';
+    document.getElementById('progressText').textContent = pct + '% (' + conteo[K.pending] + ' pendientes)';
+    if (ruta) {
+        const n = paquete >= 0 ? pendPaquete[paquete] : pendPaquete.reduce((a, b) => a + b, 0);
+        document.getElementById('paqueteText').textContent = n + ' pendientes en ' + (paquete >= 0 ? 'el paquete ' + (paquete + 1) : 'la ruta');
+    }
+    if (servidor) {
+        const sin = entradas.length - servidor.enviadas;
+        document.getElementById('servidorText').textContent = 'En linea: ' + servidor.conectados + ' conectados' + (sin ? ', ' + sin + ' sin enviar' : '');
+    }
+}
+
+function toggleFilter(e) {
+    filtros[e] = !filtros[e];
+    document.querySelectorAll('.filter-btn').forEach(b => { if (b.textContent.toLowerCase().includes(e.substring(0, 4))) b.classList.toggle('active', filtros[e]); });
+    capa.setFiltro(K[e], filtros[e], indices[K[e]]);
+}
+
+// La bitacora completa, para fusionar con bitacora_clasificacion.py
+function exportData() {
+    if (!entradas.length) { showToast('Sin cambios'); return; }
+    download(Bitacora.exportar(entradas, CFG.clave, INDICE.escala),
+             CFG.clave + '_' + new Date().toISOString().split('T')[0] + '.rlog', 'application/octet-stream');
+}
+
+// Necesita todos los puntos: carga las teselas que falten
+function exportAll() {
+    showToast('Cargando todos los puntos...');
+    Promise.all([...existentes.keys()].map(cargarTesela)).then(() => {
+        let csv = 'lat,lon,estado\n';
+        for (let i = 0; i < N; i++) if (estado[i] !== DESCONOCIDO) csv += P.lat[i] + ',' + P.lon[i] + ',' + [-1, 0, 1, 2][estado[i]] + '\n';
+        download(csv, 'todos_' + new Date().toISOString().split('T')[0] + '.csv', 'text/csv');
+    }).catch(() => {});
+}
+
+function download(datos, name, tipo) { const a = document.createElement('a'); a.href = URL.createObjectURL(new Blob([datos], {type: tipo})); a.download = name; a.click(); }
+
+function resetData() {
+    if (!confirm('Borrar cambios?')) return;
+    for (const s of Object.keys(cambios)) {
+        const i = +s, c = cambios[i];
+        if (estado[i] !== DESCONOCIDO) updateMarker(i, c.prev);
+        else contar(i, K[c.estado], K[c.prev]);
+    }
+    cambios = {}; entradas = []; bitacora.vaciar();
+    if (servidor) { servidor.enviadas = 0; localStorage.setItem(CFG.clave + '_enviadas', 0); }
+    updateStats();
+}
+
+function showToast(m) { const t = document.getElementById('toast'); t.textContent = m; t.style.display = 'block'; setTimeout(() => t.style.display = 'none', 2000); }
+
+// Las teselas se piden despues de leer la bitacora: cada punto nace con su estado
+abrirBitacora().then(() => {
+    iniciarConteo();
+    capa = new (CFG.render === 'svg' ? CapaSVG : CapaCanvas)(P, ESTILOS, 256 / Math.pow(2, INDICE.zoom));
+    capa.on('clickpunto', ev => openPopup(ev.indice));
+    capa.addTo(map);
+    cola = new ColaPendientes(new GrillaPuntos(P.x, P.y, 256 / Math.pow(2, 17)), estado, K.pending);
+    crearResumen();
+    map.on('moveend', cargarVista); cargarVista();
+    updateStats();
+    if (INDICE.paquetes) cargarRuta();
+    conectarServidor();
+});
+const sn = localStorage.getItem('assistant_name'); if (sn) document.getElementById('assistantName').value = sn;
+document.getElementById('assistantName').onchange = function () { localStorage.setItem('assistant_name', this.value); };
+"""
+
+
+def estilos_estado(radio_pendiente, radio):
+    """Estilo por indice de estado (mismo orden que ESTADOS)."""
+    return [
+        {'radio': radio_pendiente if e == 'pending' else radio,
+         'relleno': COLORES[e],
+         'borde': '#fff' if e == 'pending' else COLORES[e],
+         'peso': 2 if e == 'pending' else 1}
+        for e in ESTADOS
+    ]
+
+
+def empaquetar_puntos(puntos, ruta=None):
+    """Teselas binarias de los puntos (teselas_puntos) con los paquetes de la ruta."""
+    codigo = {e: k for k, e in enumerate(ESTADOS)}
+    paquete = empaquetar_teselas([p['lat'] for p in puntos], [p['lon'] for p in puntos],
+                                 [codigo[p['estadoInicial']] for p in puntos], len(ESTADOS),
+                                 orden_ruta=None if ruta is None else ruta['orden'])
+    paquete['indice']['paquetes'] = None if ruta is None else [list(p) for p in ruta['paquetes']]
+    return paquete
+
+
+def escribir_teselas(puntos, directorio, ruta=None):
+    """Escribe las teselas para un HTML generado con datos='teselas'."""
+    guardar_teselas(empaquetar_puntos(puntos, ruta), directorio)
+
+
+def html_clasificador(puntos, instrucciones, clave_storage, etiqueta='Punto',
+                      radio_pendiente=7, radio=5, zoom_siguiente=18, render='canvas',
+                      ruta=None, datos='inline', url_teselas='teselas/',
+                      titulo='Clasificador de Rejas - La Florida'):
+    """
+    Arma el HTML del clasificador.
+
+    Parametros:
+    -----------
+    puntos : list of dict
+        Con lat, lon y estadoInicial ('pending', 'cerrada', 'abierta', 'otro')
+    instrucciones : str
+        HTML del recuadro de instrucciones del panel
+    clave_storage : str
+        Nombre de la bitacora de cambios (IndexedDB 'bitacora_<clave>')
+    etiqueta : str
+        Titulo del popup ("Punto #12", "Cruce #12")
+    radio_pendiente, radio : int
+        Radio en pixeles de los puntos pendientes y clasificados
+    zoom_siguiente : int
+        Zoom al saltar al siguiente pendiente
+    render : str
+        'canvas' (por defecto) o 'svg'
+    ruta : dict, opcional
+        Resultado de ruta_clasificacion.ruta_pendientes. Sin ruta, "siguiente"
+        es el pendiente mas cercano
+    datos : str
+        'inline': las teselas van dentro del HTML (se abre con doble click).
+        'teselas': el HTML solo lleva el indice y pide las teselas a
+        url_teselas; hay que escribirlas con escribir_teselas y servir la
+        carpeta por HTTP
+    url_teselas : str
+        URL (relativa al HTML) de la carpeta de teselas
+
+    Retorna:
+    --------
+    str con el documento HTML completo
+    """
+    if render not in ('canvas', 'svg'):
+        raise ValueError(f"render debe ser 'canvas' o 'svg', no {render!r}")
+    if datos not in ('inline', 'teselas'):
+        raise ValueError(f"datos debe ser 'inline' o 'teselas', no {datos!r}")
+
+    paquete = empaquetar_puntos(puntos, ruta)
+    teselas_inline = None
+    if datos == 'inline':
+        teselas_inline = {f"{x}/{y}": base64.b64encode(b).decode('ascii')
+                          for (x, y), b in paquete['teselas'].items()}
+        if paquete['ruta'] is not None:
+            teselas_inline['ruta'] = base64.b64encode(paquete['ruta']).decode('ascii')
+    cfg = {'clave': clave_storage, 'etiqueta': etiqueta, 'zoom_siguiente': zoom_siguiente,
+           'render': render, 'url_teselas': url_teselas}
+
+    panel_ruta = ''
+    if ruta is not None:
+        opciones = ''.join(f'<option value="{j}">{j + 1} ({b - a} puntos)</option>'
+                           for j, (a, b) in enumerate(ruta['paquetes']))
+        panel_ruta = f'''<div class="filters">
+            <div style="font-size:12px;color:#aaa;margin-bottom:5px">Paquete de trabajo:</div>
+            <select class="assistant-input" id="paquete" onchange="elegirPaquete(+this.value)"><option value="-1">Todos</option>{opciones}</select>
+            <div style="text-align:center;font-size:12px;color:#888" id="paqueteText"></div>
+            <button class="btn btn-export" style="background:#f39c12" onclick="goNext(-1)">Ir al siguiente</button>
+        </div>'''
+
+    return f'''<!DOCTYPE html>
+<html lang="es">
+<head>
+    <meta charset="UTF-8">
+    <meta name="viewport" content="width=device-width, initial-scale=1.0">
+    <title>{titulo}</title>
+    <link rel="stylesheet" href="https://unpkg.com/leaflet@1.9.4/dist/leaflet.css" />
+    <style>
+        *{{margin:0;padding:0;box-sizing:border-box}}
+        body{{font-family:'Segoe UI',Arial,sans-serif}}
+        #map{{height:100vh;width:100%}}
+        .control-panel{{position:fixed;top:10px;right:10px;background:rgba(30,30,30,0.95);padding:15px;border-radius:10px;color:white;z-index:1000;min-width:280px;max-height:90vh;overflow-y:auto}}
+        .control-panel h2{{font-size:16px;margin-bottom:15px;padding-bottom:10px;border-bottom:1px solid #444}}
+        .stat-row{{display:flex;justify-content:space-between;margin:5px 0;font-size:13px}}
+        .dot{{display:inline-block;width:10px;height:10px;border-radius:50%;margin-right:5px}}
+        .dot-pending{{background:#f39c12}}.dot-cerrada{{background:#e74c3c}}.dot-abierta{{background:#2ecc71}}.dot-otro{{background:#9b59b6}}
+        .progress-bar{{background:#333;border-radius:5px;height:8px;margin:10px 0}}
+        .progress-fill{{height:100%;background:linear-gradient(90deg,#2ecc71,#27ae60);transition:width 0.3s}}
+        .btn{{display:block;width:100%;padding:10px;margin:5px 0;border:none;border-radius:5px;cursor:pointer;font-size:13px;font-weight:bold}}
+        .btn:hover{{transform:scale(1.02)}}
+        .btn-export{{background:#3498db;color:white}}.btn-reset{{background:#555;color:white}}
+        .btn-cerrada{{background:#e74c3c;color:white}}.btn-abierta{{background:#2ecc71;color:white}}.btn-otro{{background:#9b59b6;color:white}}
+        .classify-popup{{text-align:center;min-width:200px}}
+        .classify-popup h3{{margin-bottom:10px;color:#333}}
+        .classify-popup .coord{{font-size:11px;color:#666;margin-bottom:10px}}
+        .instructions{{background:rgba(52,152,219,0.2);padding:10px;border-radius:5px;margin-bottom:15px;font-size:12px;border-left:3px solid #3498db}}
+        .filters{{margin:15px 0;padding-top:10px;border-top:1px solid #444}}
+        .filter-btn{{padding:5px 10px;margin:2px;border:none;border-radius:3px;cursor:pointer;font-size:11px;opacity:0.6}}
+        .filter-btn.active{{opacity:1}}
+        .assistant-input{{width:100%;padding:8px;border:1px solid #444;border-radius:5px;background:#333;color:white;margin-bottom:10px}}
+        .toast{{position:fixed;bottom:20px;left:50%;transform:translateX(-50%);background:#333;color:white;padding:12px 25px;border-radius:25px;z-index:2000;display:none}}
+        .map-legend{{position:fixed;bottom:20px;left:10px;background:rgba(30,30,30,0.9);padding:10px 15px;border-radius:8px;color:white;z-index:1000;font-size:12px}}
+    </style>
+</head>
+<body>
+    <div id="map"></div>
+    <div class="control-panel">
+        <h2>Clasificador de Rejas</h2>
+        <div class="instructions">
+            {instrucciones}
+        </div>
+        <label style="font-size:12px;color:#aaa">Tu nombre:</label>
+        <input type="text" class="assistant-input" id="assistantName" placeholder="Ej: Juan Perez">
+        <div class="stats">
+            <div class="stat-row"><span><span class="dot dot-pending"></span> Pendientes:</span><span id="pendingCount">0</span></div>
+            <div class="stat-row"><span><span class="dot dot-cerrada"></span> Cerradas:</span><span id="cerradaCount">0</span></div>
+            <div class="stat-row"><span><span class="dot dot-abierta"></span> Abiertas:</span><span id="abiertaCount">0</span></div>
+            <div class="stat-row"><span><span class="dot dot-otro"></span> Otro:</span><span id="otroCount">0</span></div>
+        </div>
+        <div class="progress-bar"><div class="progress-fill" id="progressFill"></div></div>
+        <div style="text-align:center;font-size:12px;color:#888" id="progressText">0%</div>
+        <div style="text-align:center;font-size:12px;color:#2ecc71" id="servidorText"></div>
+        {panel_ruta}
+        <div class="filters">
+            <div style="font-size:12px;color:#aaa;margin-bottom:5px">Mostrar:</div>
+            <button class="filter-btn active" style="background:#f39c12" onclick="toggleFilter('pending')">Pendientes</button>
+            <button class="filter-btn active" style="background:#e74c3c" onclick="toggleFilter('cerrada')">Cerradas</button>
+            <button class="filter-btn active" style="background:#2ecc71" onclick="toggleFilter('abierta')">Abiertas</button>
+            <button class="filter-btn active" style="background:#9b59b6" onclick="toggleFilter('otro')">Otro</button>
+        </div>
+        <button class="btn btn-export" onclick="exportData()">Exportar Cambios</button>
+        <button class="btn btn-export" style="background:#9b59b6" onclick="exportAll()">Exportar TODO</button>
+        <button class="btn btn-reset" onclick="resetData()">Reiniciar</button>
+    </div>
+    <div class="map-legend">
+        <div><span class="dot dot-pending"></span> Pendiente</div>
+        <div><span class="dot dot-cerrada"></span> Cerrada</div>
+        <div><span class="dot dot-abierta"></span> Abierta</div>
+        <div><span class="dot dot-otro"></span> Otro</div>
+    </div>
+    <div class="toast" id="toast"></div>
+    <script src="https://unpkg.com/leaflet@1.9.4/dist/leaflet.js"></script>
+    <script>{JS_CAPA_CANVAS}</script>
+    <script>
+        const CFG={json.dumps(cfg)};
+        const ESTADOS={json.dumps(list(ESTADOS))};
+        const ESTILOS={json.dumps(estilos_estado(radio_pendiente, radio))};
+        const INDICE={json.dumps(paquete['indice'], separators=(',', ':'))};
+        const TESELAS={json.dumps(teselas_inline, separators=(',', ':'))};
+    </script>
+    <script>{JS_BITACORA}</script>
+    <script>{JS_APP}</script>
+</body>
+</html>'''
@@ -0,0 +1,260 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+================================================================================
+PORTAFOLIO DE REJAS - Que k calles abrir para reconectar mas (lazy greedy)
+================================================================================
+
+El reporte recomienda abrir "las 15 rejas criticas" o el "top 50" segun la
+ganancia de cada reja por separado (criticidad_rejas). Eso ignora que las
+ganancias se solapan: dos rejas que reconectan el mismo barrio cuentan doble,
+y una reja que solo sirve si antes se abre otra cuenta cero.
+
+Aqui se elige un conjunto de k calles bloqueadas a abrir, una a una, tomando
+siempre la de mayor ganancia marginal dado lo ya abierto (greedy). La unidad
+es la calle: si tiene varias rejas se abren todas (n_rejas en la curva).
+
+Objetivos:
+
+    'gigante' : peso del componente gigante (nodos, o poblacion con `pesos`)
+    'pares'   : pares de nodos conectados, sum(peso(C)^2) sobre componentes;
+                premia cualquier reconexion, aunque no toque al gigante
+
+Calculo (CELF / lazy greedy con union-find incremental):
+
+    - los componentes con todas las rejas cerradas se calculan una vez y son
+      los nodos del union-find; abrir una calle es unir dos componentes
+    - cada calle candidata guarda su ultima ganancia calculada en un heap.
+      Al unir dos componentes, la ganancia de las calles que NO los tocan
+      solo puede bajar (el gigante crecio), asi que su valor guardado sigue
+      siendo una cota superior y se reevalua solo si llega al tope (CELF)
+    - las calles que tocan el componente recien unido pueden subir: se
+      reevaluan en el momento (listas de candidatas por componente, unidas
+      de menor a mayor)
+
+El resultado es el mismo que el greedy simple (reevaluar todas las calles en
+cada paso), pero con pocas evaluaciones por paso.
+
+USO:
+    from portafolio_rejas import portafolio
+    from red_rejas import cargar_red_rejas
+
+    res = portafolio(cargar_red_rejas(), k=500)
+    res['calles'], res['ganancia'], res['valor']
+
+    python portafolio_rejas.py              # k = 500, objetivo 'gigante'
+    python portafolio_rejas.py 200 pares
+
+AUTOR: Proyecto Rejas La Florida
+FECHA: Enero 2026
+================================================================================
+"""
+
+import heapq
+
+import numpy as np
+
+
+OBJETIVOS = ('gigante', 'pares')
+
+
+def portafolio(rr, k=500, objetivo='gigante', pesos=None):
+    """
+    Calles a abrir, en orden greedy, y la curva de ganancia marginal.
+
+    Parametros:
+    -----------
+    rr : RedRejas
+        Modelo de red_rejas (estado de partida: rr.bloqueada)
+    k : int
+        Numero maximo de calles a abrir
+    objetivo : str
+        'gigante' o 'pares'
+    pesos : array, opcional
+        Peso de cada nodo (p. ej. poblacion); por defecto 1
+
+    Retorna:
+    --------
+    dict con:
+        calles   : aristas abiertas, en orden
+        ganancia : ganancia marginal de cada una
+        valor    : objetivo despues de abrir las primeras 1..k
+        valor_inicial, total (peso de toda la red), evaluaciones
+    """
+    if objetivo not in OBJETIVOS:
+        raise ValueError(f"objetivo debe ser uno de {OBJETIVOS}, no {objetivo!r}")
+    pesos = np.ones(rr.n_nodos) if pesos is None else np.asarray(pesos, dtype=np.float64)
+    etiquetas = rr.componentes()
+    w = np.bincount(etiquetas, weights=pesos).tolist()
+    padre = list(range(len(w)))
+
+    # Candidatas: calles bloqueadas que unen dos componentes distintos
+    bloq = np.flatnonzero(rr.bloqueada)
+    ca, cb = etiquetas[rr.a[bloq]], etiquetas[rr.b[bloq]]
+    une = ca != cb
+    cand, ca, cb = bloq[une].tolist(), ca[une].tolist(), cb[une].tolist()
+    lista = [[] for _ in w]
+    for j in range(len(cand)):
+        lista[ca[j]].append(j)
+        lista[cb[j]].append(j)
+
+    def raiz(x):
+        while padre[x] != x:
+            padre[x] = padre[padre[x]]
+            x = padre[x]
+        return x
+
+    g = max(w) if w else 0.0
+    if objetivo == 'gigante':
+        def ganancia(x, y):
+            return max(w[x] + w[y], g) - g
+        valor = g
+    else:
+        def ganancia(x, y):
+            return 2 * w[x] * w[y]
+        valor = sum(p * p for p in w)
+    valor_inicial = valor
+
+    # Heap de (-ganancia, candidata, paso en que se calculo)
+    paso = 0
+    calculado = [0] * len(cand)
+    heap = [(-ganancia(ca[j], cb[j]), j, 0) for j in range(len(cand))]
+    heapq.heapify(heap)
+    n_eval = len(cand)
+    calles, gan, valores = [], [], []
+
+    while heap and len(calles) < k:
+        neg, j, p = heapq.heappop(heap)
+        if p != calculado[j]:
+            continue                      # entrada reemplazada
+        x, y = raiz(ca[j]), raiz(cb[j])
+        if x == y:
+            continue                      # ya quedo dentro de un componente
+        if p < paso:
+            # Cota vieja: reevaluar y devolver al heap
+            calculado[j] = paso
+            heapq.heappush(heap, (-ganancia(x, y), j, paso))
+            n_eval += 1
+            continue
+
+        # Abrir la calle j: unir x e y (union por tamaño de lista)
+        calles.append(cand[j])
+        gan.append(-neg)
+        valor += -neg
+        valores.append(valor)
+        if len(lista[x]) < len(lista[y]):
+            x, y = y, x
+        padre[y] = x
+        w[x] += w[y]
+        g = max(g, w[x])
+        paso += 1
+
+        # Reevaluar las candidatas del componente unido (las unicas que
+        # pueden haber subido); las internas se descartan
+        vivas = []
+        for c in lista[x] + lista[y]:
+            rx, ry = raiz(ca[c]), raiz(cb[c])
+            if rx != ry and calculado[c] != paso:
+                calculado[c] = paso
+                heapq.heappush(heap, (-ganancia(rx, ry), c, paso))
+                n_eval += 1
+                vivas.append(c)
+        lista[x], lista[y] = vivas, []
+
+    total = float(pesos.sum())
+    return {
+        'calles': np.array(calles, dtype=np.int64),
+        'ganancia': np.array(gan, dtype=np.float64),
+        'valor': np.array(valores, dtype=np.float64),
+        'valor_inicial': float(valor_inicial),
+        'total': total if objetivo == 'gigante' else total * total,
+        'evaluaciones': n_eval,
+        'objetivo': objetivo,
+    }
+
+
+def curva_orden(rr, calles, objetivo='gigante', pesos=None):
+    """
+    Objetivo despues de abrir las calles en el orden dado (sin optimizar),
+    p. ej. el ranking de criticidad_rejas, para comparar con portafolio().
+    """
+    pesos = np.ones(rr.n_nodos) if pesos is None else np.asarray(pesos, dtype=np.float64)
+    etiquetas = rr.componentes()
+    w = np.bincount(etiquetas, weights=pesos).tolist()
+    padre = list(range(len(w)))
+    g = max(w)
+    valor = g if objetivo == 'gigante' else sum(p * p for p in w)
+    valores = []
+    for e in calles:
+        x, y = etiquetas[rr.a[e]], etiquetas[rr.b[e]]
+        while padre[x] != x:
+            x = padre[x]
+        while padre[y] != y:
+            y = padre[y]
+        if x != y:
+            if objetivo == 'pares':
+                valor += 2 * w[x] * w[y]
+            padre[y] = x
+            w[x] += w[y]
+            g = max(g, w[x])
+            if objetivo == 'gigante':
+                valor = g
+        valores.append(valor)
+    return np.array(valores, dtype=np.float64)
+
+
+def tabla_portafolio(rr, res):
+    """DataFrame de la curva: una fila por calle abierta."""
+    import pandas as pd
+
+    e = res['calles']
+    n_rejas = np.bincount(rr.reja_arista[rr.reja_arista >= 0], minlength=rr.n_aristas)[e]
+    return pd.DataFrame({
+        'k': np.arange(1, len(e) + 1),
+        'arista': e,
+        'lat': (rr.y[rr.a[e]] + rr.y[rr.b[e]]) / 2,
+        'lon': (rr.x[rr.a[e]] + rr.x[rr.b[e]]) / 2,
+        'n_rejas': n_rejas,
+        'rejas_acumuladas': np.cumsum(n_rejas),
+        'ganancia_marginal': res['ganancia'],
+        'valor': res['valor'],
+        'fraccion': res['valor'] / res['total'],
+    })
+
+
+# ==============================================================================
+# EJECUTAR
+# ==============================================================================
+if __name__ == "__main__":
+    import sys
+    import time
+
+    from criticidad_rejas import ganancia_aristas
+    from red_rejas import cargar_red_rejas
+
+    k = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    objetivo = sys.argv[2] if len(sys.argv) > 2 else 'gigante'
+
+    print("=" * 70)
+    print(f"PORTAFOLIO DE REJAS A ABRIR (LAZY GREEDY, objetivo '{objetivo}')")
+    print("=" * 70)
+    rr = cargar_red_rejas()
+    t0 = time.time()
+    res = portafolio(rr, k=k, objetivo=objetivo)
+    print(f"      {len(res['calles'])} calles en {time.time() - t0:.2f} s "
+          f"({res['evaluaciones']} evaluaciones)")
+
+    tabla = tabla_portafolio(rr, res)
+    # Comparacion con abrir en el orden de la ganancia individual
+    g1 = ganancia_aristas(rr)
+    individual = np.lexsort((-g1['reconectados'], -g1['gigante']))
+    individual = individual[rr.bloqueada[individual]][:len(tabla)]
+    tabla['valor_independiente'] = curva_orden(rr, individual, objetivo)
+    for n in (1, 15, 50, len(tabla)):
+        if 0 < n <= len(tabla):
+            fila = tabla.iloc[n - 1]
+            print(f"      k={n:>4}: {fila['fraccion']:.2%} "
+                  f"(orden independiente: {fila['valor_independiente'] / res['total']:.2%})")
+
+    tabla.to_excel('../05_analisis/portafolio_rejas.xlsx', index=False)
+    print("      Guardado: ../05_analisis/portafolio_rejas.xlsx")
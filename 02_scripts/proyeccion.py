@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Proyeccion de coordenadas a un sistema metrico local (UTM 19S).
+
+Las distancias en grados no son metros: en La Florida (-33.5°) un grado de
+longitud mide ~93 km y uno de latitud ~111 km, asi que umbrales como
+30 / 111000 grados quedan mal en el eje este-oeste. Todos los calculos de
+distancia deben hacerse sobre coordenadas proyectadas con estas funciones.
+"""
+
+from functools import lru_cache
+
+import numpy as np
+
+
+# UTM zona 19 Sur (WGS84), cubre Santiago
+CRS_METRICO = 'EPSG:32719'
+
+
+@lru_cache(maxsize=None)
+def _transformador(origen, destino):
+    from pyproj import Transformer
+    return Transformer.from_crs(origen, destino, always_xy=True)
+
+
+def a_metros(lat, lon, crs=CRS_METRICO):
+    """
+    Convierte lat/lon (grados WGS84) a x/y en metros.
+
+    Parametros:
+    -----------
+    lat, lon : float o array
+        Coordenadas en grados
+
+    Retorna:
+    --------
+    tuple (x, y) de arrays float64 en metros
+    """
+    x, y = _transformador('EPSG:4326', crs).transform(
+        np.asarray(lon, dtype=np.float64), np.asarray(lat, dtype=np.float64))
+    return np.asarray(x), np.asarray(y)
+
+
+def a_grados(x, y, crs=CRS_METRICO):
+    """
+    Convierte x/y en metros de vuelta a lat/lon en grados.
+
+    Retorna:
+    --------
+    tuple (lat, lon) de arrays float64
+    """
+    lon, lat = _transformador(crs, 'EPSG:4326').transform(
+        np.asarray(x, dtype=np.float64), np.asarray(y, dtype=np.float64))
+    return np.asarray(lat), np.asarray(lon)
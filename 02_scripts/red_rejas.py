@@ -0,0 +1,296 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+================================================================================
+RED CON REJAS - Modelo topologico: rejas cerradas sobre las calles de OSM
+================================================================================
+
+La red del reporte (4,794 nodos y 177,894 "conexiones") era un grafo de
+distancias entre los puntos encuestados; su propia seccion de limitaciones
+dice que "asume distancia euclidiana, no topologia vial exacta".
+
+Aqui la red es la de calles de OSM (red_vial, ~40k nodos) y cada reja
+cerrada (estado 0) se ubica sobre la calle donde queda al ajustarla con
+snap_vial:
+
+    - cada calle es una arista no dirigida (u->v, v->u y las paralelas de OSM
+      son una sola); su largo es el de la mas corta
+    - la reja bloquea esa arista. Si queda a menos de NODO_TOL_M de un
+      extremo se registra tambien ese nodo (reja en la esquina), pero bloquea
+      solo la calle donde quedo: cierra un brazo del cruce, no el cruce
+    - varias rejas pueden caer en la misma arista
+
+El resultado es adyacencia CSR simetrica (indptr, vecino, arista) y una
+mascara booleana de aristas bloqueadas. Los analisis (componentes,
+distancias, difusion) arman su matriz con `matriz(abiertas)`: cambiar de
+escenario es cambiar la mascara, sin reconstruir grafos de NetworkX.
+
+La ubicacion de las rejas (el paso lento: snap sobre la red) se guarda en
+cache_etapas con clave (hash de la red, hash de las rejas).
+
+USO:
+    from red_rejas import cargar_red_rejas
+
+    rr = cargar_red_rejas()                 # red 'all' + rejas cerradas de la base
+    etiquetas = rr.componentes()            # con rejas
+    etiquetas = rr.componentes(rr.todas())  # sin rejas
+    m = rr.matriz(pesos='largo')            # scipy CSR, solo aristas abiertas
+    rr.resumen()
+
+AUTOR: Proyecto Rejas La Florida
+FECHA: Enero 2026
+================================================================================
+"""
+
+import hashlib
+
+import numpy as np
+from scipy.sparse import csr_matrix
+from scipy.sparse.csgraph import connected_components
+
+from cache_etapas import CacheEtapas, hash_datos
+
+
+DATOS = '../03_datos_procesados/Base_Combinada_Snapped_v2.xlsx'
+# Estado de las rejas cerradas en la base
+ESTADO_CERRADA = 0
+# Distancia maxima de una reja a su calle para contarla como bloqueo
+DIST_MAX_REJA_M = 30
+# Una reja a menos de esto de un extremo de su calle se asigna tambien al nodo
+NODO_TOL_M = 5
+
+
+class RedRejas:
+    """
+    Red vial no dirigida con las rejas cerradas ubicadas en sus aristas.
+
+    Arreglos por arista no dirigida (largo n_aristas): a, b (a < b), largo,
+    bloqueada. CSR simetrica: los vecinos del nodo i son
+    vecino[indptr[i]:indptr[i+1]] por las aristas arista[indptr[i]:indptr[i+1]].
+    Arreglos por reja (largo n_rejas): reja_arista, reja_nodo (-1 = a mitad
+    de cuadra), reja_dist_m, reja_fila (fila en la tabla de origen); las
+    rejas a mas de DIST_MAX_REJA_M de una calle quedan con reja_arista = -1.
+    """
+
+    def __init__(self, arreglos, meta):
+        for nombre, arr in arreglos.items():
+            setattr(self, nombre, arr)
+        self.meta = meta
+
+    @property
+    def n_nodos(self):
+        return len(self.x)
+
+    @property
+    def n_aristas(self):
+        return len(self.a)
+
+    @property
+    def n_rejas(self):
+        return len(self.reja_arista)
+
+    @property
+    def hash(self):
+        """Hash de la red y de la mascara de bloqueo (clave de cache de los analisis)."""
+        h = hashlib.sha1(self.meta['red'].encode())
+        h.update(np.packbits(self.bloqueada).tobytes())
+        return h.hexdigest()[:16]
+
+    def todas(self):
+        """Mascara con todas las aristas abiertas (escenario sin rejas)."""
+        return np.ones(self.n_aristas, dtype=bool)
+
+    def abiertas(self, abiertas=None):
+        """Mascara de aristas abiertas; por defecto las que no tienen reja."""
+        return ~self.bloqueada if abiertas is None else np.asarray(abiertas, dtype=bool)
+
+    def con_bloqueo(self, bloqueada):
+        """Misma red con otra mascara de bloqueo (comparte los demas arreglos)."""
+        arreglos = dict(vars(self))
+        meta = arreglos.pop('meta')
+        arreglos['bloqueada'] = np.asarray(bloqueada, dtype=bool)
+        return RedRejas(arreglos, meta)
+
+    def matriz(self, abiertas=None, pesos='uno'):
+        """
+        Matriz de adyacencia simetrica (scipy CSR) con las aristas abiertas.
+
+        pesos: 'uno' o 'largo' (metros). Las aristas de largo 0 se guardan con
+        un largo minimo para que no desaparezcan de la matriz dispersa.
+        """
+        activa = self.abiertas(abiertas)
+        a, b = self.a[activa], self.b[activa]
+        if pesos == 'largo':
+            w = np.maximum(self.largo[activa], 1e-3)
+        elif pesos == 'uno':
+            w = np.ones(len(a))
+        else:
+            raise ValueError(f"pesos debe ser 'uno' o 'largo', no {pesos!r}")
+        return csr_matrix((np.concatenate([w, w]), (np.concatenate([a, b]), np.concatenate([b, a]))),
+                          shape=(self.n_nodos, self.n_nodos))
+
+    def componentes(self, abiertas=None):
+        """Etiqueta de componente de cada nodo usando solo las aristas abiertas."""
+        return connected_components(self.matriz(abiertas), directed=False)[1]
+
+    def resumen(self, verbose=True):
+        """Componentes y componente gigante sin y con rejas."""
+        filas = {}
+        for nombre, abiertas in (('sin_rejas', self.todas()), ('con_rejas', None)):
+            tam = np.bincount(self.componentes(abiertas))
+            filas[nombre] = {'componentes': int(len(tam)),
+                             'gigante': float(tam.max() / self.n_nodos)}
+        filas['aristas_bloqueadas'] = int(self.bloqueada.sum())
+        filas['rejas_ubicadas'] = int((self.reja_arista >= 0).sum())
+        if verbose:
+            s, c = filas['sin_rejas'], filas['con_rejas']
+            print(f"      {self.n_nodos} nodos, {self.n_aristas} calles, "
+                  f"{filas['aristas_bloqueadas']} bloqueadas "
+                  f"({filas['aristas_bloqueadas'] / max(self.n_aristas, 1):.1%}) por "
+                  f"{filas['rejas_ubicadas']} de {self.n_rejas} rejas")
+            print(f"      Sin rejas: {s['componentes']} componentes, gigante {s['gigante']:.1%}")
+            print(f"      Con rejas: {c['componentes']} componentes, gigante {c['gigante']:.1%}")
+        return filas
+
+
+def aristas_no_dirigidas(red):
+    """
+    Calles como aristas no dirigidas: u->v, v->u y las paralelas (key) son una
+    sola arista. Se descartan los lazos (u == v), que no conectan nada.
+
+    Retorna:
+    --------
+    a, b : np.ndarray int64
+        Extremos de cada arista no dirigida (a < b)
+    largo : np.ndarray float64
+        Largo de la arista dirigida mas corta del par
+    arista_nd : np.ndarray int64
+        Para cada arista dirigida de la red, su arista no dirigida (-1 = lazo)
+    """
+    u = np.asarray(red.u, dtype=np.int64)
+    v = np.asarray(red.v, dtype=np.int64)
+    lo, hi = np.minimum(u, v), np.maximum(u, v)
+    unicos, arista_nd = np.unique(lo * red.n_nodos + hi, return_inverse=True)
+    a, b = unicos // red.n_nodos, unicos % red.n_nodos
+    largo = np.full(len(unicos), np.inf)
+    np.minimum.at(largo, arista_nd, np.asarray(red.largo, dtype=np.float64))
+    lazo = a == b
+    nuevo = np.cumsum(~lazo) - 1
+    nuevo[lazo] = -1
+    return a[~lazo], b[~lazo], largo[~lazo], nuevo[arista_nd]
+
+
+def csr_simetrica(n_nodos, a, b):
+    """(indptr, vecino, arista) de la adyacencia no dirigida, ordenada por nodo."""
+    origen = np.concatenate([a, b])
+    destino = np.concatenate([b, a])
+    arista = np.concatenate([np.arange(len(a)), np.arange(len(a))])
+    orden = np.lexsort((destino, origen))
+    indptr = np.zeros(n_nodos + 1, dtype=np.int64)
+    np.cumsum(np.bincount(origen, minlength=n_nodos), out=indptr[1:])
+    return indptr, destino[orden], arista[orden]
+
+
+def ubicar_rejas(red, arista_nd, lat, lon, dist_max_m=DIST_MAX_REJA_M,
+                 nodo_tol_m=NODO_TOL_M, indice=None):
+    """
+    Arista no dirigida (y nodo, si esta en un extremo) de cada reja.
+
+    Retorna:
+    --------
+    dict de arrays por reja: arista (-1 = sin calle cerca), nodo (-1 = a
+    mitad de cuadra), dist_m
+    """
+    from snap_vial import indice_aristas, snap_puntos
+
+    indice = indice if indice is not None else indice_aristas(red)
+    snap = snap_puntos(indice, lat, lon, dist_max_m=dist_max_m)
+    ok = snap['arista'] >= 0
+    e = snap['arista'][ok]
+    arista = np.full(len(ok), -1, dtype=np.int64)
+    arista[ok] = arista_nd[e]
+
+    # Distancia a cada extremo de la arista dirigida (fraccion 0 = en u)
+    f = snap['fraccion'][ok]
+    du = snap['offset_m'][ok]
+    dv = np.divide(du * (1 - f), f, out=np.full(len(f), np.inf), where=f > 0)
+    u, v = np.asarray(red.u)[e], np.asarray(red.v)[e]
+    nodo = np.full(len(ok), -1, dtype=np.int64)
+    nodo[ok] = np.where(np.minimum(du, dv) <= nodo_tol_m, np.where(du <= dv, u, v), -1)
+    return {'arista': arista, 'nodo': nodo, 'dist_m': snap['dist_m']}
+
+
+def construir_red_rejas(red, lat, lon, filas=None, dist_max_m=DIST_MAX_REJA_M,
+                        usar_cache=True):
+    """
+    Modelo topologico de la red con las rejas cerradas.
+
+    Parametros:
+    -----------
+    red : RedVial
+        Red cargada con red_vial.cargar_red
+    lat, lon : array
+        Coordenadas de las rejas cerradas
+    filas : array, opcional
+        Identificador de cada reja en su tabla (por defecto 0..n-1)
+    dist_max_m : float
+        Rejas mas lejos que esto de una calle no bloquean nada
+
+    Retorna:
+    --------
+    RedRejas
+    """
+    lat = np.asarray(lat, dtype=np.float64)
+    lon = np.asarray(lon, dtype=np.float64)
+    filas = np.arange(len(lat)) if filas is None else np.asarray(filas)
+    a, b, largo, arista_nd = aristas_no_dirigidas(red)
+
+    cache = CacheEtapas(activo=usar_cache)
+    ub = cache.obtener('rejas_aristas', {'red': red.hash, 'rejas': hash_datos(lat, lon),
+                                         'dist_max_m': float(dist_max_m), 'nodo_tol_m': NODO_TOL_M},
+                       lambda: ubicar_rejas(red, arista_nd, lat, lon, dist_max_m=dist_max_m))
+
+    bloqueada = np.zeros(len(a), dtype=bool)
+    bloqueada[ub['arista'][ub['arista'] >= 0]] = True
+    indptr, vecino, arista = csr_simetrica(red.n_nodos, a, b)
+    return RedRejas({
+        'x': np.asarray(red.x, dtype=np.float64), 'y': np.asarray(red.y, dtype=np.float64),
+        'a': a, 'b': b, 'largo': largo, 'bloqueada': bloqueada,
+        'indptr': indptr, 'vecino': vecino, 'arista': arista,
+        'arista_nd': arista_nd,
+        'reja_arista': ub['arista'], 'reja_nodo': ub['nodo'], 'reja_dist_m': ub['dist_m'],
+        'reja_fila': filas, 'reja_lat': lat, 'reja_lon': lon,
+    }, {'red': red.hash, 'lugar': red.meta.get('lugar'), 'dist_max_m': dist_max_m})
+
+
+def cargar_red_rejas(datos=DATOS, lugar="La Florida, Santiago, Chile", network_type='all',
+                     usar_cache=True, tabla=None):
+    """
+    Red vial + rejas cerradas (estado 0) de la base, listas para analizar.
+
+    Con `tabla` se usa ese DataFrame en vez de leer `datos`; las filas de la
+    tabla quedan en reja_fila.
+    """
+    from almacen_datos import cargar_tabla
+    from red_vial import cargar_red
+
+    df = tabla if tabla is not None else cargar_tabla(datos)
+    cerradas = np.flatnonzero(df['estado'].to_numpy() == ESTADO_CERRADA)
+    red = cargar_red(lugar, network_type=network_type, simplify=True)
+    return construir_red_rejas(red, df['lat'].to_numpy()[cerradas], df['lon'].to_numpy()[cerradas],
+                               filas=cerradas, usar_cache=usar_cache)
+
+
+# ==============================================================================
+# EJECUTAR
+# ==============================================================================
+if __name__ == "__main__":
+    print("=" * 70)
+    print("RED VIAL CON REJAS (MODELO TOPOLOGICO)")
+    print("=" * 70)
+    rr = cargar_red_rejas()
+    rr.resumen()
+    en_nodo = int((rr.reja_nodo >= 0).sum())
+    print(f"      Rejas en esquina (a <= {NODO_TOL_M} m de un nodo): {en_nodo}")
+    print(f"      Aristas con mas de una reja: "
+          f"{int((np.bincount(rr.reja_arista[rr.reja_arista >= 0]) > 1).sum())}")
@@ -0,0 +1,358 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+================================================================================
+RED VIAL - Almacen local de la red de calles de OpenStreetMap
+================================================================================
+
+Descarga la red vial UNA sola vez por combinacion de parametros y la guarda
+como un snapshot binario (arreglos NumPy) que se carga en milisegundos.
+
+Antes cada script llamaba a ox.graph_from_place(...) en cada ejecucion, lo que
+re-procesa el JSON de Overpass y reconstruye el MultiDiGraph de NetworkX
+(varios minutos). Ahora todos usan:
+
+    from red_vial import cargar_red
+    red = cargar_red("La Florida, Santiago, Chile", network_type='all')
+
+CONTENIDO DEL SNAPSHOT (una carpeta por parametros):
+    - Nodos:   node_id (id OSM), x (lon), y (lat)
+    - Aristas: u, v (indice de nodo), key, largo, osmid, highway, nombre
+               ordenadas por (u, v, key) -> adyacencia CSR con indptr
+    - Geometria completa de cada arista (coordenadas aplanadas + punteros)
+    - meta.json con parametros, fecha OSM y hash del contenido
+
+La red solo se vuelve a descargar si cambian los parametros (lugar,
+network_type, simplify) o la fecha OSM fijada en FECHA_OSM.
+
+AUTOR: Proyecto Rejas La Florida
+FECHA: Enero 2026
+================================================================================
+"""
+
+import hashlib
+import json
+import os
+import time
+
+import numpy as np
+
+
+LUGAR = "La Florida, Santiago, Chile"
+
+# Fecha de la foto de OpenStreetMap que se descarga. Cambiarla fuerza a
+# reconstruir el snapshot; None usa los datos mas recientes de Overpass.
+FECHA_OSM = "2025-12-26T00:00:00Z"
+
+RUTA_RED = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                        '..', '03_datos_procesados', 'red_vial')
+
+VERSION_FORMATO = 1
+
+# Arreglos numericos y vocabularios de texto que componen el snapshot
+ARREGLOS = ('node_id', 'x', 'y', 'u', 'v', 'key', 'indptr', 'largo', 'osmid',
+            'highway_cod', 'nombre_cod', 'geom_ptr', 'geom_x', 'geom_y')
+VOCABULARIOS = ('highway_vocab', 'nombre_vocab')
+
+
+class RedVial:
+    """
+    Red vial en arreglos NumPy (nodos, aristas dirigidas y geometria).
+
+    Las aristas estan ordenadas por nodo de origen (adyacencia CSR): las que
+    salen del nodo i son las de indice red.indptr[i]:red.indptr[i+1], y sus
+    vecinos son red.v[red.indptr[i]:red.indptr[i+1]].
+    Los atributos de texto (highway, nombre) se guardan como codigos enteros
+    sobre un vocabulario; las listas de OSM se unen con ';'.
+    """
+
+    def __init__(self, arreglos, meta):
+        for nombre, arr in arreglos.items():
+            setattr(self, nombre, arr)
+        self.meta = meta
+
+    @property
+    def n_nodos(self):
+        return len(self.node_id)
+
+    @property
+    def n_aristas(self):
+        return len(self.u)
+
+    @property
+    def hash(self):
+        """Hash del contenido del snapshot (sirve como clave de cache)."""
+        return self.meta['hash']
+
+    def grado(self):
+        """Grado total (entrada + salida) de cada nodo, igual que G.degree."""
+        return (np.bincount(self.u, minlength=self.n_nodos) +
+                np.bincount(self.v, minlength=self.n_nodos))
+
+    def highway(self, arista):
+        """Tipos highway de una arista como lista de strings."""
+        return str(self.highway_vocab[self.highway_cod[arista]]).split(';')
+
+    def nombre(self, arista):
+        """Nombre de la calle de una arista ('' si no tiene)."""
+        return str(self.nombre_vocab[self.nombre_cod[arista]])
+
+    def geometria(self, arista):
+        """Coordenadas (lon, lat) de la arista, incluyendo sus extremos."""
+        i, j = self.geom_ptr[arista], self.geom_ptr[arista + 1]
+        return np.column_stack([self.geom_x[i:j], self.geom_y[i:j]])
+
+    def claves_aristas(self):
+        """
+        Identificador estable de cada arista: (id OSM de u, id OSM de v, key).
+
+        A diferencia del indice de la arista, esta clave se mantiene entre
+        snapshots distintos mientras la calle no cambie en OSM.
+        """
+        return np.column_stack([self.node_id[self.u], self.node_id[self.v],
+                                self.key.astype(np.int64)])
+
+    def a_networkx(self):
+        """
+        Reconstruye un MultiDiGraph con los mismos atributos que entrega osmnx.
+
+        Solo para codigo que todavia necesita la API de NetworkX; el calculo
+        vectorizado debe trabajar directamente sobre los arreglos.
+        """
+        import networkx as nx
+        from shapely.geometry import LineString
+
+        G = nx.MultiDiGraph(crs='epsg:4326', **{k: self.meta[k] for k in
+                                                 ('lugar', 'network_type', 'simplify')})
+        G.add_nodes_from(
+            (int(n), {'x': float(x), 'y': float(y)})
+            for n, x, y in zip(self.node_id, self.x, self.y)
+        )
+        for e in range(self.n_aristas):
+            tipos = self.highway(e)
+            datos = {
+                'osmid': int(self.osmid[e]),
+                'highway': tipos if len(tipos) > 1 else tipos[0],
+                'length': float(self.largo[e]),
+            }
+            nombre = self.nombre(e)
+            if nombre:
+                nombres = nombre.split(';')
+                datos['name'] = nombres if len(nombres) > 1 else nombres[0]
+            coords = self.geometria(e)
+            if len(coords) > 2:
+                datos['geometry'] = LineString(coords)
+            G.add_edge(int(self.node_id[self.u[e]]), int(self.node_id[self.v[e]]),
+                       key=int(self.key[e]), **datos)
+        return G
+
+
+def _texto_atributo(valor):
+    """Normaliza un atributo de OSM (str, lista o ausente) a un solo string."""
+    if valor is None or (isinstance(valor, float) and np.isnan(valor)):
+        return ''
+    if isinstance(valor, (list, tuple)):
+        return ';'.join(str(v) for v in valor)
+    return str(valor)
+
+
+def _codificar(textos):
+    """Convierte una lista de strings en (codigos int32, vocabulario)."""
+    vocab, codigos = np.unique(np.array(textos, dtype=str), return_inverse=True)
+    return codigos.astype(np.int32), vocab
+
+
+def desde_networkx(G):
+    """
+    Convierte un grafo de osmnx en los arreglos del snapshot.
+
+    Retorna:
+    --------
+    dict nombre -> arreglo NumPy
+    """
+    node_id = np.array(sorted(G.nodes), dtype=np.int64)
+    pos = {int(n): i for i, n in enumerate(node_id)}
+    x = np.array([G.nodes[n]['x'] for n in node_id.tolist()], dtype=np.float64)
+    y = np.array([G.nodes[n]['y'] for n in node_id.tolist()], dtype=np.float64)
+
+    aristas = list(G.edges(keys=True, data=True))
+    u = np.array([pos[a[0]] for a in aristas], dtype=np.int32)
+    v = np.array([pos[a[1]] for a in aristas], dtype=np.int32)
+    key = np.array([a[2] for a in aristas], dtype=np.int32)
+
+    # Ordenar por (u, v, key) para que la adyacencia quede en formato CSR
+    orden = np.lexsort((key, v, u))
+    aristas = [aristas[i] for i in orden]
+    u, v, key = u[orden], v[orden], key[orden]
+    indptr = np.searchsorted(u, np.arange(len(node_id) + 1)).astype(np.int64)
+
+    largo = np.array([d.get('length', np.nan) for _, _, _, d in aristas], dtype=np.float64)
+    osmid = np.array([d['osmid'][0] if isinstance(d.get('osmid'), list)
+                      else d.get('osmid', -1) for _, _, _, d in aristas], dtype=np.int64)
+    highway_cod, highway_vocab = _codificar([_texto_atributo(d.get('highway'))
+                                             for _, _, _, d in aristas])
+    nombre_cod, nombre_vocab = _codificar([_texto_atributo(d.get('name'))
+                                           for _, _, _, d in aristas])
+
+    # Geometria: si la arista no trae 'geometry' es la recta u-v
+    tramos = []
+    for (a, b, _, d), iu, iv in zip(aristas, u, v):
+        geom = d.get('geometry')
+        if geom is not None:
+            tramos.append(np.asarray(geom.coords, dtype=np.float64)[:, :2])
+        else:
+            tramos.append(np.array([[x[iu], y[iu]], [x[iv], y[iv]]]))
+    largos_geom = np.array([len(t) for t in tramos], dtype=np.int64)
+    geom_ptr = np.concatenate([[0], np.cumsum(largos_geom)]).astype(np.int64)
+    coords = np.concatenate(tramos) if tramos else np.empty((0, 2))
+
+    return {
+        'node_id': node_id, 'x': x, 'y': y,
+        'u': u, 'v': v, 'key': key, 'indptr': indptr,
+        'largo': largo, 'osmid': osmid,
+        'highway_cod': highway_cod, 'highway_vocab': highway_vocab,
+        'nombre_cod': nombre_cod, 'nombre_vocab': nombre_vocab,
+        'geom_ptr': geom_ptr, 'geom_x': coords[:, 0].copy(), 'geom_y': coords[:, 1].copy(),
+    }
+
+
+def hash_arreglos(arreglos):
+    """Hash SHA-1 del contenido de los arreglos (orden fijo por nombre)."""
+    h = hashlib.sha1()
+    for nombre in sorted(arreglos):
+        arr = np.ascontiguousarray(arreglos[nombre])
+        h.update(nombre.encode())
+        h.update(str(arr.dtype).encode())
+        h.update(arr.tobytes())
+    return h.hexdigest()
+
+
+def _parametros(lugar, network_type, simplify, fecha_osm, dist):
+    if isinstance(lugar, str):
+        lugar_txt = lugar
+    else:
+        lugar_txt = f"{lugar[0]:.6f},{lugar[1]:.6f}"
+    return {
+        'lugar': lugar_txt,
+        'network_type': network_type,
+        'simplify': bool(simplify),
+        'fecha_osm': fecha_osm,
+        'dist': dist,
+        'version': VERSION_FORMATO,
+    }
+
+
+def ruta_snapshot(parametros, ruta=RUTA_RED):
+    """Carpeta del snapshot para un conjunto de parametros."""
+    clave = hashlib.sha1(json.dumps(parametros, sort_keys=True).encode()).hexdigest()[:12]
+    nombre = parametros['lugar'].split(',')[0].strip().lower().replace(' ', '_')
+    return os.path.join(ruta, f"{nombre}_{parametros['network_type']}_{clave}")
+
+
+def descargar_red(lugar, network_type, simplify, fecha_osm=None, dist=None):
+    """Descarga la red desde OpenStreetMap con osmnx (paso lento)."""
+    try:
+        import osmnx as ox
+    except ImportError:
+        print("ERROR: Falta instalar osmnx")
+        print("Ejecuta: pip install osmnx")
+        raise
+
+    ajustes_previos = ox.settings.overpass_settings
+    if fecha_osm:
+        ox.settings.overpass_settings = (
+            '[out:json][timeout:{timeout}][date:"' + fecha_osm + '"]{maxsize}')
+    try:
+        if isinstance(lugar, str):
+            return ox.graph_from_place(lugar, network_type=network_type, simplify=simplify)
+        return ox.graph_from_point(tuple(lugar), dist=dist or 5000,
+                                   network_type=network_type, simplify=simplify)
+    finally:
+        ox.settings.overpass_settings = ajustes_previos
+
+
+def guardar_snapshot(arreglos, parametros, carpeta):
+    """Escribe los arreglos (.npy) y meta.json en la carpeta del snapshot."""
+    os.makedirs(carpeta, exist_ok=True)
+    for nombre, arr in arreglos.items():
+        np.save(os.path.join(carpeta, f"{nombre}.npy"), arr, allow_pickle=False)
+    meta = dict(parametros)
+    meta.update({
+        'hash': hash_arreglos(arreglos),
+        'n_nodos': int(len(arreglos['node_id'])),
+        'n_aristas': int(len(arreglos['u'])),
+        'creado': time.strftime('%Y-%m-%dT%H:%M:%S'),
+    })
+    # meta.json se escribe al final: su presencia marca un snapshot completo
+    with open(os.path.join(carpeta, 'meta.json'), 'w', encoding='utf-8') as f:
+        json.dump(meta, f, indent=2, ensure_ascii=False)
+    return meta
+
+
+def leer_snapshot(carpeta):
+    """Carga un snapshot desde disco (memory-map, sin copiar los datos)."""
+    with open(os.path.join(carpeta, 'meta.json'), encoding='utf-8') as f:
+        meta = json.load(f)
+    arreglos = {}
+    for nombre in list(ARREGLOS) + list(VOCABULARIOS):
+        arreglos[nombre] = np.load(os.path.join(carpeta, f"{nombre}.npy"),
+                                   mmap_mode='r', allow_pickle=False)
+    return RedVial(arreglos, meta)
+
+
+def cargar_red(lugar=LUGAR, network_type='all', simplify=True,
+               fecha_osm=FECHA_OSM, dist=None, ruta=RUTA_RED, forzar=False,
+               verbose=True):
+    """
+    Entrega la red vial desde el snapshot local, descargandola si no existe.
+
+    Parametros:
+    -----------
+    lugar : str o tuple
+        Nombre del lugar, o (lat, lon) para descargar un area alrededor
+    network_type : str
+        Tipo de red de osmnx ('all', 'drive', 'walk', ...)
+    simplify : bool
+        Simplificar la red (igual que en osmnx)
+    fecha_osm : str o None
+        Fecha ISO de la foto de OSM; cambiarla reconstruye el snapshot
+    dist : float, opcional
+        Radio en metros cuando lugar es un punto
+    forzar : bool
+        Reconstruir aunque exista un snapshot valido
+
+    Retorna:
+    --------
+    RedVial
+    """
+    parametros = _parametros(lugar, network_type, simplify, fecha_osm, dist)
+    carpeta = ruta_snapshot(parametros, ruta)
+
+    if not forzar and os.path.exists(os.path.join(carpeta, 'meta.json')):
+        red = leer_snapshot(carpeta)
+        if all(red.meta.get(k) == v for k, v in parametros.items()):
+            if verbose:
+                print(f"      Red vial desde snapshot local ({red.meta['creado']})")
+            return red
+
+    if verbose:
+        print(f"      Descargando red vial de OSM (fecha: {fecha_osm or 'actual'})...")
+        print("      (solo la primera vez; luego se usa el snapshot local)")
+    G = descargar_red(lugar, network_type, simplify, fecha_osm, dist)
+    guardar_snapshot(desde_networkx(G), parametros, carpeta)
+    return leer_snapshot(carpeta)
+
+
+# ==============================================================================
+# EJECUTAR
+# ==============================================================================
+if __name__ == "__main__":
+    import sys
+
+    args = [a for a in sys.argv[1:] if not a.startswith('--')]
+    tipo = args[0] if args else 'all'
+    t0 = time.time()
+    red = cargar_red(LUGAR, network_type=tipo, forzar='--forzar' in sys.argv)
+    print(f"      {red.n_nodos} nodos, {red.n_aristas} aristas "
+          f"({time.time() - t0:.2f} s)")
+    print(f"      Hash: {red.hash}")
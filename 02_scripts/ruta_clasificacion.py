@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+================================================================================
+RUTA DE CLASIFICACION - Orden de visita de los puntos pendientes
+================================================================================
+
+Los puntos del clasificador vienen en el orden en que OSM entrega los nodos,
+que no tiene relacion con su posicion: "siguiente" saltaba de un extremo de
+la comuna al otro. Aqui se calcula un orden de visita sobre coordenadas
+metricas (proyeccion.a_metros):
+
+    'hilbert' : orden por la curva de Hilbert (rapido, sin saltos grandes)
+    'vecino'  : vecino mas cercano (heuristica de TSP) partiendo del primer
+                punto de la curva de Hilbert; recorridos mas cortos
+
+y se corta en paquetes contiguos, uno por encuestador, para que cada uno
+trabaje una zona compacta sin cruzarse con los demas.
+
+USO:
+    from ruta_clasificacion import ruta_pendientes
+
+    ruta = ruta_pendientes(lat, lon, pendiente, metodo='vecino', n_paquetes=4)
+    ruta['orden']      # indices de los puntos en orden de visita
+    ruta['paquetes']   # [(inicio, fin), ...] posiciones en ruta['orden']
+
+AUTOR: Proyecto Rejas La Florida
+FECHA: Enero 2026
+================================================================================
+"""
+
+import numpy as np
+from scipy.spatial import cKDTree
+
+from proyeccion import a_metros
+
+
+METODOS = ('hilbert', 'vecino')
+
+
+def indice_hilbert(x, y, nivel=16):
+    """
+    Posicion de cada punto sobre la curva de Hilbert de 2^nivel x 2^nivel.
+
+    Los puntos se escalan al cuadrado que los contiene (misma escala en ambos
+    ejes, para no deformar distancias).
+    """
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    n = 1 << nivel
+    if not len(x):
+        return np.zeros(0, dtype=np.int64)
+    lado = max(np.ptp(x), np.ptp(y)) or 1.0
+    ix = ((x - x.min()) / lado * (n - 1)).astype(np.int64)
+    iy = ((y - y.min()) / lado * (n - 1)).astype(np.int64)
+
+    d = np.zeros(len(x), dtype=np.int64)
+    s = n >> 1
+    while s > 0:
+        rx = (ix & s) > 0
+        ry = (iy & s) > 0
+        d += s * s * ((3 * rx.astype(np.int64)) ^ ry.astype(np.int64))
+        # Rotar el cuadrante para que la curva siga continua en el nivel siguiente
+        voltear = ~ry & rx
+        ix = np.where(voltear, n - 1 - ix, ix)
+        iy = np.where(voltear, n - 1 - iy, iy)
+        ix, iy = np.where(~ry, iy, ix), np.where(~ry, ix, iy)
+        s >>= 1
+    return d
+
+
+def orden_vecino_cercano(x, y, inicio=0, k=8):
+    """
+    Recorrido por vecino mas cercano: desde `inicio`, siempre al punto no
+    visitado mas cercano.
+
+    Se consulta un cKDTree con k vecinos y se duplica k si todos ya fueron
+    visitados; cuando quedan pocos puntos se busca directo entre los restantes.
+    """
+    xy = np.column_stack([np.asarray(x, dtype=np.float64), np.asarray(y, dtype=np.float64)])
+    n = len(xy)
+    if n == 0:
+        return np.zeros(0, dtype=np.int64)
+    arbol = cKDTree(xy)
+    visitado = np.zeros(n, dtype=bool)
+    orden = np.empty(n, dtype=np.int64)
+    actual = int(inicio)
+    for paso in range(n):
+        orden[paso] = actual
+        visitado[actual] = True
+        restantes = n - paso - 1
+        if not restantes:
+            break
+        siguiente = -1
+        kk = k
+        while kk < 4 * restantes and kk < n:
+            _, vecinos = arbol.query(xy[actual], k=min(kk + 1, n))
+            libres = vecinos[~visitado[vecinos]]
+            if len(libres):
+                siguiente = int(libres[0])
+                break
+            kk *= 2
+        if siguiente < 0:
+            libres = np.flatnonzero(~visitado)
+            dist = np.hypot(*(xy[libres] - xy[actual]).T)
+            siguiente = int(libres[np.argmin(dist)])
+        actual = siguiente
+    return orden
+
+
+def largo_recorrido(x, y, orden):
+    """Largo del recorrido (metros si x, y estan en metros)."""
+    if len(orden) < 2:
+        return 0.0
+    x = np.asarray(x, dtype=np.float64)[orden]
+    y = np.asarray(y, dtype=np.float64)[orden]
+    return float(np.hypot(np.diff(x), np.diff(y)).sum())
+
+
+def ruta_pendientes(lat, lon, pendiente=None, metodo='vecino', n_paquetes=1):
+    """
+    Orden de visita de los puntos pendientes, cortado en paquetes.
+
+    Parametros:
+    -----------
+    lat, lon : array
+        Coordenadas de todos los puntos del clasificador
+    pendiente : array bool, opcional
+        Puntos a incluir en la ruta (por defecto todos)
+    metodo : str
+        'hilbert' o 'vecino'
+    n_paquetes : int
+        Numero de paquetes de trabajo (encuestadores). Son tramos contiguos de
+        la ruta con la misma cantidad de puntos (+-1)
+
+    Retorna:
+    --------
+    dict con:
+        orden    : array int, indices (en lat/lon) en orden de visita
+        paquetes : list de (inicio, fin), posiciones en orden [inicio, fin)
+        largo_m  : largo del recorrido completo en metros
+    """
+    if metodo not in METODOS:
+        raise ValueError(f"metodo debe ser uno de {METODOS}, no {metodo!r}")
+    lat = np.asarray(lat, dtype=np.float64)
+    lon = np.asarray(lon, dtype=np.float64)
+    incluidos = np.arange(len(lat)) if pendiente is None else np.flatnonzero(pendiente)
+
+    x, y = a_metros(lat[incluidos], lon[incluidos])
+    orden = np.argsort(indice_hilbert(x, y), kind='stable')
+    if metodo == 'vecino' and len(orden):
+        orden = orden_vecino_cercano(x, y, inicio=orden[0])
+
+    n_paquetes = max(1, min(int(n_paquetes), len(orden) or 1))
+    cortes = np.linspace(0, len(orden), n_paquetes + 1).round().astype(int)
+    return {
+        'orden': incluidos[orden],
+        'paquetes': [(int(a), int(b)) for a, b in zip(cortes[:-1], cortes[1:])],
+        'largo_m': largo_recorrido(x, y, orden),
+    }
@@ -0,0 +1,206 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+================================================================================
+SELECCION DE NODOS - Reglas vectorizadas sobre la red vial
+================================================================================
+
+Decide que nodos de OSM se muestran en el clasificador ("cerrables", "cruces
+residenciales", "inicios de pasaje", ...) sin recorrer el grafo nodo a nodo.
+
+Cada tipo de calle (highway) recibe un bit. Cada arista tiene la mascara de
+sus tipos (un highway puede ser lista en OSM) y con operaciones de scatter de
+NumPy se obtiene, por nodo, el OR de las mascaras de sus aristas. Una regla es
+entonces algebra de mascaras sobre arreglos de ~40k nodos (milisegundos).
+
+USO:
+    from red_vial import cargar_red
+    from seleccion_nodos import seleccionar_nodos
+
+    red = cargar_red("La Florida, Santiago, Chile", network_type='all')
+    idx = seleccionar_nodos(red, 'cerrables')   # indices de nodos
+
+REGLAS DISPONIBLES: ver REGLAS al final del archivo
+    (python seleccion_nodos.py lista cuantos nodos entrega cada una)
+
+AUTOR: Proyecto Rejas La Florida
+FECHA: Enero 2026
+================================================================================
+"""
+
+import numpy as np
+
+
+# Grupos de tipos de calle usados por las reglas
+PRINCIPALES = {'primary', 'secondary', 'tertiary', 'primary_link', 'secondary_link',
+               'tertiary_link', 'motorway', 'motorway_link', 'trunk', 'trunk_link'}
+CERRABLES = {'residential', 'living_street', 'service', 'footway', 'path',
+             'cycleway', 'pedestrian', 'steps', 'unclassified'}
+RESIDENCIALES = {'residential', 'living_street'}
+# Calles desde donde parte un pasaje (criterio de generar_clasificador_v3.py)
+ACCESOS_PASAJE = {'primary', 'secondary', 'tertiary', 'unclassified',
+                  'primary_link', 'secondary_link', 'tertiary_link'}
+
+
+def bits_highway(red):
+    """
+    Asigna un bit a cada tipo de highway presente en la red.
+
+    Retorna:
+    --------
+    bits : dict
+        tipo -> mascara np.uint64 con un solo bit encendido
+    mascara_vocab : np.ndarray (uint64)
+        Mascara de cada entrada del vocabulario de highway de la red
+    """
+    entradas = [str(h).split(';') for h in red.highway_vocab]
+    tipos = sorted({t for tipos in entradas for t in tipos})
+    if len(tipos) > 64:
+        raise ValueError(f"Demasiados tipos de highway para una mascara de 64 bits: {len(tipos)}")
+
+    bits = {t: np.uint64(1) << np.uint64(i) for i, t in enumerate(tipos)}
+    mascara_vocab = np.zeros(len(entradas), dtype=np.uint64)
+    for i, tipos_entrada in enumerate(entradas):
+        for t in tipos_entrada:
+            mascara_vocab[i] |= bits[t]
+    return bits, mascara_vocab
+
+
+def mascara_grupo(bits, grupo):
+    """OR de los bits de un grupo de tipos (los ausentes en la red se ignoran)."""
+    m = np.uint64(0)
+    for t in grupo:
+        m |= bits.get(t, np.uint64(0))
+    return m
+
+
+def atributos_nodos(red):
+    """
+    Calcula por nodo las mascaras y conteos que usan las reglas.
+
+    Todo se hace con scatter (np.bitwise_or.at / np.bincount) sobre las
+    aristas, sin ciclos en Python.
+
+    Retorna:
+    --------
+    dict con:
+        bits        : tipo -> bit
+        salida      : OR de tipos de las aristas que SALEN del nodo
+                      (lo que veia G.edges(node, data=True))
+        incidente   : OR de tipos de todas las aristas que tocan el nodo
+        n_residenciales : aristas de salida con algun tipo residencial
+        grado       : grado total (entrada + salida), igual que G.degree
+        n_vecinos   : vecinos distintos, igual que len(set(G.neighbors(node)))
+    """
+    bits, mascara_vocab = bits_highway(red)
+    m_arista = mascara_vocab[np.asarray(red.highway_cod)]
+    u = np.asarray(red.u)
+    v = np.asarray(red.v)
+    n = red.n_nodos
+
+    salida = np.zeros(n, dtype=np.uint64)
+    np.bitwise_or.at(salida, u, m_arista)
+    incidente = salida.copy()
+    np.bitwise_or.at(incidente, v, m_arista)
+
+    es_residencial = (m_arista & mascara_grupo(bits, RESIDENCIALES)) != 0
+    n_residenciales = np.bincount(u, weights=es_residencial, minlength=n).astype(np.int32)
+
+    pares = np.unique(u.astype(np.int64) * n + v)
+    n_vecinos = np.bincount(pares // n, minlength=n).astype(np.int32)
+
+    return {
+        'bits': bits,
+        'salida': salida,
+        'incidente': incidente,
+        'n_residenciales': n_residenciales,
+        'grado': red.grado(),
+        'n_vecinos': n_vecinos,
+    }
+
+
+def _tiene(mascara, bits, grupo):
+    """Nodos con al menos un tipo del grupo."""
+    return (mascara & mascara_grupo(bits, grupo)) != 0
+
+
+def _solo(mascara, bits, grupo):
+    """Nodos cuyos tipos estan todos dentro del grupo (incluye nodos sin aristas)."""
+    return (mascara & ~mascara_grupo(bits, grupo)) == 0
+
+
+def _cerrables(a):
+    s, b = a['salida'], a['bits']
+    return ~_solo(s, b, PRINCIPALES) | _tiene(s, b, CERRABLES)
+
+
+# Reglas de seleccion: nombre -> (descripcion, funcion sobre atributos_nodos)
+REGLAS = {
+    'cerrables': (
+        "Todos los nodos excepto cruces de calles principales",
+        _cerrables),
+    'cruces_principales': (
+        "Nodos donde SOLO se conectan calles principales (excluidos de 'cerrables')",
+        lambda a: ~_cerrables(a) & (a['salida'] != 0)),
+    'cruces_residenciales': (
+        "Nodos con al menos 2 conexiones a calles residenciales",
+        lambda a: a['n_residenciales'] >= 2),
+    'inicios_pasaje': (
+        "Donde una calle residencial conecta con una principal",
+        lambda a: (_tiene(a['salida'], a['bits'], RESIDENCIALES) &
+                   _tiene(a['salida'], a['bits'], ACCESOS_PASAJE))),
+    'intersecciones_residenciales': (
+        "Nodos de calles residenciales con grado > 1",
+        lambda a: _tiene(a['incidente'], a['bits'], RESIDENCIALES) & (a['grado'] > 1)),
+    'no_cruces': (
+        "Nodos cerrables con 1-2 vecinos (inicios/finales, no cruces)",
+        lambda a: _cerrables(a) & (a['n_vecinos'] <= 2)),
+    'residenciales': (
+        "Nodos con al menos 1 conexion a residential o living_street",
+        lambda a: _tiene(a['salida'], a['bits'], RESIDENCIALES)),
+}
+
+
+def seleccionar_nodos(red, regla, atributos=None):
+    """
+    Aplica una regla de seleccion y entrega los indices de nodos elegidos.
+
+    Parametros:
+    -----------
+    red : RedVial
+        Red cargada con red_vial.cargar_red
+    regla : str o callable
+        Nombre de una regla de REGLAS, o funcion(atributos) -> bool array
+    atributos : dict, opcional
+        Resultado de atributos_nodos(red), para reutilizarlo entre reglas
+
+    Retorna:
+    --------
+    np.ndarray con los indices de nodo (en el orden de red.node_id)
+    """
+    if atributos is None:
+        atributos = atributos_nodos(red)
+    if callable(regla):
+        funcion = regla
+    elif regla in REGLAS:
+        funcion = REGLAS[regla][1]
+    else:
+        raise ValueError(f"Regla desconocida: {regla!r}. Opciones: {', '.join(REGLAS)}")
+    return np.flatnonzero(funcion(atributos))
+
+
+# ==============================================================================
+# EJECUTAR
+# ==============================================================================
+if __name__ == "__main__":
+    import time
+    from red_vial import cargar_red
+
+    red = cargar_red("La Florida, Santiago, Chile", network_type='all', simplify=True)
+    t0 = time.time()
+    atributos = atributos_nodos(red)
+    print(f"\n      Atributos de {red.n_nodos} nodos en {(time.time() - t0) * 1000:.0f} ms\n")
+    for nombre, (descripcion, _) in REGLAS.items():
+        t0 = time.time()
+        n = len(seleccionar_nodos(red, nombre, atributos))
+        print(f"  {nombre:30s} {n:7d} nodos  ({(time.time() - t0) * 1000:.1f} ms)  {descripcion}")
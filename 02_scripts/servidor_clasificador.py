@@ -0,0 +1,428 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+================================================================================
+SERVIDOR DEL CLASIFICADOR - Sincronizacion en vivo entre encuestadores
+================================================================================
+
+Con la bitacora (bitacora_clasificacion) cada encuestador trabaja aislado y
+los cambios se juntan al final: mientras tanto dos personas pueden clasificar
+el mismo punto sin saberlo.
+
+Este servidor corre en un notebook de la red local (asyncio + SQLite, sin
+dependencias ni servicios externos) y:
+
+    - sirve 04_mapas_html (el clasificador y sus teselas)
+    - recibe las entradas de la bitacora de cada navegador en lotes
+      (POST api/entradas) y las guarda en SQLite
+    - empuja a los demas navegadores las entradas nuevas con server-sent
+      events (GET api/eventos), asi el mapa de todos se actualiza solo
+    - reparte "reservas" cortas: el punto que alguien tiene abierto no se le
+      ofrece a otro como "siguiente"
+
+Las escrituras las hace una sola tarea: todo lo que llega mientras se guarda
+un lote se guarda junto en la transaccion siguiente (un commit por lote, no
+por clic). Las entradas repetidas (un navegador que reenvia al reconectarse)
+se ignoran.
+
+API (clave = clave_storage del clasificador):
+    GET  api/entradas?clave=..&desde=seq  -> {entradas, ultimo, reservas, conectados}
+    POST api/entradas   {clave, entradas: [[id, estado, lat_q, lon_q, inicial, ts, autor], ...]}
+    POST api/reservas   {clave, id, autor}
+    GET  api/eventos?clave=..&desde=seq   -> text/event-stream
+    GET  api/bitacora.rlog?clave=..       -> bitacora completa para bitacora_clasificacion.py
+
+USO:
+    python servidor_clasificador.py            # puerto 8000
+    python servidor_clasificador.py 8080
+
+    y cada encuestador abre http://<ip-del-notebook>:8000/ en su navegador
+
+AUTOR: Proyecto Rejas La Florida
+FECHA: Enero 2026
+================================================================================
+"""
+
+import asyncio
+import json
+import mimetypes
+import os
+import socket
+import sqlite3
+import time
+import urllib.parse
+from collections import defaultdict
+
+import pandas as pd
+
+from bitacora_clasificacion import bitacora_bytes
+
+
+DIRECTORIO = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '04_mapas_html')
+RUTA_DB = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                       '..', '03_datos_procesados', 'sincronizacion.sqlite')
+PAGINA = 'Clasificador_Rejas.html'
+PUERTO = 8000
+
+# Entradas por transaccion como maximo (el resto queda para la siguiente)
+LOTE_MAX = 5000
+# Cuerpo maximo de un POST
+CUERPO_MAX = 8 * 1024 * 1024
+# Segundos que un punto abierto queda reservado para quien lo abrio
+RESERVA_S = 120
+# Comentario SSE periodico: mantiene viva la conexion y detecta clientes caidos
+LATIDO_S = 15
+TIMEOUT_S = 30
+
+ESTADOS_HTTP = {200: 'OK', 400: 'Bad Request', 403: 'Forbidden', 404: 'Not Found',
+                405: 'Method Not Allowed', 413: 'Payload Too Large',
+                500: 'Internal Server Error'}
+
+
+class ErrorHTTP(Exception):
+    def __init__(self, estado, mensaje=''):
+        super().__init__(mensaje)
+        self.estado = estado
+
+
+# ==============================================================================
+# ALMACEN
+# ==============================================================================
+
+class AlmacenEntradas:
+    """
+    Entradas de todas las bitacoras en SQLite (modo WAL).
+
+    seq es el orden de llegada al servidor: los clientes piden "lo que vino
+    despues de seq". La unicidad (clave, id, ts, autor) descarta reenvios.
+    """
+
+    def __init__(self, ruta=RUTA_DB):
+        os.makedirs(os.path.dirname(os.path.abspath(ruta)), exist_ok=True)
+        # Una conexion para la tarea escritora y otra para las lecturas; se
+        # usan desde hilos (asyncio.to_thread)
+        self.escritura = sqlite3.connect(ruta, check_same_thread=False)
+        self.escritura.execute("PRAGMA journal_mode=WAL")
+        self.escritura.execute("PRAGMA synchronous=NORMAL")
+        self.escritura.execute(
+            "CREATE TABLE IF NOT EXISTS entradas ("
+            " seq INTEGER PRIMARY KEY AUTOINCREMENT, clave TEXT NOT NULL,"
+            " id INTEGER, estado INTEGER, lat INTEGER, lon INTEGER, inicial INTEGER,"
+            " ts REAL, autor TEXT, recibida REAL,"
+            " UNIQUE (clave, id, ts, autor))")
+        self.escritura.commit()
+        self.lectura = sqlite3.connect(ruta, check_same_thread=False)
+
+    def insertar(self, lote):
+        """
+        Guarda varios envios en una sola transaccion.
+
+        lote: lista de (clave, entradas). Retorna, por envio, la lista de
+        (seq, entrada) que eran nuevas.
+        """
+        ahora = time.time()
+        nuevas = []
+        with self.escritura:
+            cursor = self.escritura.cursor()
+            for clave, entradas in lote:
+                filas = []
+                for e in entradas:
+                    cursor.execute("INSERT OR IGNORE INTO entradas (clave, id, estado, lat, lon,"
+                                   " inicial, ts, autor, recibida) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                                   (clave, *e, ahora))
+                    if cursor.rowcount == 1:
+                        filas.append((cursor.lastrowid, e))
+                nuevas.append(filas)
+        return nuevas
+
+    def leer(self, clave, desde=0):
+        """Lista de (seq, entrada) de `clave` con seq > desde, en orden."""
+        filas = self.lectura.execute(
+            "SELECT seq, id, estado, lat, lon, inicial, ts, autor FROM entradas"
+            " WHERE clave = ? AND seq > ? ORDER BY seq", (clave, int(desde))).fetchall()
+        return [(f[0], list(f[1:])) for f in filas]
+
+    def cerrar(self):
+        self.escritura.close()
+        self.lectura.close()
+
+
+def leer_objeto(cuerpo):
+    """Cuerpo JSON de un POST; tiene que ser un objeto (ErrorHTTP 400 si no)."""
+    datos = json.loads(cuerpo)
+    if not isinstance(datos, dict):
+        raise ErrorHTTP(400, "se esperaba un objeto JSON")
+    return datos
+
+
+def validar_entradas(entradas):
+    """Convierte y revisa [id, estado, lat_q, lon_q, inicial, ts, autor]; ErrorHTTP 400."""
+    if not isinstance(entradas, list):
+        raise ErrorHTTP(400, "'entradas' debe ser una lista")
+    limpias = []
+    for e in entradas:
+        try:
+            i, estado, lat, lon, inicial, ts, autor = e
+            limpia = [int(i), int(estado), int(lat), int(lon), int(inicial), float(ts),
+                      str(autor)[:100]]
+        except (TypeError, ValueError):
+            raise ErrorHTTP(400, f"entrada invalida: {e!r}"[:200])
+        if limpia[0] < 0 or not 0 <= limpia[1] < 256 or not 0 <= limpia[4] < 256:
+            raise ErrorHTTP(400, f"entrada fuera de rango: {e!r}"[:200])
+        limpias.append(limpia)
+    return limpias
+
+
+# ==============================================================================
+# SERVIDOR
+# ==============================================================================
+
+class ServidorClasificador:
+    """
+    Servidor HTTP minimo sobre asyncio.
+
+    Cada conexion atiende una solicitud y se cierra, salvo api/eventos que
+    queda abierta empujando eventos. Los POST de entradas van a una cola; la
+    tarea escritora toma todo lo acumulado y lo guarda en una transaccion.
+    """
+
+    def __init__(self, directorio=DIRECTORIO, ruta_db=RUTA_DB, pagina=PAGINA):
+        self.directorio = os.path.realpath(directorio)
+        self.pagina = pagina
+        self.almacen = AlmacenEntradas(ruta_db)
+        self.cola = None
+        self.suscriptores = defaultdict(set)     # clave -> colas de los clientes SSE
+        self.reservas = defaultdict(dict)        # clave -> {id: (autor, vence)}
+        self._tareas = []
+        self._servidor = None
+
+    async def iniciar(self, host='0.0.0.0', puerto=PUERTO):
+        self.cola = asyncio.Queue()
+        self._tareas.append(asyncio.create_task(self._escritor()))
+        self._servidor = await asyncio.start_server(self._atender, host, puerto)
+        return self._servidor
+
+    async def cerrar(self):
+        if self._servidor is not None:
+            self._servidor.close()
+        for t in self._tareas:
+            t.cancel()
+        await asyncio.gather(*self._tareas, return_exceptions=True)
+        self.almacen.cerrar()
+
+    # ---- Escritura en lotes ----------------------------------------------
+    async def _escritor(self):
+        while True:
+            lote = [await self.cola.get()]
+            n = len(lote[0][1])
+            while not self.cola.empty() and n < LOTE_MAX:
+                lote.append(self.cola.get_nowait())
+                n += len(lote[-1][1])
+            try:
+                nuevas = await asyncio.to_thread(self.almacen.insertar,
+                                                 [(c, e) for c, e, _ in lote])
+            except Exception as err:
+                for _, _, listo in lote:
+                    listo.set_exception(err)
+                continue
+            for (clave, _, listo), filas in zip(lote, nuevas):
+                if filas:
+                    self._publicar(clave, self._evento_entradas(filas))
+                listo.set_result(len(filas))
+
+    # ---- Eventos -----------------------------------------------------------
+    @staticmethod
+    def _evento(datos, tipo=None, seq=None):
+        texto = ''
+        if tipo:
+            texto += f"event: {tipo}\n"
+        if seq is not None:
+            texto += f"id: {seq}\n"
+        return (texto + "data: " + json.dumps(datos, separators=(',', ':')) + "\n\n").encode('utf-8')
+
+    def _evento_entradas(self, filas):
+        return self._evento([e for _, e in filas], seq=filas[-1][0])
+
+    def _publicar(self, clave, evento):
+        for cola in self.suscriptores[clave]:
+            cola.put_nowait(evento)
+
+    def _reservas_vigentes(self, clave):
+        ahora = time.monotonic()
+        vigentes = {i: r for i, r in self.reservas[clave].items() if r[1] > ahora}
+        self.reservas[clave] = vigentes
+        return [[i, autor, round((vence - ahora) * 1000)] for i, (autor, vence) in vigentes.items()]
+
+    # ---- HTTP --------------------------------------------------------------
+    async def _atender(self, reader, writer):
+        try:
+            try:
+                cabecera = await asyncio.wait_for(reader.readuntil(b'\r\n\r\n'), TIMEOUT_S)
+            except (asyncio.IncompleteReadError, asyncio.LimitOverrunError,
+                    asyncio.TimeoutError, ConnectionError):
+                return
+            lineas = cabecera.decode('latin-1').split('\r\n')
+            try:
+                metodo, objetivo, _ = lineas[0].split(' ', 2)
+            except ValueError:
+                return
+            encabezados = {}
+            for linea in lineas[1:]:
+                if ':' in linea:
+                    k, v = linea.split(':', 1)
+                    encabezados[k.strip().lower()] = v.strip()
+            url = urllib.parse.urlsplit(objetivo)
+            consulta = dict(urllib.parse.parse_qsl(url.query))
+            try:
+                largo = int(encabezados.get('content-length', 0))
+                if largo > CUERPO_MAX:
+                    raise ErrorHTTP(413)
+                cuerpo = await asyncio.wait_for(reader.readexactly(largo), TIMEOUT_S) if largo else b''
+                if url.path == '/api/eventos' and metodo == 'GET':
+                    desde = encabezados.get('last-event-id') or consulta.get('desde', 0)
+                    await self._eventos(writer, consulta.get('clave', ''), int(desde))
+                    return
+                estado, datos, tipo = await self._ruta(metodo, url.path, consulta, cuerpo)
+            except ErrorHTTP as err:
+                estado, datos, tipo = err.estado, str(err).encode('utf-8'), 'text/plain; charset=utf-8'
+            except (ValueError, KeyError, TypeError) as err:
+                estado, datos, tipo = 400, str(err).encode('utf-8'), 'text/plain; charset=utf-8'
+            writer.write(self._cabecera(estado, tipo, len(datos)) + datos)
+            await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError, asyncio.TimeoutError):
+            pass
+        finally:
+            writer.close()
+
+    @staticmethod
+    def _cabecera(estado, tipo, largo=None, extra=''):
+        texto = (f"HTTP/1.1 {estado} {ESTADOS_HTTP.get(estado, '')}\r\n"
+                 f"Content-Type: {tipo}\r\nCache-Control: no-cache\r\n{extra}")
+        if largo is not None:
+            texto += f"Content-Length: {largo}\r\nConnection: close\r\n"
+        return (texto + "\r\n").encode('latin-1')
+
+    async def _ruta(self, metodo, ruta, consulta, cuerpo):
+        """(estado, bytes, content-type) de una solicitud que no es api/eventos."""
+        if ruta == '/api/entradas':
+            if metodo == 'GET':
+                clave = consulta.get('clave', '')
+                filas = await asyncio.to_thread(self.almacen.leer, clave, int(consulta.get('desde', 0)))
+                return self._json({'entradas': [e for _, e in filas],
+                                   'ultimo': filas[-1][0] if filas else int(consulta.get('desde', 0)),
+                                   'reservas': self._reservas_vigentes(clave),
+                                   'conectados': len(self.suscriptores[clave])})
+            if metodo == 'POST':
+                datos = leer_objeto(cuerpo)
+                entradas = validar_entradas(datos['entradas'])
+                listo = asyncio.get_running_loop().create_future()
+                self.cola.put_nowait((str(datos['clave']), entradas, listo))
+                try:
+                    nuevas = await listo
+                except Exception as err:
+                    # Fallo la escritura (p. ej. SQLite): el cliente reintenta
+                    raise ErrorHTTP(500, f"no se pudo guardar: {err}")
+                return self._json({'recibidas': len(entradas), 'nuevas': nuevas})
+            raise ErrorHTTP(405)
+        if ruta == '/api/reservas':
+            if metodo != 'POST':
+                raise ErrorHTTP(405)
+            datos = leer_objeto(cuerpo)
+            clave, i, autor = str(datos['clave']), int(datos['id']), str(datos['autor'])[:100]
+            self.reservas[clave][i] = (autor, time.monotonic() + RESERVA_S)
+            self._publicar(clave, self._evento([i, autor, RESERVA_S * 1000], tipo='reserva'))
+            return self._json({'id': i, 'segundos': RESERVA_S})
+        if ruta == '/api/bitacora.rlog':
+            clave = consulta.get('clave', '')
+            filas = await asyncio.to_thread(self.almacen.leer, clave)
+            df = pd.DataFrame([e for _, e in filas],
+                              columns=['id', 'estado', 'lat', 'lon', 'inicial', 'ts', 'autor'])
+            df['lat'] = df['lat'] / 10 ** 7
+            df['lon'] = df['lon'] / 10 ** 7
+            return 200, bitacora_bytes(df, clave), 'application/octet-stream'
+        if metodo != 'GET':
+            raise ErrorHTTP(405)
+        return await self._archivo(ruta)
+
+    @staticmethod
+    def _json(datos):
+        return 200, json.dumps(datos, separators=(',', ':')).encode('utf-8'), 'application/json'
+
+    async def _archivo(self, ruta):
+        relativa = urllib.parse.unquote(ruta).lstrip('/') or self.pagina
+        completa = os.path.realpath(os.path.join(self.directorio, relativa))
+        if os.path.commonpath([completa, self.directorio]) != self.directorio:
+            raise ErrorHTTP(403)
+        if not os.path.isfile(completa):
+            raise ErrorHTTP(404, relativa)
+        with open(completa, 'rb') as f:
+            datos = await asyncio.to_thread(f.read)
+        tipo = mimetypes.guess_type(completa)[0] or 'application/octet-stream'
+        if tipo.startswith('text/') or tipo == 'application/json':
+            tipo += '; charset=utf-8'
+        return 200, datos, tipo
+
+    async def _eventos(self, writer, clave, desde):
+        """Conexion SSE: primero lo que falta desde `desde`, despues en vivo."""
+        writer.write(self._cabecera(200, 'text/event-stream', extra='Connection: keep-alive\r\n'))
+        cola = asyncio.Queue()
+        # Suscribir antes de leer: un lote guardado entre medio llega dos veces
+        # (el cliente ignora lo repetido) en vez de perderse
+        self.suscriptores[clave].add(cola)
+        self._publicar(clave, self._evento(len(self.suscriptores[clave]), tipo='conectados'))
+        try:
+            filas = await asyncio.to_thread(self.almacen.leer, clave, desde)
+            if filas:
+                writer.write(self._evento_entradas(filas))
+            await writer.drain()
+            while True:
+                try:
+                    evento = await asyncio.wait_for(cola.get(), LATIDO_S)
+                except asyncio.TimeoutError:
+                    evento = b': latido\n\n'
+                writer.write(evento)
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            self.suscriptores[clave].discard(cola)
+            self._publicar(clave, self._evento(len(self.suscriptores[clave]), tipo='conectados'))
+
+
+def _ip_local():
+    try:
+        return socket.gethostbyname(socket.gethostname())
+    except OSError:
+        return 'localhost'
+
+
+async def _servir(directorio, ruta_db, host, puerto):
+    servidor = ServidorClasificador(directorio, ruta_db)
+    await servidor.iniciar(host, puerto)
+    print(f"      Sirviendo {os.path.realpath(directorio)}")
+    print(f"      Base: {os.path.realpath(ruta_db)}")
+    print(f"      Abrir http://{_ip_local()}:{puerto}/ (Ctrl+C para terminar)")
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await servidor.cerrar()
+
+
+def servir(directorio=DIRECTORIO, ruta_db=RUTA_DB, host='0.0.0.0', puerto=PUERTO):
+    """Corre el servidor hasta Ctrl+C."""
+    try:
+        asyncio.run(_servir(directorio, ruta_db, host, puerto))
+    except KeyboardInterrupt:
+        print("      Servidor detenido")
+
+
+# ==============================================================================
+# EJECUTAR
+# ==============================================================================
+if __name__ == "__main__":
+    import sys
+
+    print("=" * 70)
+    print("SERVIDOR DEL CLASIFICADOR")
+    print("=" * 70)
+    servir(puerto=int(sys.argv[1]) if len(sys.argv) > 1 else PUERTO)
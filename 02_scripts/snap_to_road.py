@@ -8,6 +8,9 @@ SNAP TO ROAD - Ajustar puntos a la red vial
 Este script ajusta las coordenadas de rejas/puntos para que queden
 exactamente sobre las calles mas cercanas usando datos de OpenStreetMap.
 
+Cada punto se proyecta sobre la arista mas cercana (con su geometria curva
+completa), no sobre el nodo mas cercano. Ver snap_vial.py.
+
 USO:
     python snap_to_road.py
 
@@ -15,29 +18,29 @@ ENTRADA:
     - Archivo Excel con columnas 'lat' y 'lon' (o 'cord' con formato "lat, lon")
 
 SALIDA:
-    - Archivo Excel con coordenadas ajustadas
-    - Columnas adicionales: lat_original, lon_original, dist_ajuste_m
+    - Archivo Excel con coordenadas ajustadas (y su copia en el almacen
+      columnar, ver almacen_datos.py)
+    - Columnas adicionales: lat_original, lon_original, dist_ajuste_m,
+      osm_u, osm_v, osm_key (arista de OSM), offset_m (posicion en la arista)
+    - Cache <salida>_cache.npz: en la siguiente ejecucion solo se re-ajustan
+      las filas nuevas, movidas o cuya arista ya no existe en la red
 
 REQUISITOS:
-    pip install pandas openpyxl osmnx scipy numpy
+    pip install pandas openpyxl pyarrow osmnx scipy numpy
+    (osmnx solo se usa la primera vez, para crear el snapshot de red_vial.py)
 
 AUTOR: Proyecto Rejas La Florida
 FECHA: Diciembre 2025
 ================================================================================
 """
 
-import pandas as pd
 import numpy as np
-from scipy.spatial import cKDTree
 import os
+import time
 
-# Intentar importar osmnx
-try:
-    import osmnx as ox
-except ImportError:
-    print("ERROR: Falta instalar osmnx")
-    print("Ejecuta: pip install osmnx")
-    exit(1)
+from almacen_datos import cargar_tabla, guardar_tabla
+from red_vial import cargar_red
+from snap_vial import indice_aristas, snap_puntos, snap_incremental
 
 
 def parse_coordenadas(cord_str):
@@ -51,7 +54,8 @@ def parse_coordenadas(cord_str):
         return None, None
 
 
-def snap_to_road(input_file, output_file=None, lugar="La Florida, Santiago, Chile"):
+def snap_to_road(input_file, output_file=None, lugar="La Florida, Santiago, Chile",
+                 network_type='drive', tipos=None, incremental=True):
     """
     Ajusta los puntos de un archivo Excel a la red vial mas cercana.
 
@@ -63,6 +67,13 @@ def snap_to_road(input_file, output_file=None, lugar="La Florida, Santiago, Chil
         Ruta al archivo de salida (si no se especifica, agrega '_snapped')
     lugar : str
         Nombre del lugar para descargar la red vial de OpenStreetMap
+    network_type : str
+        Tipo de red de osmnx ('drive', 'all', ...)
+    tipos : set, opcional
+        Solo ajustar a calles de estos tipos highway (p.ej. {'residential'})
+    incremental : bool
+        Reutilizar los ajustes de la ejecucion anterior para las filas que no
+        cambiaron (cache junto al archivo de salida)
 
     Retorna:
     --------
@@ -80,7 +91,7 @@ def snap_to_road(input_file, output_file=None, lugar="La Florida, Santiago, Chil
 
     # 1. Cargar datos
     print(f"\n[1/4] Cargando datos de: {input_file}")
-    df = pd.read_excel(input_file)
+    df = cargar_tabla(input_file)
     print(f"      {len(df)} puntos encontrados")
 
     # Verificar si tiene lat/lon o cord
@@ -104,59 +115,55 @@ def snap_to_road(input_file, output_file=None, lugar="La Florida, Santiago, Chil
     df = df.dropna(subset=['lat', 'lon'])
     print(f"      {len(df)} puntos con coordenadas validas")
 
-    # 2. Descargar red vial
-    print(f"\n[2/4] Descargando red vial de: {lugar}")
-    print("      (esto puede tomar 1-2 minutos la primera vez)")
+    # 2. Cargar red vial (snapshot local, se descarga solo la primera vez)
+    print(f"\n[2/4] Cargando red vial de: {lugar}")
 
     try:
-        G = ox.graph_from_place(lugar, network_type='drive', simplify=True)
-    except:
+        red = cargar_red(lugar, network_type=network_type, simplify=True)
+    except Exception:
         print("      No se pudo descargar por nombre, usando area centrada en los datos...")
         centro_lat = df['lat'].mean()
         centro_lon = df['lon'].mean()
-        G = ox.graph_from_point((centro_lat, centro_lon), dist=5000,
-                                 network_type='drive', simplify=True)
+        red = cargar_red((centro_lat, centro_lon), network_type=network_type,
+                         simplify=True, dist=5000)
 
-    print(f"      Red descargada: {len(G.nodes)} nodos, {len(G.edges)} aristas")
+    print(f"      Red vial: {red.n_nodos} nodos, {red.n_aristas} aristas")
 
     # 3. Preparar busqueda
-    print("\n[3/4] Preparando algoritmo de busqueda...")
-    nodes = list(G.nodes(data=True))
-    node_coords = np.array([[data['y'], data['x']] for _, data in nodes])
-    tree = cKDTree(node_coords)
+    print("\n[3/4] Preparando indice espacial de calles...")
+    indice = indice_aristas(red, tipos=tipos)
+    print(f"      {len(indice['aristas'])} tramos de calle indexados")
 
-    # 4. Ajustar puntos
+    # 4. Ajustar puntos (todos a la vez)
     print(f"\n[4/4] Ajustando {len(df)} puntos a la red vial...")
-
-    new_lats = []
-    new_lons = []
-    distances = []
-
-    for idx, row in df.iterrows():
-        # Buscar nodo mas cercano
-        dist, i = tree.query([row['lat'], row['lon']])
-
-        # Guardar nueva posicion
-        new_lats.append(node_coords[i][0])
-        new_lons.append(node_coords[i][1])
-
-        # Calcular distancia en metros (aproximado)
-        dist_metros = dist * 111000  # 1 grado ~ 111km
-        distances.append(dist_metros)
-
-        # Mostrar progreso
-        if (idx + 1) % 500 == 0:
-            print(f"      {idx + 1}/{len(df)} procesados...")
+    t0 = time.time()
+    if incremental:
+        ruta_cache = f"{os.path.splitext(output_file)[0]}_cache.npz"
+        parametros = {'network_type': network_type,
+                      'tipos': sorted(tipos) if tipos else None}
+        res, stats = snap_incremental(indice, df, ruta_cache, parametros=parametros)
+        print(f"      Reutilizados: {stats['reutilizados']}, nuevos/movidos: {stats['nuevos']}"
+              f" (arista desaparecida: {stats['invalidados']})")
+    else:
+        res = snap_puntos(indice, df['lat'].values, df['lon'].values)
+    print(f"      Listo en {time.time() - t0:.2f} s")
 
     # Agregar columnas
+    claves = red.claves_aristas()[np.maximum(res['arista'], 0)]
+    claves[res['arista'] < 0] = -1
     df['lat_original'] = df['lat']
     df['lon_original'] = df['lon']
-    df['lat'] = new_lats
-    df['lon'] = new_lons
-    df['dist_ajuste_m'] = distances
-
-    # Guardar
-    df.to_excel(output_file, index=False)
+    df['lat'] = res['lat']
+    df['lon'] = res['lon']
+    df['dist_ajuste_m'] = res['dist_m']
+    df['osm_u'] = claves[:, 0]
+    df['osm_v'] = claves[:, 1]
+    df['osm_key'] = claves[:, 2]
+    df['offset_m'] = res['offset_m']
+    distances = res['dist_m']
+
+    # Guardar (almacen columnar + Excel para compartir)
+    guardar_tabla(df, output_file)
 
     # Resumen
     print("\n" + "="*60)
@@ -166,7 +173,7 @@ def snap_to_road(input_file, output_file=None, lugar="La Florida, Santiago, Chil
     print(f"  Ajuste promedio:   {np.mean(distances):.1f} metros")
     print(f"  Ajuste maximo:     {np.max(distances):.1f} metros")
     print(f"  Ajuste minimo:     {np.min(distances):.1f} metros")
-    print(f"  Puntos con >50m:   {sum(1 for d in distances if d > 50)}")
+    print(f"  Puntos con >50m:   {int((distances > 50).sum())}")
     print(f"\n  Guardado en: {output_file}")
     print("="*60)
 
@@ -200,3 +207,5 @@ if __name__ == "__main__":
         print("  - lat, lon: Coordenadas ajustadas a la calle")
         print("  - lat_original, lon_original: Coordenadas originales")
         print("  - dist_ajuste_m: Distancia del ajuste en metros")
+        print("  - osm_u, osm_v, osm_key: Arista de OSM sobre la que quedo el punto")
+        print("  - offset_m: Distancia desde osm_u a lo largo de la arista")
@@ -0,0 +1,295 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+================================================================================
+SNAP VIAL - Proyeccion vectorizada de puntos sobre las calles
+================================================================================
+
+Proyecta TODOS los puntos de una vez sobre la arista mas cercana de la red,
+usando la geometria curva completa de cada arista (no la recta u-v) y
+distancias en metros (UTM 19S).
+
+Pasos:
+    1. Geometrias de las aristas en metros (shapely.linestrings vectorizado)
+    2. STRtree.query_nearest con todos los puntos como arreglo
+    3. line_locate_point + line_interpolate_point vectorizados
+
+USO:
+    from red_vial import cargar_red
+    from snap_vial import indice_aristas, snap_puntos
+
+    red = cargar_red("La Florida, Santiago, Chile", network_type='all')
+    indice = indice_aristas(red)                   # se puede reutilizar
+    res = snap_puntos(indice, df['lat'], df['lon'])
+    res['lat'], res['lon'], res['dist_m'], res['arista'], res['offset_m']
+
+    # Incremental: solo proyecta filas nuevas, movidas o cuya arista desaparecio
+    res, stats = snap_incremental(indice, df, 'Base_Snapped_cache.npz')
+
+AUTOR: Proyecto Rejas La Florida
+FECHA: Enero 2026
+================================================================================
+"""
+
+import json
+import os
+
+import numpy as np
+import pandas as pd
+import shapely
+from shapely import STRtree
+
+from proyeccion import a_metros, a_grados
+from seleccion_nodos import bits_highway, mascara_grupo
+
+
+def aristas_de_tipos(red, tipos):
+    """Indices de las aristas que tienen al menos uno de los tipos highway dados."""
+    bits, mascara_vocab = bits_highway(red)
+    m_arista = mascara_vocab[np.asarray(red.highway_cod)]
+    return np.flatnonzero((m_arista & mascara_grupo(bits, tipos)) != 0)
+
+
+def indice_aristas(red, tipos=None, una_direccion=True):
+    """
+    Construye el indice espacial de las aristas en coordenadas metricas.
+
+    Parametros:
+    -----------
+    red : RedVial
+        Red cargada con red_vial.cargar_red
+    tipos : set, opcional
+        Solo considerar aristas con estos tipos highway (p.ej. RESIDENCIALES)
+    una_direccion : bool
+        En redes dirigidas cada calle de doble sentido aparece dos veces
+        (u->v y v->u); con True se indexa solo una de ellas
+
+    Retorna:
+    --------
+    dict con el arbol, las geometrias y el indice de arista de la red
+    """
+    aristas = np.arange(red.n_aristas) if tipos is None else aristas_de_tipos(red, tipos)
+    if una_direccion:
+        u, v = np.asarray(red.u)[aristas], np.asarray(red.v)[aristas]
+        aristas = aristas[(u <= v) | ~_tiene_inversa(red, aristas)]
+
+    ptr = np.asarray(red.geom_ptr)
+    inicio, fin = ptr[aristas], ptr[aristas + 1]
+    largos = fin - inicio
+    # Indices de todos los vertices de las aristas elegidas, en orden
+    vertices = np.repeat(inicio - np.concatenate([[0], np.cumsum(largos)[:-1]]), largos) + \
+        np.arange(largos.sum())
+    x, y = a_metros(np.asarray(red.geom_y)[vertices], np.asarray(red.geom_x)[vertices])
+    geometrias = shapely.linestrings(x, y, indices=np.repeat(np.arange(len(aristas)), largos))
+
+    return {
+        'arbol': STRtree(geometrias),
+        'geometrias': geometrias,
+        'aristas': aristas,
+        'largo_m': shapely.length(geometrias),
+        'red': red,
+    }
+
+
+def _tiene_inversa(red, aristas):
+    """Para cada arista (u, v) indica si existe tambien (v, u) en la red."""
+    n = red.n_nodos
+    u, v = np.asarray(red.u).astype(np.int64), np.asarray(red.v).astype(np.int64)
+    directas = np.unique(u * n + v)
+    inversas = v[aristas] * n + u[aristas]
+    pos = np.clip(np.searchsorted(directas, inversas), 0, len(directas) - 1)
+    return directas[pos] == inversas
+
+
+def snap_puntos(indice, lat, lon, dist_max_m=None):
+    """
+    Proyecta cada punto sobre la arista mas cercana.
+
+    Parametros:
+    -----------
+    indice : dict
+        Resultado de indice_aristas
+    lat, lon : array
+        Coordenadas originales
+    dist_max_m : float, opcional
+        Puntos mas lejos que esto quedan sin ajustar (arista = -1)
+
+    Retorna:
+    --------
+    dict de arrays (uno por punto):
+        lat, lon  : coordenadas sobre la calle
+        dist_m    : distancia del ajuste en metros
+        arista    : indice de arista en la red (-1 si no se ajusto)
+        offset_m  : distancia desde el nodo u a lo largo de la arista
+        fraccion  : offset_m / largo de la arista (0 = en u, 1 = en v)
+    """
+    lat = np.asarray(lat, dtype=np.float64)
+    lon = np.asarray(lon, dtype=np.float64)
+    x, y = a_metros(lat, lon)
+    puntos = shapely.points(x, y)
+
+    (i_punto, i_geom), dist = indice['arbol'].query_nearest(
+        puntos, max_distance=dist_max_m, return_distance=True, all_matches=False)
+
+    n = len(lat)
+    geom = np.full(n, -1, dtype=np.int64)
+    geom[i_punto] = i_geom
+    dist_m = np.full(n, np.inf)
+    dist_m[i_punto] = dist
+
+    ok = geom >= 0
+    lineas = indice['geometrias'][geom[ok]]
+    offset = shapely.line_locate_point(lineas, puntos[ok])
+    proyectados = shapely.line_interpolate_point(lineas, offset)
+    lat_s, lon_s = lat.copy(), lon.copy()
+    lat_s[ok], lon_s[ok] = a_grados(shapely.get_x(proyectados), shapely.get_y(proyectados))
+
+    arista = np.full(n, -1, dtype=np.int64)
+    arista[ok] = indice['aristas'][geom[ok]]
+    offset_m = np.full(n, np.nan)
+    offset_m[ok] = offset
+    fraccion = np.full(n, np.nan)
+    largo = indice['largo_m'][geom[ok]]
+    fraccion[ok] = np.divide(offset, largo, out=np.zeros_like(offset), where=largo > 0)
+
+    return {
+        'lat': lat_s,
+        'lon': lon_s,
+        'dist_m': dist_m,
+        'arista': arista,
+        'offset_m': offset_m,
+        'fraccion': fraccion,
+    }
+
+
+# ==============================================================================
+# SNAP INCREMENTAL
+# ==============================================================================
+# Cada fila se identifica por su huella: fuente (archivo de origen), clave de
+# fila dentro de esa fuente y coordenadas originales. Si la huella ya estaba
+# en el cache y su arista sigue existiendo en la red, se reutiliza el ajuste.
+
+COLUMNAS_CACHE = ('fuente', 'fila', 'lat_raw', 'lon_raw', 'osm_u', 'osm_v', 'osm_key',
+                  'lat', 'lon', 'dist_m', 'offset_m', 'fraccion')
+
+
+def huellas_filas(df, col_fuente='fuente', col_clave=None):
+    """
+    Huella de cada fila: (fuente, fila, lat, lon).
+
+    La clave de fila es la columna col_clave si se indica; si no, el numero
+    de la fila dentro de su fuente (las fuentes se concatenan en orden, asi
+    que las filas nuevas que agrega un encuestador quedan al final).
+    """
+    fuente = df[col_fuente].astype(str) if col_fuente in df.columns else \
+        pd.Series('', index=df.index)
+    if col_clave:
+        fila = df[col_clave].astype(np.int64)
+    else:
+        fila = fuente.groupby(fuente).cumcount().astype(np.int64)
+    return pd.DataFrame({
+        'fuente': fuente.values,
+        'fila': fila.values,
+        'lat_raw': df['lat'].values.astype(np.float64),
+        'lon_raw': df['lon'].values.astype(np.float64),
+    })
+
+
+def leer_cache_snap(ruta, parametros):
+    """Carga el cache de ajustes; None si no existe o fue hecho con otros parametros."""
+    if not os.path.exists(ruta):
+        return None
+    with np.load(ruta, allow_pickle=False) as datos:
+        if json.loads(str(datos['parametros'])) != parametros:
+            return None
+        return pd.DataFrame({c: datos[c] for c in COLUMNAS_CACHE})
+
+
+def guardar_cache_snap(ruta, tabla, parametros):
+    """Guarda el cache como .npz (sin pickle: solo arreglos y un JSON con los parametros)."""
+    np.savez(ruta, parametros=np.array(json.dumps(parametros, sort_keys=True)),
+             **{c: np.asarray(tabla[c], dtype=str if c == 'fuente' else None)
+                for c in COLUMNAS_CACHE})
+
+
+def snap_incremental(indice, df, ruta_cache, col_clave=None, parametros=None):
+    """
+    Igual que snap_puntos, pero solo proyecta las filas nuevas o movidas.
+
+    Una fila reutiliza su ajuste anterior si coinciden fuente, clave de fila
+    y coordenadas originales, y si la arista donde quedo todavia existe en la
+    red actual (se compara por su clave OSM, no por indice).
+
+    Parametros:
+    -----------
+    indice : dict
+        Resultado de indice_aristas
+    df : DataFrame
+        Con columnas lat, lon y fuente
+    ruta_cache : str
+        Archivo .npz donde se guarda el cache entre ejecuciones
+    col_clave : str, opcional
+        Columna con un identificador estable de fila
+    parametros : dict, opcional
+        Parametros del indice (tipo de red, filtros); si cambian se invalida
+        todo el cache
+
+    Retorna:
+    --------
+    (resultado, estadisticas)
+        resultado: dict de arrays como snap_puntos
+        estadisticas: dict con reutilizados, nuevos, invalidados
+    """
+    parametros = dict(parametros or {})
+    red = indice['red']
+    huellas = huellas_filas(df, col_clave=col_clave)
+    n = len(huellas)
+
+    claves_red = pd.DataFrame(red.claves_aristas(), columns=['osm_u', 'osm_v', 'osm_key'])
+    claves_red['arista_actual'] = np.arange(red.n_aristas)
+
+    previo = leer_cache_snap(ruta_cache, parametros)
+    reusar = np.zeros(n, dtype=bool)
+    invalidados = 0
+    if previo is not None:
+        previo = previo.drop_duplicates(['fuente', 'fila'], keep='last')
+        unido = huellas.merge(previo, on=['fuente', 'fila'], how='left',
+                              suffixes=('', '_prev'))
+        unido = unido.merge(claves_red, on=['osm_u', 'osm_v', 'osm_key'], how='left')
+        mismo_punto = ((unido['lat_raw'] == unido['lat_raw_prev']) &
+                       (unido['lon_raw'] == unido['lon_raw_prev'])).values
+        arista_existe = unido['arista_actual'].notna().values
+        reusar = mismo_punto & arista_existe
+        invalidados = int((mismo_punto & ~arista_existe).sum())
+
+    resultado = {
+        'lat': np.empty(n), 'lon': np.empty(n), 'dist_m': np.empty(n),
+        'arista': np.full(n, -1, dtype=np.int64),
+        'offset_m': np.empty(n), 'fraccion': np.empty(n),
+    }
+    if reusar.any():
+        for col in ('lat', 'lon', 'offset_m', 'fraccion'):
+            resultado[col][reusar] = unido[col].values[reusar]
+        resultado['dist_m'][reusar] = unido['dist_m'].values[reusar]
+        resultado['arista'][reusar] = unido['arista_actual'].values[reusar].astype(np.int64)
+
+    nuevos = ~reusar
+    if nuevos.any():
+        res = snap_puntos(indice, huellas['lat_raw'].values[nuevos],
+                          huellas['lon_raw'].values[nuevos])
+        for col in resultado:
+            resultado[col][nuevos] = res[col]
+
+    claves = red.claves_aristas()[np.maximum(resultado['arista'], 0)]
+    claves[resultado['arista'] < 0] = -1
+    tabla = huellas.assign(osm_u=claves[:, 0], osm_v=claves[:, 1], osm_key=claves[:, 2],
+                           lat=resultado['lat'], lon=resultado['lon'],
+                           dist_m=resultado['dist_m'], offset_m=resultado['offset_m'],
+                           fraccion=resultado['fraccion'])
+    guardar_cache_snap(ruta_cache, tabla, parametros)
+
+    return resultado, {
+        'reutilizados': int(reusar.sum()),
+        'nuevos': int(nuevos.sum()),
+        'invalidados': invalidados,
+    }
@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+================================================================================
+TESELAS DE PUNTOS - Datos del clasificador en teselas binarias z/x/y
+================================================================================
+
+El clasificador escribia todos los puntos como JSON dentro del HTML
+(`const DATA=[...]`): el navegador tenia que leer y dibujar todo antes de
+mostrar nada, y el archivo crece con cada comuna que se agrega.
+
+Aqui los puntos se cortan en teselas Web Mercator de un zoom fijo y cada
+tesela se guarda en binario (little-endian):
+
+    uint32 n
+    int32  id[n]       indice del punto (clave de los cambios guardados)
+    int32  lat[n]      grados * ESCALA_COORD
+    int32  lon[n]
+    uint8  estado[n]
+
+Un indice JSON chico (una fila por tesela, no por punto) dice que teselas
+existen, cuantos puntos tiene cada una y los totales por estado. El
+navegador pide solo las teselas de la vista.
+
+El orden de visita (ruta_clasificacion) va en un archivo aparte con el mismo
+formato sin la columna de estado.
+
+USO:
+    from teselas_puntos import empaquetar_teselas, guardar_teselas
+
+    paquete = empaquetar_teselas(lat, lon, estado, n_estados=4)
+    guardar_teselas(paquete, '../04_mapas_html/Clasificador_Rejas_teselas')
+
+AUTOR: Proyecto Rejas La Florida
+FECHA: Enero 2026
+================================================================================
+"""
+
+import json
+import os
+import shutil
+
+import numpy as np
+
+
+# Zoom de las teselas: a z14 una tesela mide ~2 km en La Florida
+ZOOM_TESELAS = 14
+# Bajo este zoom el navegador no pide teselas (solo muestra el resumen)
+ZOOM_MIN_CARGA = 13
+# int32 con 1e-7 grados: ~1 cm de resolucion, sin desborde en lon +-180
+ESCALA_COORD = 10 ** 7
+
+
+def tesela_de(lat, lon, zoom=ZOOM_TESELAS):
+    """Indices (x, y) de la tesela z/x/y que contiene cada punto."""
+    lat = np.asarray(lat, dtype=np.float64)
+    lon = np.asarray(lon, dtype=np.float64)
+    n = 2 ** zoom
+    s = np.sin(np.radians(lat))
+    x = np.floor((lon + 180) / 360 * n).astype(np.int64)
+    y = np.floor((0.5 - np.log((1 + s) / (1 - s)) / (4 * np.pi)) * n).astype(np.int64)
+    return np.clip(x, 0, n - 1), np.clip(y, 0, n - 1)
+
+
+def _columnas_binarias(n, *columnas):
+    return np.uint32(n).astype('<u4').tobytes() + b''.join(c.tobytes() for c in columnas)
+
+
+def empaquetar_teselas(lat, lon, estado, n_estados, orden_ruta=None,
+                       zoom=ZOOM_TESELAS, zoom_min=ZOOM_MIN_CARGA):
+    """
+    Corta los puntos en teselas binarias.
+
+    Parametros:
+    -----------
+    lat, lon : array
+        Coordenadas de los puntos (el id de cada punto es su posicion)
+    estado : array int
+        Codigo de estado de cada punto (0..n_estados-1)
+    n_estados : int
+        Numero de estados, para los totales del indice
+    orden_ruta : array int, opcional
+        Ids de los puntos en orden de visita
+    zoom : int
+        Zoom de las teselas
+
+    Retorna:
+    --------
+    dict con:
+        indice  : dict serializable a JSON (zoom, zoom_min, n, escala,
+                  conteo por estado, centro, teselas [[x, y, n, lat, lon], ...])
+        teselas : dict (x, y) -> bytes
+        ruta    : bytes o None
+    """
+    lat = np.asarray(lat, dtype=np.float64)
+    lon = np.asarray(lon, dtype=np.float64)
+    estado = np.asarray(estado, dtype=np.uint8)
+    lat_q = np.rint(lat * ESCALA_COORD).astype('<i4')
+    lon_q = np.rint(lon * ESCALA_COORD).astype('<i4')
+
+    tx, ty = tesela_de(lat, lon, zoom)
+    orden = np.lexsort((ty, tx))
+    claves = tx[orden] * (2 ** zoom) + ty[orden]
+    cortes = np.flatnonzero(np.diff(claves)) + 1
+    teselas, filas = {}, []
+    for ids in np.split(orden, cortes) if len(orden) else []:
+        ids = np.sort(ids).astype('<i4')
+        x, y = int(tx[ids[0]]), int(ty[ids[0]])
+        teselas[(x, y)] = _columnas_binarias(len(ids), ids, lat_q[ids], lon_q[ids], estado[ids])
+        filas.append([x, y, len(ids), round(float(lat[ids].mean()), 6),
+                      round(float(lon[ids].mean()), 6)])
+
+    ruta = None
+    if orden_ruta is not None:
+        ids = np.asarray(orden_ruta, dtype='<i4')
+        ruta = _columnas_binarias(len(ids), ids, lat_q[ids], lon_q[ids])
+
+    indice = {
+        'zoom': zoom,
+        'zoom_min': zoom_min,
+        'n': int(len(lat)),
+        'escala': ESCALA_COORD,
+        'conteo': np.bincount(estado, minlength=n_estados).tolist(),
+        'centro': [float(lat.mean()), float(lon.mean())] if len(lat) else [0.0, 0.0],
+        'teselas': filas,
+    }
+    return {'indice': indice, 'teselas': teselas, 'ruta': ruta}
+
+
+def guardar_teselas(paquete, directorio):
+    """
+    Escribe <directorio>/indice.json, <directorio>/<z>/<x>/<y>.bin y, si hay
+    ruta, <directorio>/ruta.bin. El directorio se reemplaza completo.
+    """
+    tmp = directorio.rstrip('/\\') + '.tmp'
+    if os.path.exists(tmp):
+        shutil.rmtree(tmp)
+    zoom = paquete['indice']['zoom']
+    for (x, y), datos in paquete['teselas'].items():
+        os.makedirs(os.path.join(tmp, str(zoom), str(x)), exist_ok=True)
+        with open(os.path.join(tmp, str(zoom), str(x), f"{y}.bin"), 'wb') as f:
+            f.write(datos)
+    os.makedirs(tmp, exist_ok=True)
+    if paquete['ruta'] is not None:
+        with open(os.path.join(tmp, 'ruta.bin'), 'wb') as f:
+            f.write(paquete['ruta'])
+    with open(os.path.join(tmp, 'indice.json'), 'w', encoding='utf-8') as f:
+        json.dump(paquete['indice'], f, separators=(',', ':'))
+
+    if os.path.exists(directorio):
+        shutil.rmtree(directorio)
+    os.replace(tmp, directorio)
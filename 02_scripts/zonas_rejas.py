@@ -0,0 +1,286 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+================================================================================
+ZONAS DE REJAS - Agrupamiento espacial (DBSCAN en metros) y poligonos de zona
+================================================================================
+
+Las "8 zonas de alta concentracion de rejas" del reporte salieron de DBSCAN
+sobre lat/lon en grados (eps en grados no son metros: un grado de longitud
+mide ~93 km y uno de latitud ~111 km), y 3_Clusters.html es un volcado de un
+marcador por punto (2.7 MB).
+
+Aqui:
+
+    - las rejas cerradas se proyectan a metros (proyeccion.a_metros)
+    - el grafo de vecinos (pares a menos de RADIO_MAX_M) se arma UNA vez con
+      un KD-tree y se guarda en cache_etapas; DBSCAN con cualquier eps <=
+      RADIO_MAX_M y cualquier min_muestras solo filtra ese grafo, asi que
+      probar parametros es instantaneo
+    - DBSCAN vectorizado: nucleos por grado, zonas = componentes conexos del
+      grafo entre nucleos (scipy), cada punto borde va a la zona de su
+      nucleo mas cercano
+    - metrica 'red': la distancia entre dos rejas es por calle (Dijkstra
+      acotado a RADIO_MAX_M sobre la red de red_rejas, desde el nodo mas
+      cercano a cada reja), asi dos rejas a cada lado de una linea ferrea o
+      de un canal no quedan en la misma zona
+    - cada zona se entrega como un poligono (envolvente convexa o concava,
+      con un margen de MARGEN_M) en GeoJSON, no como puntos
+
+USO:
+    from zonas_rejas import zonas_rejas
+
+    res = zonas_rejas(lat, lon, eps_m=150, min_muestras=10)
+    res['etiqueta'], res['geojson']
+
+    python zonas_rejas.py                  # eps 150 m, min 10, distancia euclidea
+    python zonas_rejas.py 200 15 red       # eps 200 m, min 15, distancia por calle
+
+AUTOR: Proyecto Rejas La Florida
+FECHA: Enero 2026
+================================================================================
+"""
+
+import json
+
+import numpy as np
+from scipy.sparse import coo_matrix
+from scipy.sparse.csgraph import connected_components
+from scipy.spatial import cKDTree
+
+from cache_etapas import CacheEtapas, hash_datos
+from proyeccion import a_grados, a_metros
+
+
+EPS_M = 150
+MIN_MUESTRAS = 10
+# Radio del grafo de vecinos guardado (eps mayores lo recalculan)
+RADIO_MAX_M = 500
+METRICAS = ('euclidea', 'red')
+# Envolvente: 1 = convexa, < 1 = concava (shapely.concave_hull)
+RATIO_ENVOLVENTE = 1.0
+MARGEN_M = 20
+# Rejas por llamada a dijkstra en la metrica 'red'
+LOTE_RED = 128
+
+
+# ==============================================================================
+# GRAFO DE VECINOS
+# ==============================================================================
+
+def vecinos_euclideos(x, y, radio_m):
+    """Pares (i < j) a menos de radio_m en linea recta, con su distancia."""
+    arbol = cKDTree(np.column_stack([x, y]))
+    m = arbol.sparse_distance_matrix(arbol, radio_m, output_type='coo_matrix')
+    sup = m.row < m.col
+    return {'i': m.row[sup].astype(np.int64), 'j': m.col[sup].astype(np.int64),
+            'd': m.data[sup]}
+
+
+def vecinos_red(rr, nodo, radio_m):
+    """Pares (i < j) a menos de radio_m por calle (sin contar las rejas)."""
+    from scipy.sparse.csgraph import dijkstra
+
+    M = rr.matriz(rr.todas(), pesos='largo')
+    partes_i, partes_j, partes_d = [], [], []
+    for ini in range(0, len(nodo), LOTE_RED):
+        filas = np.arange(ini, min(ini + LOTE_RED, len(nodo)))
+        D = dijkstra(M, directed=False, indices=nodo[filas], limit=radio_m)[:, nodo]
+        f, j = np.nonzero(np.isfinite(D))
+        i = filas[f]
+        sup = i < j
+        partes_i.append(i[sup])
+        partes_j.append(j[sup])
+        partes_d.append(D[f[sup], j[sup]])
+    return {'i': np.concatenate(partes_i), 'j': np.concatenate(partes_j),
+            'd': np.concatenate(partes_d)}
+
+
+# ==============================================================================
+# DBSCAN
+# ==============================================================================
+
+def dbscan(n, vecinos, eps_m=EPS_M, min_muestras=MIN_MUESTRAS):
+    """
+    DBSCAN sobre un grafo de vecinos ya calculado.
+
+    Parametros:
+    -----------
+    n : int
+        Numero de puntos
+    vecinos : dict
+        i, j, d de los pares (i < j) a distancia <= algun radio >= eps_m
+    eps_m : float
+    min_muestras : int
+        Vecinos (contando el propio punto) para ser nucleo
+
+    Retorna:
+    --------
+    (etiqueta, nucleo): etiqueta por punto (-1 = ruido; zonas numeradas de
+    mayor a menor) y si el punto es nucleo
+    """
+    m = vecinos['d'] <= eps_m
+    i, j, d = vecinos['i'][m], vecinos['j'][m], vecinos['d'][m]
+    grado = 1 + np.bincount(i, minlength=n) + np.bincount(j, minlength=n)
+    nucleo = grado >= min_muestras
+
+    # Zonas: componentes del grafo entre nucleos
+    nn = nucleo[i] & nucleo[j]
+    g = coo_matrix((np.ones(int(nn.sum()), dtype=np.int8), (i[nn], j[nn])), shape=(n, n))
+    comp = connected_components(g, directed=False)[1]
+    etiqueta = np.where(nucleo, comp, -1)
+
+    # Bordes: al nucleo mas cercano (pares en ambos sentidos, por distancia)
+    borde = np.concatenate([i, j]), np.concatenate([j, i]), np.concatenate([d, d])
+    ok = ~nucleo[borde[0]] & nucleo[borde[1]]
+    p, q, dd = borde[0][ok], borde[1][ok], borde[2][ok]
+    orden = np.lexsort((dd, p))
+    p, q = p[orden], q[orden]
+    primero = np.r_[True, p[1:] != p[:-1]]
+    etiqueta[p[primero]] = comp[q[primero]]
+
+    # Renumerar de mayor a menor
+    validas = etiqueta >= 0
+    unicas, inv, tam = np.unique(etiqueta[validas], return_inverse=True, return_counts=True)
+    rango = np.empty(len(unicas), dtype=np.int64)
+    rango[np.argsort(-tam, kind='stable')] = np.arange(len(unicas))
+    etiqueta[validas] = rango[inv]
+    return etiqueta, nucleo
+
+
+# ==============================================================================
+# POLIGONOS
+# ==============================================================================
+
+def poligonos_zonas(x, y, etiqueta, ratio=RATIO_ENVOLVENTE, margen_m=MARGEN_M):
+    """
+    Envolvente de cada zona como GeoJSON (FeatureCollection en lat/lon).
+
+    Propiedades de cada zona: zona, n_rejas, area_ha.
+    """
+    import shapely
+
+    features = []
+    for z in range(etiqueta.max() + 1 if len(etiqueta) else 0):
+        m = etiqueta == z
+        puntos = shapely.multipoints(np.column_stack([x[m], y[m]]))
+        forma = shapely.convex_hull(puntos) if ratio >= 1 else shapely.concave_hull(puntos, ratio=ratio)
+        forma = forma.buffer(margen_m)
+        px, py = np.asarray(forma.exterior.coords).T
+        lat, lon = a_grados(px, py)
+        features.append({
+            'type': 'Feature',
+            'properties': {'zona': int(z), 'n_rejas': int(m.sum()),
+                           'area_ha': round(float(forma.area) / 1e4, 2)},
+            'geometry': {'type': 'Polygon',
+                         'coordinates': [[[round(float(a), 6), round(float(b), 6)]
+                                          for a, b in zip(lon, lat)]]},
+        })
+    return {'type': 'FeatureCollection', 'features': features}
+
+
+def zonas_rejas(lat, lon, eps_m=EPS_M, min_muestras=MIN_MUESTRAS, metrica='euclidea',
+                rr=None, radio_max_m=RADIO_MAX_M, ratio=RATIO_ENVOLVENTE, usar_cache=True):
+    """
+    Zonas de concentracion de rejas y sus poligonos.
+
+    Parametros:
+    -----------
+    lat, lon : array
+        Coordenadas de las rejas
+    eps_m, min_muestras : DBSCAN
+    metrica : str
+        'euclidea' o 'red' (requiere rr, un RedRejas)
+    radio_max_m : float
+        Radio del grafo de vecinos guardado en cache (si eps_m es mayor se
+        usa eps_m)
+    ratio : float
+        1 = envolvente convexa; menor = concava
+
+    Retorna:
+    --------
+    dict con etiqueta, nucleo, geojson y cache (True si el grafo de vecinos
+    salio de la cache)
+    """
+    if metrica not in METRICAS:
+        raise ValueError(f"metrica debe ser una de {METRICAS}, no {metrica!r}")
+    if metrica == 'red' and rr is None:
+        raise ValueError("la metrica 'red' necesita el modelo de red (rr)")
+    lat = np.asarray(lat, dtype=np.float64)
+    lon = np.asarray(lon, dtype=np.float64)
+    x, y = a_metros(lat, lon)
+    radio = float(max(radio_max_m, eps_m))
+
+    cache = CacheEtapas(activo=usar_cache)
+    dep = {'puntos': hash_datos(lat, lon), 'radio_m': radio, 'metrica': metrica}
+    if metrica == 'euclidea':
+        vecinos = cache.obtener('vecinos_rejas', dep, lambda: vecinos_euclideos(x, y, radio))
+    else:
+        from accesibilidad import nodos_cercanos
+
+        dep['red'] = rr.meta['red']
+        nodo = nodos_cercanos(rr, lat, lon)[0]
+        vecinos = cache.obtener('vecinos_rejas', dep, lambda: vecinos_red(rr, nodo, radio))
+
+    etiqueta, nucleo = dbscan(len(lat), vecinos, eps_m, min_muestras)
+    return {
+        'etiqueta': etiqueta,
+        'nucleo': nucleo,
+        'geojson': poligonos_zonas(x, y, etiqueta, ratio=ratio),
+        'cache': bool(cache.aciertos),
+    }
+
+
+def mapa_zonas(geojson, ruta):
+    """Mapa HTML con un poligono por zona (folium)."""
+    import folium
+
+    coords = np.array([c for f in geojson['features'] for c in f['geometry']['coordinates'][0]])
+    centro = coords.mean(axis=0)[::-1].tolist() if len(coords) else [-33.52, -70.59]
+    mapa = folium.Map(location=centro, zoom_start=14, tiles='OpenStreetMap')
+    folium.GeoJson(
+        geojson, name='Zonas',
+        style_function=lambda f: {'color': '#c0392b', 'weight': 2, 'fillOpacity': 0.25},
+        tooltip=folium.GeoJsonTooltip(fields=['zona', 'n_rejas', 'area_ha'],
+                                      aliases=['Zona', 'Rejas', 'Area (ha)']),
+    ).add_to(mapa)
+    mapa.save(ruta)
+
+
+# ==============================================================================
+# EJECUTAR
+# ==============================================================================
+if __name__ == "__main__":
+    import sys
+    import time
+
+    from almacen_datos import cargar_tabla
+    from red_rejas import DATOS, ESTADO_CERRADA, cargar_red_rejas
+
+    eps = float(sys.argv[1]) if len(sys.argv) > 1 else EPS_M
+    min_m = int(sys.argv[2]) if len(sys.argv) > 2 else MIN_MUESTRAS
+    metrica = sys.argv[3] if len(sys.argv) > 3 else 'euclidea'
+
+    print("=" * 70)
+    print(f"ZONAS DE REJAS (DBSCAN {metrica}, eps {eps:.0f} m, min {min_m})")
+    print("=" * 70)
+    df = cargar_tabla(DATOS)
+    cerradas = df[df['estado'] == ESTADO_CERRADA]
+    rr = cargar_red_rejas(tabla=df) if metrica == 'red' else None
+    t0 = time.time()
+    res = zonas_rejas(cerradas['lat'].to_numpy(), cerradas['lon'].to_numpy(),
+                      eps_m=eps, min_muestras=min_m, metrica=metrica, rr=rr)
+    print(f"      {len(cerradas)} rejas cerradas en {time.time() - t0:.2f} s "
+          f"(vecinos {'desde cache' if res['cache'] else 'calculados'})")
+    zonas = res['geojson']['features']
+    en_zona = int((res['etiqueta'] >= 0).sum())
+    print(f"      Zonas: {len(zonas)} | Rejas en zona: {en_zona} | Ruido: {len(cerradas) - en_zona}")
+    for f in zonas[:10]:
+        p = f['properties']
+        print(f"        Zona {p['zona']:>2}: {p['n_rejas']:>5} rejas, {p['area_ha']:>8.1f} ha")
+
+    with open('../05_analisis/zonas_rejas.geojson', 'w', encoding='utf-8') as f:
+        json.dump(res['geojson'], f, ensure_ascii=False)
+    mapa_zonas(res['geojson'], '../04_mapas_html/3_Clusters.html')
+    print("      Guardado: ../05_analisis/zonas_rejas.geojson")
+    print("      Guardado: ../04_mapas_html/3_Clusters.html")